@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import argparse
+import gc
+import io
+import logging
+import mido
+import random
+import time
+import tracemalloc
+
+from dam_okd_utility.byte_cursor import ByteCursor
+from dam_okd_utility.customized_logger import getLogger
+from dam_okd_utility.okd_compact_track import OkdCompactTrack
+from dam_okd_utility.okd_midi import OkdMidiGenericMessage, clear_interned_data
+from dam_okd_utility.okd_p_track_midi import OkdPTrackMidi
+from dam_okd_utility.okd_scramble import descramble_stream
+
+
+class DamOkdBenchmark:
+    __logger = getLogger("DamOkdBenchmark")
+
+    @staticmethod
+    def generate_p_track(event_count: int, seed=0):
+        random_generator = random.Random(seed)
+        messages: list[OkdMidiGenericMessage] = []
+        for _ in range(event_count):
+            channel = random_generator.randrange(16)
+            if random_generator.random() < 0.8:
+                data = bytes(
+                    [
+                        0x90 | channel,
+                        random_generator.randrange(36, 84),
+                        random_generator.choice([0x40, 0x50, 0x60, 0x7F]),
+                    ]
+                )
+                duration = random_generator.choice([120, 240, 480, 960]) * 4
+            else:
+                data = bytes(
+                    [
+                        0xB0 | channel,
+                        random_generator.choice([0x07, 0x0A, 0x0B, 0x40]),
+                        random_generator.randrange(128),
+                    ]
+                )
+                duration = 0
+            delta_time = random_generator.choice([0, 0, 60, 120, 240, 480])
+            messages.append(OkdMidiGenericMessage(delta_time, data, duration))
+
+        buffer = bytearray()
+        OkdPTrackMidi.write(buffer, messages)
+        return bytes(buffer)
+
+    @staticmethod
+    def __measure(name: str, build):
+        # Payloads interned by an earlier measurement would not be counted
+        clear_interned_data()
+        gc.collect()
+        tracemalloc.start()
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<24}{size / 1024:>12.1f} KiB")
+        return result
+
+    @staticmethod
+    def memory(event_count: int):
+        buffer = DamOkdBenchmark.generate_p_track(event_count)
+        print(f"P-Track: event_count={event_count} buffer_length={len(buffer)}")
+
+        # Every message owns its payload, as decoded before interning
+        DamOkdBenchmark.__measure(
+            "message list",
+            lambda: [
+                OkdMidiGenericMessage(
+                    message.delta_time,
+                    message.data[:1] + message.data[1:],
+                    message.duration,
+                )
+                for message in OkdPTrackMidi.read_event_table(ByteCursor(buffer))
+            ],
+        )
+        DamOkdBenchmark.__measure(
+            "interned message list",
+            lambda: OkdPTrackMidi.read(ByteCursor(buffer)),
+        )
+        DamOkdBenchmark.__measure(
+            "event table",
+            lambda: OkdPTrackMidi.read_event_table(ByteCursor(buffer)),
+        )
+        DamOkdBenchmark.__measure(
+            "compact track",
+            lambda: OkdCompactTrack(OkdPTrackMidi.read_event_table(ByteCursor(buffer))),
+        )
+
+    @staticmethod
+    def generate_note_midi(note_count: int, seed=0):
+        random_generator = random.Random(seed)
+        note_messages: list[tuple[int, mido.Message]] = []
+        time = 0
+        for _ in range(note_count):
+            time += random_generator.choice([0, 0, 30, 60, 120])
+            channel = random_generator.randrange(16)
+            note = random_generator.randrange(36, 84)
+            # Sustained notes span many later events
+            duration = random_generator.choice([30, 60, 120, 240, 480, 7680, 30720])
+            note_messages.append(
+                (
+                    time,
+                    mido.Message("note_on", channel=channel, note=note, velocity=100),
+                )
+            )
+            note_messages.append(
+                (
+                    time + duration,
+                    mido.Message("note_off", channel=channel, note=note, velocity=64),
+                )
+            )
+        note_messages.sort(key=lambda note_message: note_message[0])
+
+        midi_track = mido.MidiTrack()
+        midi_track.append(mido.MetaMessage("midi_port", port=0))
+        current_time = 0
+        for absolute_time, message in note_messages:
+            midi_track.append(message.copy(time=absolute_time - current_time))
+            current_time = absolute_time
+
+        midi = mido.MidiFile()
+        midi.tracks.append(midi_track)
+        return midi
+
+    @staticmethod
+    def note_pairing(note_count: int):
+        midi = DamOkdBenchmark.generate_note_midi(note_count)
+        print(f"MIDI: note_count={note_count}")
+
+        start_time = time.perf_counter()
+        relative_time_tracks = OkdPTrackMidi.midi_to_relative_time_tracks(midi)
+        elapsed_time = time.perf_counter() - start_time
+        message_count = sum(
+            len(relative_time_track)
+            for relative_time_track in relative_time_tracks
+            if relative_time_track is not None
+        )
+        print(
+            f"midi_to_relative_time_tracks: message_count={message_count} elapsed_time={elapsed_time:.3f}s"
+        )
+
+    @staticmethod
+    def descramble(length: int, workers_list: list[int], repeat: int):
+        buffer = random.Random(0).randbytes(length)
+        print(f"Scrambled data: length={length}")
+
+        for workers in workers_list:
+            elapsed_times: list[float] = []
+            for _ in range(repeat):
+                input_stream = io.BytesIO(buffer)
+                output_stream = io.BytesIO()
+                start_time = time.perf_counter()
+                descramble_stream(input_stream, output_stream, 0, workers=workers)
+                elapsed_times.append(time.perf_counter() - start_time)
+            print(f"workers={workers:<4}{min(elapsed_times):>10.3f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DAM OKD Benchmark")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    memory_parser = subparsers.add_parser(
+        "memory", help="Measure the memory of decoded P-Track representations"
+    )
+    memory_parser.add_argument(
+        "--event-count", help="P-Track event count", type=int, default=100000
+    )
+
+    note_pairing_parser = subparsers.add_parser(
+        "note-pairing", help="Measure the note off pairing of the MIDI conversion"
+    )
+    note_pairing_parser.add_argument(
+        "--note-count", help="Synthetic track note count", type=int, default=100000
+    )
+
+    descramble_parser = subparsers.add_parser(
+        "descramble", help="Measure descrambling by worker count"
+    )
+    descramble_parser.add_argument(
+        "--length", help="Scrambled data length", type=int, default=0x10000000
+    )
+    descramble_parser.add_argument(
+        "--workers", help="Worker counts", type=int, nargs="+", default=[1, 2, 4, 8]
+    )
+    descramble_parser.add_argument(
+        "--repeat", help="Repeat count per worker count", type=int, default=3
+    )
+
+    args = parser.parse_args(argv)
+
+    # Decoder warnings are not part of the measurement
+    logging.getLogger("OkdPTrackMidi").setLevel(logging.ERROR)
+
+    if args.command == "memory":
+        DamOkdBenchmark.memory(args.event_count)
+    elif args.command == "note-pairing":
+        DamOkdBenchmark.note_pairing(args.note_count)
+    elif args.command == "descramble":
+        DamOkdBenchmark.descramble(args.length, args.workers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
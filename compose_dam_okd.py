@@ -2,17 +2,15 @@
 # coding: utf-8
 
 import argparse
+import hashlib
 import io
-import mido
 import mimetypes
+import os
+import random
 import simplejson
+import tempfile
 
 from dam_okd_utility.customized_logger import getLogger
-from dam_okd_utility.midi import (
-    get_first_tempo,
-    get_port_channel_track,
-    remove_port_tracks,
-)
 from dam_okd_utility.okd_file import OkdFile
 from dam_okd_utility.okd_m_track_chunk import OkdMTrackChunk
 from dam_okd_utility.okd_p_track_info_chunk import (
@@ -29,9 +27,17 @@ from dam_okd_utility.okd_p3_track_info_chunk import (
     OkdP3TrackInfoChunk,
 )
 from dam_okd_utility.okd_p_track_chunk import OkdPTrackChunk
+from dam_okd_utility.okd_scramble import copy_stream
+from dam_okd_utility.standard_midi_file import (
+    StandardMidiFile,
+    StandardMidiFileEvent,
+    StandardMidiFileWriter,
+)
 
 
 class DamOkdComposer:
+    CACHE_VERSION = 1
+
     __logger = getLogger("DamOkdComposer")
 
     @staticmethod
@@ -161,55 +167,168 @@ class DamOkdComposer:
         )
 
     @staticmethod
-    def compose(
+    def __digest_file(path: str):
+        with open(path, "rb") as input_file:
+            return hashlib.sha256(input_file.read()).digest()
+
+    @staticmethod
+    def __compose(
         main_output_stream: io.BufferedWriter,
         scoring_reference_output_stream: io.BufferedWriter,
         karaoke_path: str,
+        random_generator: random.Random,
     ):
-        karaoke_midi = mido.MidiFile(karaoke_path)
+        with open(karaoke_path, "rb") as karaoke_file:
+            karaoke_smf = StandardMidiFile.read(karaoke_file.read())
 
-        m_track_chunk = OkdMTrackChunk.from_midi(karaoke_midi)
+        m_track_chunk = OkdMTrackChunk.from_smf(karaoke_smf)
         # Remove M-Track
-        remove_port_tracks(karaoke_midi, 15)
-        p_track_chunks = OkdPTrackChunk.from_midi(karaoke_midi)
+        karaoke_smf.remove_port_tracks(15)
+        p_track_chunks = OkdPTrackChunk.from_smf(karaoke_smf)
         p_track_info_chunk = DamOkdComposer.__p_track_info_chunk_from_p_track_chunks(
             p_track_chunks
         )
 
         OkdFile.scramble(
-            main_output_stream, [p_track_info_chunk, m_track_chunk, *p_track_chunks]
+            main_output_stream,
+            [p_track_info_chunk, m_track_chunk, *p_track_chunks],
+            random_generator,
         )
 
-        p3_track_midi = mido.MidiFile()
-        karaoke_p3_track = get_port_channel_track(karaoke_midi, 1, 8)
+        karaoke_p3_track = karaoke_smf.get_port_channel_track(1, 8)
         if karaoke_p3_track is None:
             raise ValueError("Melody track not found.")
 
-        karaoke_p3_track = [
-            message
-            for message in karaoke_p3_track
-            if message.type == "midi_port"
-            or message.type == "note_on"
-            or message.type == "note_off"
-        ]
-        karaoke_midi_tempo = get_first_tempo(karaoke_midi)
-        karaoke_p3_track.append(mido.MetaMessage("set_tempo", tempo=karaoke_midi_tempo))
-        for message in karaoke_p3_track:
-            if message.type == "midi_port":
-                message.port = 2
-            if hasattr(message, "channel"):
-                message.channel = 14
-        p3_track_midi.tracks.append(karaoke_p3_track)
-
-        p3_track_chunk = OkdPTrackChunk.from_midi(p3_track_midi)[0]
+        # Delta times of the dropped events are dropped too
+        p3_track: list[StandardMidiFileEvent] = []
+        p3_track_time = 0
+        current_time = 0
+        for event in karaoke_p3_track:
+            delta_time = event.time - current_time
+            current_time = event.time
+
+            status_type = event.data[0] & 0xF0
+            if event.meta_type() == 0x21:
+                data = b"\xFF\x21\x01\x02"
+            elif status_type == 0x80 or status_type == 0x90:
+                data = (status_type | 14).to_bytes(1, byteorder="big") + event.data[1:]
+            else:
+                continue
+
+            p3_track_time += delta_time
+            p3_track.append(StandardMidiFileEvent(p3_track_time, data))
+        karaoke_smf_tempo = karaoke_smf.get_first_tempo()
+        p3_track.append(
+            StandardMidiFileEvent(
+                p3_track_time,
+                b"\xFF\x51\x03" + karaoke_smf_tempo.to_bytes(3, byteorder="big"),
+            )
+        )
+        p3_track_smf = StandardMidiFile(
+            1, StandardMidiFileWriter.DEFAULT_TICKS_PER_BEAT, [p3_track]
+        )
+
+        p3_track_chunk = OkdPTrackChunk.from_smf(p3_track_smf)[0]
         p3_track_info_chunk = DamOkdComposer.__p3_track_info_chunk_from_p3_track_chunk(
             p3_track_chunk
         )
 
         OkdFile.scramble(
-            scoring_reference_output_stream, [p3_track_info_chunk, p3_track_chunk]
+            scoring_reference_output_stream,
+            [p3_track_info_chunk, p3_track_chunk],
+            random_generator,
         )
 
+    @staticmethod
+    def __compose_cache(
+        cache_directory_path: str,
+        karaoke_path: str,
+        seed: int | bytes,
+        midi_digest: bytes,
+    ):
+        key_hash = hashlib.sha256()
+        key_hash.update(DamOkdComposer.CACHE_VERSION.to_bytes(4, byteorder="big"))
+        key_hash.update(midi_digest)
+        key_hash.update(repr(seed).encode())
+        key = key_hash.hexdigest()
+
+        main_cache_path = os.path.join(cache_directory_path, key + ".okd")
+        scoring_reference_cache_path = os.path.join(
+            cache_directory_path, key + ".p3.okd"
+        )
+        if os.path.isfile(main_cache_path) and os.path.isfile(
+            scoring_reference_cache_path
+        ):
+            DamOkdComposer.__logger.info(f"Compose cache hit. key={key}")
+            return main_cache_path, scoring_reference_cache_path
+
+        os.makedirs(cache_directory_path, exist_ok=True)
+        # Write atomically, other processes may share the cache directory
+        main_file_descriptor, main_temporary_path = tempfile.mkstemp(
+            ".tmp", dir=cache_directory_path
+        )
+        (
+            scoring_reference_file_descriptor,
+            scoring_reference_temporary_path,
+        ) = tempfile.mkstemp(".tmp", dir=cache_directory_path)
+        try:
+            with os.fdopen(
+                main_file_descriptor, "wb"
+            ) as main_temporary_file, os.fdopen(
+                scoring_reference_file_descriptor, "wb"
+            ) as scoring_reference_temporary_file:
+                DamOkdComposer.__compose(
+                    main_temporary_file,
+                    scoring_reference_temporary_file,
+                    karaoke_path,
+                    random.Random(seed),
+                )
+            os.replace(scoring_reference_temporary_path, scoring_reference_cache_path)
+            os.replace(main_temporary_path, main_cache_path)
+        except BaseException:
+            for temporary_path in [
+                main_temporary_path,
+                scoring_reference_temporary_path,
+            ]:
+                if os.path.exists(temporary_path):
+                    os.unlink(temporary_path)
+            raise
+
+        DamOkdComposer.__logger.info(f"Compose cache stored. key={key}")
+        return main_cache_path, scoring_reference_cache_path
+
+    @staticmethod
+    def compose(
+        main_output_stream: io.BufferedWriter,
+        scoring_reference_output_stream: io.BufferedWriter,
+        karaoke_path: str,
+        seed: int | bytes | None = None,
+        deterministic=False,
+        cache_directory_path: str | None = None,
+    ):
+        if cache_directory_path is None:
+            if seed is None and deterministic:
+                seed = DamOkdComposer.__digest_file(karaoke_path)
+            DamOkdComposer.__compose(
+                main_output_stream,
+                scoring_reference_output_stream,
+                karaoke_path,
+                random.Random(seed),
+            )
+            return
+
+        midi_digest = DamOkdComposer.__digest_file(karaoke_path)
+        if seed is None:
+            # Cached outputs must be reproducible
+            seed = midi_digest
+        main_cache_path, scoring_reference_cache_path = DamOkdComposer.__compose_cache(
+            cache_directory_path, karaoke_path, seed, midi_digest
+        )
+        with open(main_cache_path, "rb") as main_cache_file:
+            copy_stream(main_cache_file, main_output_stream)
+        with open(scoring_reference_cache_path, "rb") as scoring_reference_cache_file:
+            copy_stream(scoring_reference_cache_file, scoring_reference_output_stream)
+
 
 def main(argv=None):
     parser = argparse.ArgumentParser(description="DAM OKD Composer")
@@ -218,6 +337,16 @@ def main(argv=None):
     parser.add_argument(
         "scoring_reference_output_path", help="Output Scoring reference file path"
     )
+    parser.add_argument("--seed", help="Scramble pattern index seed", type=int)
+    parser.add_argument(
+        "--deterministic",
+        help="Derive the scramble pattern index from the MIDI file content",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache-directory",
+        help="Reuse outputs composed from the same MIDI file and options",
+    )
     args = parser.parse_args()
 
     with open(args.main_output_path, "wb") as main_output_stream, open(
@@ -227,6 +356,9 @@ def main(argv=None):
             main_output_stream,
             scoring_reference_output_stream,
             args.karaoke_path,
+            args.seed,
+            args.deterministic,
+            args.cache_directory,
         )
 
 
@@ -0,0 +1,144 @@
+import bitstring
+import re
+
+
+class ByteCursor:
+    """Byte-aligned Read Cursor"""
+
+    __slots__ = ("buffer", "bytepos")
+
+    def __init__(self, buffer: bytes | bytearray | memoryview, bytepos=0):
+        self.buffer = buffer
+        self.bytepos = bytepos
+
+    @staticmethod
+    def from_stream(stream: "ByteCursor | bitstring.ConstBitStream | bytes"):
+        if isinstance(stream, ByteCursor):
+            return stream
+        if isinstance(stream, bitstring.ConstBitStream):
+            return BitStreamByteCursor(stream)
+        return ByteCursor(stream)
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __read_error(self, length: int):
+        return bitstring.ReadError(
+            f"Reading off the end of the data. bytepos={self.bytepos} length={length}"
+        )
+
+    def u8(self):
+        bytepos = self.bytepos
+        try:
+            byte = self.buffer[bytepos]
+        except IndexError:
+            raise self.__read_error(1) from None
+        self.bytepos = bytepos + 1
+        return byte
+
+    def peek_u8(self):
+        try:
+            return self.buffer[self.bytepos]
+        except IndexError:
+            raise self.__read_error(1) from None
+
+    def u16be(self):
+        bytepos = self.bytepos
+        if len(self.buffer) < bytepos + 2:
+            raise self.__read_error(2)
+        self.bytepos = bytepos + 2
+        return (self.buffer[bytepos] << 8) | self.buffer[bytepos + 1]
+
+    def u16le(self):
+        bytepos = self.bytepos
+        if len(self.buffer) < bytepos + 2:
+            raise self.__read_error(2)
+        self.bytepos = bytepos + 2
+        return self.buffer[bytepos] | (self.buffer[bytepos + 1] << 8)
+
+    def u32be(self):
+        bytepos = self.bytepos
+        if len(self.buffer) < bytepos + 4:
+            raise self.__read_error(4)
+        self.bytepos = bytepos + 4
+        return int.from_bytes(self.buffer[bytepos : bytepos + 4], byteorder="big")
+
+    def peek(self, length: int):
+        bytepos = self.bytepos
+        if len(self.buffer) < bytepos + length:
+            raise self.__read_error(length)
+        return bytes(self.buffer[bytepos : bytepos + length])
+
+    def slice(self, length: int | None = None):
+        bytepos = self.bytepos
+        if length is None:
+            length = max(len(self.buffer) - bytepos, 0)
+        elif len(self.buffer) < bytepos + length:
+            raise self.__read_error(length)
+        self.bytepos = bytepos + length
+        return bytes(self.buffer[bytepos : bytepos + length])
+
+    def skip(self, length: int):
+        if len(self.buffer) < self.bytepos + length:
+            raise self.__read_error(length)
+        self.bytepos += length
+
+    def search(self, pattern: re.Pattern[bytes]):
+        match = pattern.search(self.buffer, self.bytepos)
+        if match is None:
+            raise self.__read_error(len(self.buffer) - self.bytepos + 1)
+        return match.start()
+
+
+class BitStreamByteCursor(ByteCursor):
+    """Byte-aligned Read Cursor sharing the position of a BitStream"""
+
+    __slots__ = ("stream", "__buffer")
+
+    def __init__(self, stream: bitstring.ConstBitStream):
+        self.stream = stream
+        self.__buffer: bytes | None = None
+
+    @property
+    def buffer(self):
+        # Decoders only read, the stream is not modified while it is wrapped
+        if self.__buffer is None:
+            self.__buffer = self.stream.tobytes()
+        return self.__buffer
+
+    @property
+    def bytepos(self):
+        return self.stream.bytepos
+
+    @bytepos.setter
+    def bytepos(self, bytepos: int):
+        self.stream.bytepos = bytepos
+
+    def __len__(self):
+        return len(self.stream) // 8
+
+    def u8(self):
+        return self.stream.read("uint:8")
+
+    def peek_u8(self):
+        return self.stream.peek("uint:8")
+
+    def u16be(self):
+        return self.stream.read("uintbe:16")
+
+    def u16le(self):
+        return self.stream.read("uintle:16")
+
+    def u32be(self):
+        return self.stream.read("uintbe:32")
+
+    def peek(self, length: int):
+        return self.stream.peek(8 * length).bytes
+
+    def slice(self, length: int | None = None):
+        if length is None:
+            return self.stream.read("bytes")
+        return self.stream.read(8 * length).bytes
+
+    def skip(self, length: int):
+        self.stream.bytepos += length
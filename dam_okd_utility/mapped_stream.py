@@ -0,0 +1,76 @@
+import mmap
+import os
+
+
+class MappedStream:
+    """Read-only stream over a buffer returning zero-copy memoryview slices"""
+
+    def __init__(self, buffer: bytes | memoryview | mmap.mmap):
+        self.__mapping: mmap.mmap | None = None
+        if isinstance(buffer, mmap.mmap):
+            self.__mapping = buffer
+        self.__buffer = memoryview(buffer)
+        self.__position = 0
+
+    @staticmethod
+    def open(path: str):
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return MappedStream(b"")
+            return MappedStream(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @property
+    def buffer(self):
+        return self.__buffer
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.__position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self.__position + offset
+        elif whence == os.SEEK_END:
+            position = len(self.__buffer) + offset
+        else:
+            raise ValueError(f"Invalid whence. whence={whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position. position={position}")
+        self.__position = position
+        return position
+
+    def read(self, size: int | None = -1):
+        start_position = min(self.__position, len(self.__buffer))
+        end_position = len(self.__buffer)
+        if size is not None and 0 <= size:
+            end_position = min(start_position + size, end_position)
+        self.__position = max(self.__position, end_position)
+        return self.__buffer[start_position:end_position]
+
+    def readinto(self, buffer: bytearray | memoryview):
+        read_buffer = self.read(len(buffer))
+        read_length = len(read_buffer)
+        memoryview(buffer)[:read_length] = read_buffer
+        return read_length
+
+    def close(self):
+        self.__buffer.release()
+        if self.__mapping is not None:
+            try:
+                self.__mapping.close()
+            except BufferError:
+                # Slices are still referenced, the mapping is closed on collection
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
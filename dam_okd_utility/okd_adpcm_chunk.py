@@ -1,37 +1,42 @@
 import bitstring
+import struct
 from typing import NamedTuple
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.customized_logger import getLogger
 
 
 class OkdAdpcmChunk(NamedTuple):
     """DAM OKD ADPCM Chunk"""
 
+    SIZE_LAYOUT = struct.Struct(">I")
+
     __logger = getLogger("OkdAdpcmChunk")
 
     @staticmethod
-    def read(stream: bitstring.BitStream):
+    def read(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
         adpcms: list[bytes] = []
         while True:
             chunk_id: bytes
             try:
-                chunk_id = stream.read("bytes:4")
+                chunk_id = stream.slice(4)
             except bitstring.ReadError:
                 break
 
             if chunk_id == b"YAWV":
-                chunk_size: int = stream.read("uintbe:32")
-                chunk_data: bytes = stream.read(8 * chunk_size).bytes
+                chunk_size: int = stream.u32be()
+                chunk_data: bytes = stream.slice(chunk_size)
                 adpcms.append(chunk_data)
             else:
-                chunk_data: bytes = stream.read("bytes")
+                chunk_data: bytes = stream.slice()
                 adpcms.append(chunk_data)
 
         return OkdAdpcmChunk(adpcms)
 
-    def write(self, stream: bitstring.BitStream):
+    def write(self, stream: bytearray | bitstring.BitStream):
         for adpcm in self.adpcms:
-            stream.append(bitstring.pack("uintbe:32", len(adpcm)))
-            stream.append(adpcm)
+            stream += OkdAdpcmChunk.SIZE_LAYOUT.pack(len(adpcm))
+            stream += adpcm
 
     adpcms: list[bytes]
@@ -0,0 +1,209 @@
+import hashlib
+import io
+import os
+import simplejson
+import tempfile
+from typing import NamedTuple
+
+from dam_okd_utility.customized_logger import getLogger
+from dam_okd_utility.mapped_stream import MappedStream
+from dam_okd_utility.okd_file import OkdFileType
+from dam_okd_utility.okd_file_data import (
+    GenericOkdHeader,
+    MmtOkdHeader,
+    MmkOkdHeader,
+    SprOkdHeader,
+    DioOkdHeader,
+    OkaHeader,
+    OkdFileLayout,
+    OkdChunkIndexEntry,
+)
+from dam_okd_utility.okd_reader import OkdReader
+
+
+class OkdChunkIndexCacheEntry(NamedTuple):
+    layout: OkdFileLayout
+    chunks: list[OkdChunkIndexEntry]
+
+
+class OkdChunkIndexCache:
+    """DAM OKD Chunk Index Cache"""
+
+    FORMAT_VERSION = 1
+    DEFAULT_MAX_SIZE = 0x4000000
+    HEADER_DIGEST_LENGTH = 0x100
+    HEADER_TYPES = {
+        header_type.__name__: header_type
+        for header_type in [
+            GenericOkdHeader,
+            MmtOkdHeader,
+            MmkOkdHeader,
+            SprOkdHeader,
+            DioOkdHeader,
+            OkaHeader,
+        ]
+    }
+
+    __logger = getLogger("OkdChunkIndexCache")
+
+    def __init__(self, directory_path: str, max_size: int = DEFAULT_MAX_SIZE):
+        self.__directory_path = directory_path
+        self.__max_size = max_size
+        # Total entry size, scanned on the first write and kept up to date after
+        self.__size: int | None = None
+        os.makedirs(directory_path, exist_ok=True)
+
+    @staticmethod
+    def __key(path: str):
+        path = os.path.abspath(path)
+        stat_result = os.stat(path)
+        with open(path, "rb") as stream:
+            header_buffer = stream.read(OkdChunkIndexCache.HEADER_DIGEST_LENGTH)
+
+        key_hash = hashlib.sha256()
+        key_hash.update(os.fsencode(path))
+        key_hash.update(stat_result.st_size.to_bytes(8, byteorder="big"))
+        key_hash.update(stat_result.st_mtime_ns.to_bytes(8, byteorder="big"))
+        key_hash.update(hashlib.sha256(header_buffer).digest())
+        return key_hash.hexdigest()
+
+    def __entry_path(self, key: str):
+        return os.path.join(self.__directory_path, key + ".json")
+
+    @staticmethod
+    def __serialize(entry: OkdChunkIndexCacheEntry):
+        header = entry.layout.header
+        header_fields: dict[str, object] = {}
+        header_bytes_fields: list[str] = []
+        for field_name, value in header._asdict().items():
+            if isinstance(value, bytes):
+                value = value.hex()
+                header_bytes_fields.append(field_name)
+            header_fields[field_name] = value
+
+        return {
+            "format_version": OkdChunkIndexCache.FORMAT_VERSION,
+            "header_type": type(header).__name__,
+            "header": header_fields,
+            "header_bytes_fields": header_bytes_fields,
+            "scramble_pattern_index": entry.layout.scramble_pattern_index,
+            "chunks_position": entry.layout.chunks_position,
+            "scrambled_length": entry.layout.scrambled_length,
+            "chunks": [
+                [chunk.chunk_id.hex(), chunk.offset, chunk.size]
+                for chunk in entry.chunks
+            ],
+        }
+
+    @staticmethod
+    def __deserialize(json_object: dict):
+        if json_object.get("format_version") != OkdChunkIndexCache.FORMAT_VERSION:
+            return
+
+        header_fields: dict[str, object] = json_object["header"]
+        for field_name in json_object["header_bytes_fields"]:
+            header_fields[field_name] = bytes.fromhex(header_fields[field_name])
+        header_type = OkdChunkIndexCache.HEADER_TYPES[json_object["header_type"]]
+        layout = OkdFileLayout(
+            header_type(**header_fields),
+            json_object["scramble_pattern_index"],
+            json_object["chunks_position"],
+            json_object["scrambled_length"],
+        )
+        chunks = [
+            OkdChunkIndexEntry(bytes.fromhex(chunk_id), offset, size)
+            for chunk_id, offset, size in json_object["chunks"]
+        ]
+        return OkdChunkIndexCacheEntry(layout, chunks)
+
+    def get(self, path: str):
+        entry_path = self.__entry_path(OkdChunkIndexCache.__key(path))
+        try:
+            with open(entry_path, "rb") as entry_file:
+                json_object = simplejson.load(entry_file)
+            # Mark as recently used
+            os.utime(entry_path)
+        except (OSError, ValueError):
+            return
+
+        try:
+            return OkdChunkIndexCache.__deserialize(json_object)
+        except (KeyError, TypeError, ValueError):
+            OkdChunkIndexCache.__logger.warning(
+                f"Invalid cache entry detected. entry_path={entry_path}"
+            )
+
+    def __scan(self):
+        entries: list[tuple[float, int, str]] = []
+        for directory_entry in os.scandir(self.__directory_path):
+            if not directory_entry.name.endswith(".json"):
+                continue
+            try:
+                stat_result = directory_entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append(
+                (stat_result.st_mtime, stat_result.st_size, directory_entry.path)
+            )
+        return entries
+
+    def put(self, path: str, entry: OkdChunkIndexCacheEntry):
+        entry_path = self.__entry_path(OkdChunkIndexCache.__key(path))
+        entry_buffer = simplejson.dumps(OkdChunkIndexCache.__serialize(entry)).encode()
+
+        if self.__size is None:
+            self.__size = sum(entry_size for _, entry_size, _ in self.__scan())
+        previous_entry_size = 0
+        try:
+            previous_entry_size = os.stat(entry_path).st_size
+        except FileNotFoundError:
+            pass
+
+        # Write atomically, other processes may share the cache directory
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            ".tmp", dir=self.__directory_path
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as temporary_file:
+                temporary_file.write(entry_buffer)
+            os.replace(temporary_path, entry_path)
+        except BaseException:
+            try:
+                os.unlink(temporary_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self.__size += len(entry_buffer) - previous_entry_size
+        if self.__max_size < self.__size:
+            self.evict()
+
+    def evict(self):
+        entries = self.__scan()
+        total_size = sum(entry_size for _, entry_size, _ in entries)
+
+        # Least recently used first
+        entries.sort()
+        for _, entry_size, entry_path in entries:
+            if total_size <= self.__max_size:
+                break
+            try:
+                os.unlink(entry_path)
+            except FileNotFoundError:
+                pass
+            total_size -= entry_size
+        self.__size = total_size
+
+    def open_reader(
+        self,
+        path: str,
+        stream: io.BufferedReader | MappedStream,
+        file_type: OkdFileType,
+    ):
+        entry = self.get(path)
+        if entry is not None:
+            return OkdReader(stream, file_type, entry.layout, entry.chunks)
+
+        reader = OkdReader(stream, file_type)
+        self.put(path, OkdChunkIndexCacheEntry(reader.layout, reader.chunks()))
+        return reader
@@ -0,0 +1,71 @@
+import array
+from typing import Iterable
+
+from dam_okd_utility.okd_midi import (
+    OkdMidiGenericMessage,
+    OkdMidiMessage,
+    intern_data,
+)
+
+
+class OkdCompactTrack:
+    """DAM OKD Compact Track"""
+
+    def __init__(self, messages: Iterable[OkdMidiMessage] = ()):
+        self.delta_times = array.array("Q")
+        self.durations = array.array("Q")
+        self.data_indices = array.array("I")
+        # Each distinct payload is stored once per track
+        self.data_table: list[bytes] = []
+        self.__data_table_indices: dict[bytes, int] = {}
+        self.extend(messages)
+
+    def __len__(self):
+        return len(self.delta_times)
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return OkdMidiGenericMessage(
+            self.delta_times[index],
+            self.data_table[self.data_indices[index]],
+            self.durations[index],
+        )
+
+    def __iter__(self):
+        data_table = self.data_table
+        for delta_time, data_index, duration in zip(
+            self.delta_times, self.data_indices, self.durations
+        ):
+            yield OkdMidiGenericMessage(delta_time, data_table[data_index], duration)
+
+    def __eq__(self, other: object):
+        if isinstance(other, OkdCompactTrack) or isinstance(other, list):
+            return len(self) == len(other) and all(
+                message == other_message for message, other_message in zip(self, other)
+            )
+        return NotImplemented
+
+    @property
+    def nbytes(self):
+        return sum(
+            column.itemsize * len(column)
+            for column in [self.delta_times, self.durations, self.data_indices]
+        ) + sum(len(data) for data in self.data_table)
+
+    def append(self, message: OkdMidiMessage):
+        data = bytes(message.data)
+        data_index = self.__data_table_indices.get(data)
+        if data_index is None:
+            data_index = len(self.data_table)
+            data = intern_data(data)
+            self.data_table.append(data)
+            self.__data_table_indices[data] = data_index
+
+        self.delta_times.append(message.delta_time)
+        self.durations.append(message.duration)
+        self.data_indices.append(data_index)
+
+    def extend(self, messages: Iterable[OkdMidiMessage]):
+        for message in messages:
+            self.append(message)
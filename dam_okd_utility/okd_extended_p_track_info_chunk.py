@@ -1,19 +1,26 @@
 import bitstring
+import struct
 from typing import NamedTuple
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.customized_logger import getLogger
+from dam_okd_utility.okd_p_track_midi_data import OkdPTrackInfoList
 
 
 class OkdExtendedPTrackInfoChannelInfoEntry(NamedTuple):
     """DAM OKD Extended P-Track Information Channel Information Entry"""
 
+    ATTRIBUTE_LAYOUT = struct.Struct("<H")
+    LAYOUT = struct.Struct(">HHBB")
+
     @staticmethod
-    def read(stream: bitstring.BitStream):
-        attribute: int = stream.read("uintle:16")
-        ports: int = stream.read("uintbe:16")
-        reserved: int = stream.read("uintbe:16")
-        control_change_ax: int = stream.read("uint:8")
-        control_change_cx: int = stream.read("uint:8")
+    def read(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
+        attribute: int = stream.u16le()
+        ports: int = stream.u16be()
+        reserved: int = stream.u16be()
+        control_change_ax: int = stream.u8()
+        control_change_cx: int = stream.u8()
         return OkdExtendedPTrackInfoChannelInfoEntry(
             attribute, ports, reserved, control_change_ax, control_change_cx
         )
@@ -24,12 +31,13 @@ class OkdExtendedPTrackInfoChannelInfoEntry(NamedTuple):
     def is_guide_melody(self):
         return self.attribute & 0x0100 == 0x0100
 
-    def write(self, stream: bitstring.BitStream):
-        stream.append(bitstring.pack("uintle:16", self.attribute))
-        stream.append(bitstring.pack("uintbe:16", self.ports))
-        stream.append(bitstring.pack("uintbe:16", self.reserved))
-        stream.append(bitstring.pack("uint:8", self.control_change_ax))
-        stream.append(bitstring.pack("uint:8", self.control_change_cx))
+    def write(self, stream: bytearray | bitstring.BitStream):
+        stream += OkdExtendedPTrackInfoChannelInfoEntry.ATTRIBUTE_LAYOUT.pack(
+            self.attribute
+        )
+        stream += OkdExtendedPTrackInfoChannelInfoEntry.LAYOUT.pack(
+            self.ports, self.reserved, self.control_change_ax, self.control_change_cx
+        )
 
     attribute: int
     ports: int
@@ -41,28 +49,32 @@ class OkdExtendedPTrackInfoChannelInfoEntry(NamedTuple):
 class OkdExtendedPTrackInfoEntry(NamedTuple):
     """DAM OKD Extended P-Track Information Entry"""
 
+    HEADER_LAYOUT = struct.Struct(">BBH16H16H")
+    FOOTER_LAYOUT = struct.Struct(">HH")
+
     __logger = getLogger("OkdExtendedPTrackInfoEntry")
 
     @staticmethod
-    def read(stream: bitstring.BitStream):
-        track_number: int = stream.read("uint:8")
-        track_status: int = stream.read("uint:8")
-        reserved_1: int = stream.read("uintbe:16")
+    def read(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
+        track_number: int = stream.u8()
+        track_status: int = stream.u8()
+        reserved_1: int = stream.u16be()
 
         single_channel_groups: list[int] = []
         for channel in range(16):
-            single_channel_groups.append(stream.read("uintbe:16"))
+            single_channel_groups.append(stream.u16be())
 
         channel_groups: list[int] = []
         for channel in range(16):
-            channel_groups.append(stream.read("uintbe:16"))
+            channel_groups.append(stream.u16be())
 
         channel_info: list[int] = []
         for channel in range(16):
             channel_info.append(OkdExtendedPTrackInfoChannelInfoEntry.read(stream))
 
-        system_ex_ports: int = stream.read("uintbe:16")
-        reserved_2: int = stream.read("uintbe:16")
+        system_ex_ports: int = stream.u16be()
+        reserved_2: int = stream.u16be()
 
         return OkdExtendedPTrackInfoEntry(
             track_number,
@@ -75,18 +87,19 @@ class OkdExtendedPTrackInfoEntry(NamedTuple):
             reserved_2,
         )
 
-    def write(self, stream: bitstring.BitStream):
-        stream.append(bitstring.pack("uint:8", self.track_number))
-        stream.append(bitstring.pack("uint:8", self.track_status))
-        stream.append(bitstring.pack("uintbe:16", self.reserved_1))
-        for single_channel_group in self.single_channel_groups:
-            stream.append(bitstring.pack("uintbe:16", single_channel_group))
-        for channel_group in self.channel_groups:
-            stream.append(bitstring.pack("uintbe:16", channel_group))
+    def write(self, stream: bytearray | bitstring.BitStream):
+        stream += OkdExtendedPTrackInfoEntry.HEADER_LAYOUT.pack(
+            self.track_number,
+            self.track_status,
+            self.reserved_1,
+            *self.single_channel_groups,
+            *self.channel_groups,
+        )
         for channel_info_entry in self.channel_info:
             channel_info_entry.write(stream)
-        stream.append(bitstring.pack("uintbe:16", self.system_ex_ports))
-        stream.append(bitstring.pack("uintbe:16", self.reserved_2))
+        stream += OkdExtendedPTrackInfoEntry.FOOTER_LAYOUT.pack(
+            self.system_ex_ports, self.reserved_2
+        )
 
     track_number: int
     track_status: int
@@ -101,25 +114,28 @@ class OkdExtendedPTrackInfoEntry(NamedTuple):
 class OkdExtendedPTrackInfoChunk(NamedTuple):
     """DAM OKD Extended P-Track Information Chunk"""
 
+    # Unknown 8 bytes, TG mode and entry count
+    HEADER_LAYOUT = struct.Struct(">8xHH")
+
     __logger = getLogger("OkdExtendedPTrackInfoChunk")
 
     @staticmethod
-    def read(stream: bitstring.BitStream):
+    def read(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
         # Skip unknown
-        stream.bytepos += 8
-        tg_mode = stream.read("uintbe:16")
-        entry_count = stream.read("uintbe:16")
+        stream.skip(8)
+        tg_mode = stream.u16be()
+        entry_count = stream.u16be()
         data: list[OkdExtendedPTrackInfoEntry] = []
         for _ in range(entry_count):
             entry = OkdExtendedPTrackInfoEntry.read(stream)
             data.append(entry)
-        return OkdExtendedPTrackInfoChunk(tg_mode, data)
+        return OkdExtendedPTrackInfoChunk(tg_mode, OkdPTrackInfoList(data))
 
-    def write(self, stream: bitstring.BitStream):
-        # Write unknown
-        stream.append(b"\x00" * 8)
-        stream.append(bitstring.pack("uintbe:16", self.tg_mode))
-        stream.append(bitstring.pack("uintbe:16", len(self.data)))
+    def write(self, stream: bytearray | bitstring.BitStream):
+        stream += OkdExtendedPTrackInfoChunk.HEADER_LAYOUT.pack(
+            self.tg_mode, len(self.data)
+        )
         for entry in self.data:
             entry.write(stream)
 
@@ -146,7 +162,7 @@ class OkdExtendedPTrackInfoChunk(NamedTuple):
             )
         elif "data" in json_object:
             return OkdExtendedPTrackInfoChunk(
-                json_object["tg_mode"], json_object["data"]
+                json_object["tg_mode"], OkdPTrackInfoList(json_object["data"])
             )
 
     tg_mode: int
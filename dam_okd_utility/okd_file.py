@@ -1,11 +1,20 @@
-import bitstring
 from enum import Enum, auto
 import io
 import os
 import random
+from typing import Iterable
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.customized_logger import getLogger
-from dam_okd_utility.okd_scramble_pattern import OKD_SCRAMBLE_PATTERN
+from dam_okd_utility.okd_scramble import (
+    OKD_SCRAMBLE_DEFAULT_BLOCK_SIZE,
+    copy_stream,
+    descramble_stream,
+    detect_scramble_index,
+    next_scramble_pattern_index,
+    scramble_buffer,
+    scramble_stream,
+)
 from dam_okd_utility.okd_file_data import (
     GenericOkdHeader,
     MmtOkdHeader,
@@ -16,10 +25,11 @@ from dam_okd_utility.okd_file_data import (
     OkaHeader,
     OkdGenericChunk,
     OkdChunk,
+    OkdFileLayout,
 )
 from dam_okd_utility.okd_adpcm_chunk import OkdAdpcmChunk
 from dam_okd_utility.okd_m_track_chunk import OkdMTrackChunk
-from dam_okd_utility.okd_p_track_chunk import OkdPTrackChunk
+from dam_okd_utility.okd_p_track_chunk import OkdLazyPTrackChunk, OkdPTrackChunk
 from dam_okd_utility.okd_p_track_info_chunk import OkdPTrackInfoChunk
 from dam_okd_utility.okd_extended_p_track_info_chunk import OkdExtendedPTrackInfoChunk
 from dam_okd_utility.okd_p3_track_info_chunk import OkdP3TrackInfoChunk
@@ -51,8 +61,10 @@ class OkdFile:
     __logger = getLogger("OkdFile")
 
     @staticmethod
-    def __choose_scramble_pattern_index():
-        return random.randint(0x00, 0xFF)
+    def __choose_scramble_pattern_index(random_generator: random.Random | None = None):
+        if random_generator is None:
+            random_generator = random.Random()
+        return random_generator.randint(0x00, 0xFF)
 
     @staticmethod
     def __scramble(
@@ -61,27 +73,9 @@ class OkdFile:
         scramble_pattern_index: int,
         length: int | None = None,
     ):
-        start_position = input_stream.tell()
-        while length is None or (
-            length is not None and (input_stream.tell() - start_position) < length
-        ):
-            plaintext_buffer = input_stream.read(2)
-            if length is None and len(plaintext_buffer) == 0:
-                break
-            if len(plaintext_buffer) != 2:
-                raise RuntimeError("Invalid plaintext_buffer length.")
-            plaintext = int.from_bytes(plaintext_buffer, byteorder="big")
-            scramble_pattern: int
-            if scramble_pattern_index is None:
-                scramble_pattern = 0x17D7
-            else:
-                scramble_pattern = OKD_SCRAMBLE_PATTERN[scramble_pattern_index % 0x100]
-            scrambled = plaintext ^ scramble_pattern
-            scrambled_buffer = scrambled.to_bytes(2, byteorder="big")
-            output_stream.write(scrambled_buffer)
-            if scramble_pattern_index is not None:
-                scramble_pattern_index += 1
-        return scramble_pattern_index
+        return scramble_stream(
+            input_stream, output_stream, scramble_pattern_index, length
+        )
 
     @staticmethod
     def __detect_first_scramble_pattern_index(
@@ -104,29 +98,20 @@ class OkdFile:
             expected_magic_bytes = b"YOKA"
         else:
             raise RuntimeError(f"Invalid file_type. file_type={file_type}")
-        expected_magic_bytes_int = int.from_bytes(expected_magic_bytes, byteorder="big")
 
         magic_bytes_buffer = stream.read(4)
         if len(magic_bytes_buffer) != 4:
             raise RuntimeError("Invalid magic_bytes_int_buffer length.")
         stream.seek(-4, os.SEEK_CUR)
-        magic_bytes_int = int.from_bytes(magic_bytes_buffer, byteorder="big")
-        if magic_bytes_int != expected_magic_bytes_int:
+        scramble_pattern_index = detect_scramble_index(
+            magic_bytes_buffer, expected_magic_bytes
+        )
+        if scramble_pattern_index is not None:
             OkdFile.__logger.info("OKD file is scrambleed.")
-            expected_key = magic_bytes_int ^ expected_magic_bytes_int
-            for scramble_pattern_index in range(0x100):
-                candidated_key: int
-                if scramble_pattern_index == 0xFF:
-                    candidated_key = 0x87D2
-                else:
-                    candidated_key = OKD_SCRAMBLE_PATTERN[scramble_pattern_index + 1]
-                candidated_key |= OKD_SCRAMBLE_PATTERN[scramble_pattern_index] << 16
-                if expected_key == candidated_key:
-                    OkdFile.__logger.info(
-                        f"OKD file scramble_pattern_index detected. scramble_pattern_index={scramble_pattern_index}"
-                    )
-                    return scramble_pattern_index
-            raise RuntimeError("Failed to detect OKD file scramble_pattern_index.")
+            OkdFile.__logger.info(
+                f"OKD file scramble_pattern_index detected. scramble_pattern_index={scramble_pattern_index}"
+            )
+        return scramble_pattern_index
 
     @staticmethod
     def __descramble(
@@ -134,28 +119,17 @@ class OkdFile:
         output_stream: io.BufferedWriter,
         scramble_pattern_index: int | None,
         length: int | None = None,
+        block_size: int = OKD_SCRAMBLE_DEFAULT_BLOCK_SIZE,
+        workers: int | None = None,
     ):
-        start_position = input_stream.tell()
-        while length is None or (
-            length is not None and (input_stream.tell() - start_position) < length
-        ):
-            scrambled_buffer = input_stream.read(2)
-            if length is None and len(scrambled_buffer) == 0:
-                break
-            if len(scrambled_buffer) != 2:
-                raise RuntimeError("Invalid scrambled_buffer length.")
-            scrambled = int.from_bytes(scrambled_buffer, byteorder="big")
-            scramble_pattern: int
-            if scramble_pattern_index is None:
-                scramble_pattern = 0x17D7
-            else:
-                scramble_pattern = OKD_SCRAMBLE_PATTERN[scramble_pattern_index % 0x100]
-            plaintext = scrambled ^ scramble_pattern
-            plaintext_buffer = plaintext.to_bytes(2, byteorder="big")
-            output_stream.write(plaintext_buffer)
-            if scramble_pattern_index is not None:
-                scramble_pattern_index += 1
-        return scramble_pattern_index
+        return descramble_stream(
+            input_stream,
+            output_stream,
+            scramble_pattern_index,
+            length,
+            block_size,
+            workers,
+        )
 
     @staticmethod
     def __read_okd_header(stream: io.BufferedReader, scramble_pattern_index: int):
@@ -279,6 +253,7 @@ class OkdFile:
                     crc_yks_loader,
                     crc_yks_mmt_okd,
                     crc_yks_mmt_mmk_okd,
+                    crc_loader,
                 )
             elif option_data_length == 32:
                 yks_chunk_length = int.from_bytes(
@@ -299,7 +274,7 @@ class OkdFile:
                 crc_yks_loader = int.from_bytes(
                     option_data_buffer[20:22], byteorder="big"
                 )
-                crc_yks_mmk_okd = int.from_bytes(
+                crc_yks_mmt_okd = int.from_bytes(
                     option_data_buffer[22:24], byteorder="big"
                 )
                 crc_yks_mmt_mmk_okd = int.from_bytes(
@@ -427,39 +402,9 @@ class OkdFile:
             raise RuntimeError(f"Invalid file_type. file_type={file_type}")
 
     @staticmethod
-    def __peek_chunk_header(stream: io.BufferedReader):
-        while True:
-            chunk_header_buffer = stream.read(8)
-            chunk_header_length = len(chunk_header_buffer)
-            if chunk_header_length < 8:
-                stream.seek(-chunk_header_length, os.SEEK_CUR)
-                return
-            chunk_id = chunk_header_buffer[0:4]
-            chunk_size = int.from_bytes(chunk_header_buffer[4:8], byteorder="big")
-            stream.seek(-8, os.SEEK_CUR)
-            return (chunk_id, chunk_size)
-
-    @staticmethod
-    def __seek_chunk_header(stream: io.BufferedReader, chunk_id: bytes | None = None):
-        while True:
-            chunk_header = OkdFile.__peek_chunk_header(stream)
-            if chunk_header is None:
-                return
-            current_chunk_id, current_chunk_size = chunk_header
-            if chunk_id is None:
-                return (current_chunk_id, current_chunk_size)
-            else:
-                if current_chunk_id == chunk_id:
-                    return (current_chunk_id, current_chunk_size)
-            stream.seek(8 + current_chunk_size, os.SEEK_CUR)
-
-    @staticmethod
-    def descramble(
-        input_stream: io.BufferedReader,
-        chunks_stream: io.BufferedWriter,
-        file_type: OkdFileType,
-    ):
+    def read_layout(input_stream: io.BufferedReader, file_type: OkdFileType):
         # Detect and skip SPR header
+        input_stream.seek(0)
         spr_header_buffer = input_stream.read(4)
         if spr_header_buffer == b"SPRC":
             OkdFile.__logger.info("SPR hedaer detected.")
@@ -476,7 +421,8 @@ class OkdFile:
             input_stream, file_type, scramble_pattern_index
         )
 
-        data_offset = input_stream.tell() - start_position
+        chunks_position = input_stream.tell()
+        data_offset = chunks_position - start_position
         data_length = header.length - (data_offset - 8)
 
         extended_data_offset: int
@@ -486,54 +432,67 @@ class OkdFile:
             extended_data_offset = header.data_offset
         else:
             raise RuntimeError("Unknown header detected.")
-        if extended_data_offset != 0:
-            extended_data_offset -= 40
 
         extended_data_length: int
-        if header.adpcm_offset == 0:
+        if extended_data_offset == 0:
             extended_data_length = 0
         else:
-            extended_data_length = data_length - extended_data_offset
+            extended_data_length = data_length - (extended_data_offset - 40)
 
         scrambleed_length = data_length - extended_data_length
 
+        return OkdFileLayout(
+            header, scramble_pattern_index, chunks_position, scrambleed_length
+        )
+
+    @staticmethod
+    def descramble(
+        input_stream: io.BufferedReader,
+        chunks_stream: io.BufferedWriter,
+        file_type: OkdFileType,
+        block_size: int = OKD_SCRAMBLE_DEFAULT_BLOCK_SIZE,
+        workers: int | None = None,
+    ):
+        layout = OkdFile.read_layout(input_stream, file_type)
+
         # Descramble
         OkdFile.__descramble(
-            input_stream, chunks_stream, scramble_pattern_index, scrambleed_length
+            input_stream,
+            chunks_stream,
+            layout.scramble_pattern_index,
+            layout.scrambled_length,
+            block_size,
+            workers,
         )
         # Copy extended data
-        chunks_stream.write(input_stream.read())
+        copy_stream(input_stream, chunks_stream, block_size)
 
-        return header
+        return layout.header
 
     @staticmethod
     def index_chunk(stream: io.BufferedReader):
         index: list[tuple[int, int]] = []
 
-        last_position = -1
+        position = stream.tell()
         while True:
-            chunk_header = OkdFile.__seek_chunk_header(stream)
-            if chunk_header is None:
+            chunk_header_buffer = stream.read(8)
+            if len(chunk_header_buffer) < 8:
                 break
-            chunk_id, chunk_size = chunk_header
-            position = stream.tell()
-            if last_position != -1:
-                index.append((last_position, position - last_position))
-            last_position = position
-            stream.seek(8 + chunk_size, os.SEEK_CUR)
-
-        if last_position != -1:
-            position = stream.tell()
-            index.append((last_position, position - last_position))
+            chunk_size = int.from_bytes(chunk_header_buffer[4:8], byteorder="big")
+            index.append((position, 8 + chunk_size))
+            position += 8 + chunk_size
+            stream.seek(position)
+        stream.seek(position)
 
         return index
 
     @staticmethod
-    def parse_generic_chunk(buffer: bytes):
+    def parse_generic_chunk(buffer: bytes | memoryview):
+        buffer = memoryview(buffer)
         if len(buffer) < 8:
             raise RuntimeError("Invalid buffer length.")
 
-        chunk_id = buffer[0:4]
+        chunk_id = bytes(buffer[0:4])
         chunk_size = int.from_bytes(buffer[4:8], byteorder="big")
         chunk_data = buffer[8:]
         if len(chunk_data) != chunk_size:
@@ -542,16 +501,17 @@ class OkdFile:
         return OkdGenericChunk(chunk_id, chunk_data)
 
     @staticmethod
-    def parse_chunk(buffer: bytes):
+    def parse_chunk(buffer: bytes | memoryview, lazy_p_track=False):
+        buffer = memoryview(buffer)
         if len(buffer) < 8:
             raise RuntimeError("Invalid buffer length.")
 
-        chunk_id = buffer[0:4]
+        chunk_id = bytes(buffer[0:4])
         chunk_size = int.from_bytes(buffer[4:8], byteorder="big")
         chunk_data = buffer[8:]
         if len(chunk_data) != chunk_size:
             raise RuntimeError("Invalid chunk_data length.")
-        chunk_data_stream = bitstring.BitStream(chunk_data)
+        chunk_data_stream = ByteCursor(chunk_data)
 
         if chunk_id == b"YPTI":
             return OkdPTrackInfoChunk.read(chunk_data_stream)
@@ -562,6 +522,8 @@ class OkdFile:
         elif chunk_id[0:3] == b"\xffMR":
             return OkdMTrackChunk.read(chunk_data_stream, chunk_id[3])
         elif chunk_id[0:3] == b"\xffPR":
+            if lazy_p_track:
+                return OkdLazyPTrackChunk.read(chunk_data_stream, chunk_id[3])
             return OkdPTrackChunk.read(chunk_data_stream, chunk_id[3])
         elif chunk_id == b"YADD":
             return OkdAdpcmChunk.read(chunk_data_stream)
@@ -590,10 +552,9 @@ class OkdFile:
         )
 
     @staticmethod
-    def __write_chunk(stream: io.BufferedWriter, chunk: OkdChunk):
-        chunk_stream = bitstring.BitStream()
-        chunk.write(chunk_stream)
-        chunk_data_buffer: bytes = chunk_stream.bytes
+    def __encode_chunk(chunk: OkdChunk):
+        chunk_data_buffer = bytearray()
+        chunk.write(chunk_data_buffer)
         chunk_size = len(chunk_data_buffer)
         chunk_data_padding_length = chunk_size % 2
         if chunk_data_padding_length != 0:
@@ -610,7 +571,7 @@ class OkdFile:
         elif isinstance(chunk, OkdMTrackChunk):
             chunk_number_bytes = chunk.chunk_number.to_bytes(1, byteorder="big")
             chunk_id = b"\xffMR" + chunk_number_bytes
-        elif isinstance(chunk, OkdPTrackChunk):
+        elif isinstance(chunk, OkdPTrackChunk) or isinstance(chunk, OkdLazyPTrackChunk):
             chunk_number_bytes = chunk.chunk_number.to_bytes(1, byteorder="big")
             chunk_id = b"\xffPR" + chunk_number_bytes
         elif isinstance(chunk, OkdAdpcmChunk):
@@ -620,30 +581,73 @@ class OkdFile:
         else:
             raise ValueError("Unknown chunk type.")
 
-        stream.write(chunk_id)
         chunk_size_bytes = chunk_size.to_bytes(4, byteorder="big")
-        stream.write(chunk_size_bytes)
-        stream.write(chunk_data_buffer)
+        return b"".join([chunk_id, chunk_size_bytes, chunk_data_buffer])
+
+    @staticmethod
+    def __get_chunk_length(chunk: OkdChunk):
+        chunk_size: int
+        if isinstance(chunk, OkdGenericChunk):
+            chunk_size = len(chunk.data)
+        elif isinstance(chunk, OkdAdpcmChunk):
+            chunk_size = sum(
+                OkdAdpcmChunk.SIZE_LAYOUT.size + len(adpcm) for adpcm in chunk.adpcms
+            )
+        else:
+            # Encoded only to be measured, the buffer is not kept
+            return len(OkdFile.__encode_chunk(chunk))
+        return 8 + chunk_size + chunk_size % 2
 
     @staticmethod
-    def scramble(stream: io.BufferedWriter, chunks: list[OkdChunk]):
-        chunks_stream = io.BytesIO()
-        for chunk in chunks:
-            OkdFile.__write_chunk(chunks_stream, chunk)
+    def __write_scrambled_chunks(
+        stream: io.BufferedWriter,
+        chunk_buffers: Iterable[bytes],
+        scramble_pattern_index: int,
+    ):
+        chunks_length = 0
+        for chunk_buffer in chunk_buffers:
+            stream.write(scramble_buffer(chunk_buffer, scramble_pattern_index))
+            scramble_pattern_index = next_scramble_pattern_index(
+                scramble_pattern_index, len(chunk_buffer)
+            )
+            chunks_length += len(chunk_buffer)
         # Check sum?
-        chunks_stream.write(b"\x00\x00\x00\x00")
+        stream.write(scramble_buffer(b"\x00\x00\x00\x00", scramble_pattern_index))
+        return chunks_length + 4
 
-        chunks_stream_length = chunks_stream.getbuffer().nbytes
-        length = 32 + chunks_stream_length
-        header = GenericOkdHeader(
-            b"YKS1", length, b"YKS-1   v6.0v110", 0, 0, 1, b""
+    @staticmethod
+    def scramble(
+        stream: io.BufferedWriter,
+        chunks: Iterable[OkdChunk],
+        random_generator: random.Random | None = None,
+    ):
+        scramble_pattern_index = OkdFile.__choose_scramble_pattern_index(
+            random_generator
         )
 
-        scramble_pattern_index = OkdFile.__choose_scramble_pattern_index()
+        if not stream.seekable():
+            # The header length must be known before the first byte is written
+            chunks = list(chunks)
+            chunks_length = sum(map(OkdFile.__get_chunk_length, chunks))
+            header = GenericOkdHeader(
+                b"YKS1", 32 + chunks_length + 4, b"YKS-1   v6.0v110", 0, 0, 1, b""
+            )
+            OkdFile.__write_okd_header(stream, header, scramble_pattern_index)
+            OkdFile.__write_scrambled_chunks(
+                stream, map(OkdFile.__encode_chunk, chunks), scramble_pattern_index
+            )
+            return
 
+        # Write a placeholder header and patch the length after the chunks
+        header_position = stream.tell()
+        header = GenericOkdHeader(b"YKS1", 0, b"YKS-1   v6.0v110", 0, 0, 1, b"")
         OkdFile.__write_okd_header(stream, header, scramble_pattern_index)
-
-        chunks_stream.seek(0)
-        OkdFile.__scramble(
-            chunks_stream, stream, scramble_pattern_index, chunks_stream_length
+        chunks_length = OkdFile.__write_scrambled_chunks(
+            stream, map(OkdFile.__encode_chunk, chunks), scramble_pattern_index
         )
+        end_position = stream.tell()
+
+        header = header._replace(length=32 + chunks_length)
+        stream.seek(header_position)
+        OkdFile.__write_okd_header(stream, header, scramble_pattern_index)
+        stream.seek(end_position)
@@ -6,7 +6,7 @@ from dam_okd_utility.okd_p_track_info_chunk import OkdPTrackInfoChunk
 from dam_okd_utility.okd_extended_p_track_info_chunk import OkdExtendedPTrackInfoChunk
 from dam_okd_utility.okd_p3_track_info_chunk import OkdP3TrackInfoChunk
 from dam_okd_utility.okd_m_track_chunk import OkdMTrackChunk
-from dam_okd_utility.okd_p_track_chunk import OkdPTrackChunk
+from dam_okd_utility.okd_p_track_chunk import OkdLazyPTrackChunk, OkdPTrackChunk
 from dam_okd_utility.okd_adpcm_chunk import OkdAdpcmChunk
 
 
@@ -103,12 +103,25 @@ class OkaHeader(NamedTuple):
     crc_loader: int
 
 
+class OkdFileLayout(NamedTuple):
+    header: OkdHeader | OkaHeader
+    scramble_pattern_index: int | None
+    chunks_position: int
+    scrambled_length: int
+
+
+class OkdChunkIndexEntry(NamedTuple):
+    chunk_id: bytes
+    offset: int
+    size: int
+
+
 class OkdGenericChunk(NamedTuple):
-    def write(self, stream: bitstring.BitStream):
-        stream.append(self.data)
+    def write(self, stream: bytearray | bitstring.BitStream):
+        stream += bytes(self.data)
 
     chunk_id: bytes
-    data: bytes
+    data: bytes | memoryview
 
 
 OkdChunk = Union[
@@ -118,5 +131,6 @@ OkdChunk = Union[
     OkdP3TrackInfoChunk,
     OkdMTrackChunk,
     OkdPTrackChunk,
+    OkdLazyPTrackChunk,
     OkdAdpcmChunk,
 ]
@@ -2,6 +2,7 @@ import bitstring
 import mido
 from typing import NamedTuple
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.customized_logger import getLogger
 from dam_okd_utility.midi import (
     get_first_tempo,
@@ -12,6 +13,7 @@ from dam_okd_utility.midi import (
 )
 from dam_okd_utility.okd_midi import OkdMidiMessage
 from dam_okd_utility.okd_m_track_midi import OkdMTrackMidi
+from dam_okd_utility.standard_midi_file import StandardMidiFile
 
 
 class OkdMTrackInterpretation(NamedTuple):
@@ -33,7 +35,7 @@ class OkdMTrackChunk(NamedTuple):
     __logger = getLogger("OkdMTrackChunk")
 
     @staticmethod
-    def read(stream: bitstring.BitStream, chunk_number: int):
+    def read(stream: ByteCursor | bitstring.BitStream, chunk_number: int):
         messages = OkdMTrackMidi.read(stream)
         return OkdMTrackChunk(chunk_number, messages)
 
@@ -205,6 +207,98 @@ class OkdMTrackChunk(NamedTuple):
         if len(melody_notes) < 1:
             raise ValueError("Melody note not found.")
 
+        return OkdMTrackChunk.__from_timings(
+            karaoke_midi.ticks_per_beat,
+            first_note_on_time,
+            last_note_off_time,
+            hooks,
+            two_chorus_fadeout_time,
+        )
+
+    @staticmethod
+    def from_smf(karaoke_smf: StandardMidiFile):
+        karaoke_smf_m_tracks = karaoke_smf.get_port_tracks(
+            OkdMTrackChunk.MIDI_M_TRACK_PORT
+        )
+        if len(karaoke_smf_m_tracks) == 0:
+            OkdMTrackChunk.__logger.warning("M-Track not found.")
+
+        melody_track = karaoke_smf.get_port_channel_track(1, 8)
+        if melody_track is None:
+            raise ValueError("Melody track not found.")
+
+        karaoke_smf_tempo = karaoke_smf.get_first_tempo()
+        ppq_conversion_ratio = 480.0 / karaoke_smf.ticks_per_beat
+        tempo_conversion_ratio = 125.0 / mido.tempo2bpm(karaoke_smf_tempo)
+        time_conversion_ratio = ppq_conversion_ratio * tempo_conversion_ratio
+
+        first_note_on_time = round(
+            karaoke_smf.get_first_note_on_time() * time_conversion_ratio
+        )
+        last_note_off_time = round(
+            karaoke_smf.get_last_note_off_time() * time_conversion_ratio
+        )
+
+        hooks: list[tuple[int, int]] = []
+
+        current_hook_start = -1
+        two_chorus_fadeout_time = -1
+
+        if len(karaoke_smf_m_tracks) != 0:
+            for event in karaoke_smf_m_tracks[0]:
+                status_type = event.data[0] & 0xF0
+                if status_type == 0x90:
+                    if event.data[1] == 48:
+                        current_hook_start = round(event.time * time_conversion_ratio)
+                    elif event.data[1] == 72:
+                        two_chorus_fadeout_time = round(
+                            event.time * time_conversion_ratio
+                        )
+                elif status_type == 0x80:
+                    if event.data[1] == 48:
+                        hooks.append(
+                            (
+                                current_hook_start,
+                                round(event.time * time_conversion_ratio),
+                            )
+                        )
+
+        melody_notes: list[tuple[int, int]] = []
+        current_melody_note_start = -1
+        current_melody_node_number = -1
+
+        for event in melody_track:
+            status_type = event.data[0] & 0xF0
+            if status_type == 0x90:
+                current_melody_note_start = round(event.time * time_conversion_ratio)
+                current_melody_node_number = event.data[1]
+            elif status_type == 0x80 and event.data[1] == current_melody_node_number:
+                melody_notes.append(
+                    (
+                        current_melody_note_start,
+                        round(event.time * time_conversion_ratio),
+                    )
+                )
+
+        if len(melody_notes) < 1:
+            raise ValueError("Melody note not found.")
+
+        return OkdMTrackChunk.__from_timings(
+            karaoke_smf.ticks_per_beat,
+            first_note_on_time,
+            last_note_off_time,
+            hooks,
+            two_chorus_fadeout_time,
+        )
+
+    @staticmethod
+    def __from_timings(
+        ticks_per_beat: int,
+        first_note_on_time: int,
+        last_note_off_time: int,
+        hooks: list[tuple[int, int]],
+        two_chorus_fadeout_time: int,
+    ):
         # melody_notes_copy = melody_notes.copy()
         # visible_guide_melody_delimiters: list[tuple[int, int]] = []
         # current_page_start = -1
@@ -252,7 +346,7 @@ class OkdMTrackChunk(NamedTuple):
                 absolute_time_messages.append((current_beat_time, b"\xF1"))
                 current_beat_count = 1
 
-            current_beat_time += karaoke_midi.ticks_per_beat
+            current_beat_time += ticks_per_beat
 
         absolute_time_messages.append((0, b"\xFF\x00\x04\x02\xFE"))
 
@@ -375,7 +469,7 @@ class OkdMTrackChunk(NamedTuple):
 
         return midi
 
-    def write(self, stream: bitstring.BitStream):
+    def write(self, stream: bytearray | bitstring.BitStream):
         OkdMTrackMidi.write(stream, self.messages)
 
     def to_json_serializable(self):
@@ -1,10 +1,12 @@
 import bitstring
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.customized_logger import getLogger
 from dam_okd_utility.okd_midi import (
+    STATUS_BYTE_PATTERN,
     is_data_bytes,
     read_extended_variable_int,
-    write_extended_variable_int,
+    encode_extended_variable_int,
     OkdMidiGenericMessage,
     OkdMidiMessage,
 )
@@ -29,17 +31,18 @@ class OkdMTrackMidi:
         return absolute_track
 
     @staticmethod
-    def read(stream: bitstring.BitStream):
+    def read(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
         track: list[OkdMidiMessage] = []
 
         while True:
-            end_of_track: bytes = stream.peek("bytes:4")
+            end_of_track: bytes = stream.peek(4)
             if end_of_track == b"\x00\x00\x00\x00":
                 break
 
             delta_time = read_extended_variable_int(stream)
 
-            status_byte = stream.read("uint:8")
+            status_byte = stream.u8()
             if status_byte == 0x00:
                 break
             if status_byte & 0x80 != 0x80:
@@ -51,22 +54,14 @@ class OkdMTrackMidi:
             data_length = 0
             # System messages
             if status_byte == 0xFF:
-                start_position = stream.bytepos
-                unterminated_sysex_detected = False
-                while True:
-                    byte = stream.read("uint:8")
-                    if byte & 0x80 == 0x80:
-                        if byte != 0xFE:
-                            OkdMTrackMidi.__logger.warning(
-                                f"Unterminated SysEx message detected. stop_byte={hex(byte)}"
-                            )
-                            unterminated_sysex_detected = True
-                        data_length = stream.bytepos - start_position
-                        stream.bytepos = start_position
-                        break
-                if unterminated_sysex_detected:
+                stop_position = stream.search(STATUS_BYTE_PATTERN)
+                stop_byte = stream.buffer[stop_position]
+                if stop_byte != 0xFE:
+                    OkdMTrackMidi.__logger.warning(
+                        f"Unterminated SysEx message detected. stop_byte={hex(stop_byte)}"
+                    )
                     continue
-                stream.bytepos = start_position
+                data_length = stop_position + 1 - stream.bytepos
             elif status_byte == 0xF1:
                 data_length = 0
             elif status_byte == 0xF2:
@@ -87,7 +82,7 @@ class OkdMTrackMidi:
                 )
 
             status_buffer = status_byte.to_bytes(1, byteorder="big")
-            data_buffer = stream.read(8 * data_length).bytes
+            data_buffer = stream.slice(data_length)
             message_buffer = status_buffer + data_buffer
             if status_byte != 0xFF and not is_data_bytes(data_buffer):
                 OkdMTrackMidi.__logger.warning(
@@ -100,10 +95,12 @@ class OkdMTrackMidi:
         return track
 
     @staticmethod
-    def write(stream: bitstring.BitStream, track: list[OkdMidiMessage]):
+    def write(stream: bytearray | bitstring.BitStream, track: list[OkdMidiMessage]):
+        buffers: list[bytes] = []
         for message in track:
-            write_extended_variable_int(stream, message.delta_time)
-            stream.append(message.data)
+            buffers.append(encode_extended_variable_int(message.delta_time))
+            buffers.append(message.data)
 
         # End of track
-        stream.append(b"\x00\x00\x00\x00\x00\x00\x00\x00")
+        buffers.append(b"\x00\x00\x00\x00\x00\x00\x00\x00")
+        stream += b"".join(buffers)
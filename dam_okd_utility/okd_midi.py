@@ -1,69 +1,118 @@
+import array
 import bitstring
+import functools
+import re
 from typing import NamedTuple, Union
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.customized_logger import getLogger
 
 __logger = getLogger("OkdMidi")
 
+STATUS_BYTE_PATTERN = re.compile(b"[\x80-\xff]")
 
-def read_status_byte(stream: bitstring.BitStream):
-    byte: int = stream.read("uint:8")
+MAX_INTERNED_DATA_LENGTH = 4
+MAX_INTERNED_DATA_COUNT = 0x10000
+__interned_data: dict[bytes, bytes] = {}
+
+
+def read_status_byte(stream: ByteCursor | bitstring.BitStream):
+    stream = ByteCursor.from_stream(stream)
+    byte = stream.u8()
     if byte & 0x80 != 0x80:
         position = stream.bytepos
         raise ValueError(f"Invalid status byte. byte={byte} position={position}")
     return byte
 
 
-def peek_status_byte(stream: bitstring.BitStream):
-    byte: int = stream.peek("uint:8")
+def peek_status_byte(stream: ByteCursor | bitstring.BitStream):
+    stream = ByteCursor.from_stream(stream)
+    byte = stream.peek_u8()
     if byte & 0x80 != 0x80:
         position = stream.bytepos
         raise ValueError(f"Invalid status byte. byte={byte} position={position}")
     return byte
 
 
-def read_data_byte(stream: bitstring.BitStream):
-    byte: int = stream.read("uint:8")
+def read_data_byte(stream: ByteCursor | bitstring.BitStream):
+    stream = ByteCursor.from_stream(stream)
+    byte = stream.u8()
     if byte & 0x80 == 0x80:
         position = stream.bytepos
         raise ValueError(f"Invalid data byte. byte={byte} position={position}")
     return byte
 
 
-def peek_data_byte(stream: bitstring.BitStream):
-    byte: int = stream.peek("uint:8")
+def peek_data_byte(stream: ByteCursor | bitstring.BitStream):
+    stream = ByteCursor.from_stream(stream)
+    byte = stream.peek_u8()
     if byte & 0x80 == 0x80:
         position = stream.bytepos
         raise ValueError(f"Invalid data byte. byte={byte} position={position}")
     return byte
 
 
-def is_data_bytes(data: bytes):
-    for byte in data:
-        if byte & 0x80 == 0x80:
-            return False
-    return True
+def is_data_bytes(data: bytes | bytearray | memoryview):
+    if isinstance(data, memoryview):
+        return STATUS_BYTE_PATTERN.search(data) is None
+    return data.isascii()
+
 
+def find_invalid_data_bytes(
+    buffer: bytes | bytearray | memoryview, start=0, end: int | None = None
+):
+    if end is None:
+        end = len(buffer)
+    return [match.start() for match in STATUS_BYTE_PATTERN.finditer(buffer, start, end)]
 
-def read_variable_int(stream: bitstring.BitStream):
+
+def decode_variable_int(buffer: bytes | bytearray | memoryview, offset: int):
     value = 0
-    for i in range(3):
-        byte: int = read_data_byte(stream)
-        value += byte << (i * 6)
+    for shift in (0, 6, 12):
+        try:
+            byte = buffer[offset]
+        except IndexError:
+            raise bitstring.ReadError(
+                f"Reading off the end of the data. position={offset}"
+            ) from None
+        offset += 1
+        if byte & 0x80 == 0x80:
+            raise ValueError(f"Invalid data byte. byte={byte} position={offset}")
+        value += byte << shift
         if byte & 0x40 != 0x40:
-            return value
+            return value, offset
+
+    raise ValueError(f"Invalid byte sequence. position={offset}")
+
+
+def decode_variable_ints(
+    buffer: bytes | bytearray | memoryview, offset: int, count: int | None = None
+):
+    values = array.array("I")
+    end_offset = len(buffer)
+    while (count is None and offset < end_offset) or (
+        count is not None and len(values) < count
+    ):
+        value, offset = decode_variable_int(buffer, offset)
+        values.append(value)
+    return values, offset
 
-    position = stream.bytepos
-    raise ValueError(f"Invalid byte sequence. position={position}")
 
+def read_variable_int(stream: ByteCursor | bitstring.BitStream):
+    stream = ByteCursor.from_stream(stream)
+    value, stream.bytepos = decode_variable_int(stream.buffer, stream.bytepos)
+    return value
 
-def write_variable_int(stream: bitstring.BitStream, value: int):
+
+@functools.lru_cache(maxsize=4096)
+def encode_variable_int(value: int):
     if 0x04103F < value:
         raise ValueError("Too big value. Use write_extended_variable_int.")
 
     if value == 0x000000:
-        stream.append(b"\x00")
-        return
+        return b"\x00"
+
+    buffer = bytearray()
 
     for i in range(3):
         masked_value = value & (0x3F << (i * 6))
@@ -74,38 +123,76 @@ def write_variable_int(stream: bitstring.BitStream, value: int):
             next_value -= 0x40 << (i * 6)
         value = next_value
 
-        stream.append(bitstring.pack("uint:8", byte))
+        buffer.append(byte)
 
         if value == 0x000000:
             if byte & 0x40:
-                stream.append(b"\x00")
+                buffer.append(0x00)
             break
 
+    return bytes(buffer)
+
 
-def read_extended_variable_int(stream: bitstring.BitStream):
-    total_duration = 0
+def write_variable_int(stream: bytearray | bitstring.BitStream, value: int):
+    stream += encode_variable_int(value)
+
+
+def decode_extended_variable_int(buffer: bytes | bytearray | memoryview, offset: int):
+    total_value = 0
     while True:
         try:
-            byte = peek_data_byte(stream)
-            if byte == 0x00:
-                stream.bytepos += 1
-                break
-        except ValueError:
+            byte = buffer[offset]
+        except IndexError:
+            raise bitstring.ReadError(
+                f"Reading off the end of the data. position={offset}"
+            ) from None
+        # A status byte follows without a terminator
+        if byte & 0x80 == 0x80:
+            break
+        if byte == 0x00:
+            offset += 1
             break
 
-        total_duration += read_variable_int(stream)
+        value, offset = decode_variable_int(buffer, offset)
+        total_value += value
 
-    return total_duration
+    return total_value, offset
 
 
-def write_extended_variable_int(stream: bitstring.BitStream, value: int):
-    if value == 0x000000:
-        return
+def read_extended_variable_int(stream: ByteCursor | bitstring.BitStream):
+    stream = ByteCursor.from_stream(stream)
+    value, stream.bytepos = decode_extended_variable_int(stream.buffer, stream.bytepos)
+    return value
+
 
+@functools.lru_cache(maxsize=4096)
+def encode_extended_variable_int(value: int):
+    buffers: list[bytes] = []
     while 0x000000 < value:
         write_value = min(value, 0x04103F)
-        write_variable_int(stream, write_value)
+        buffers.append(encode_variable_int(write_value))
         value -= write_value
+    return b"".join(buffers)
+
+
+def write_extended_variable_int(stream: bytearray | bitstring.BitStream, value: int):
+    stream += encode_extended_variable_int(value)
+
+
+def intern_data(data: bytes):
+    if MAX_INTERNED_DATA_LENGTH < len(data):
+        return data
+
+    interned = __interned_data.get(data)
+    if interned is not None:
+        return interned
+    if len(__interned_data) < MAX_INTERNED_DATA_COUNT:
+        __interned_data[data] = data
+    return data
+
+
+def clear_interned_data():
+    __interned_data.clear()
 
 
 class OkdMidiGenericMessage(NamedTuple):
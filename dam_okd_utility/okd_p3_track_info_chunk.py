@@ -1,18 +1,25 @@
 import bitstring
+import functools
+import struct
 from typing import NamedTuple
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.customized_logger import getLogger
+from dam_okd_utility.okd_p_track_midi_data import OkdPTrackInfoList
 
 
 class OkdP3TrackInfoChannelInfoEntry(NamedTuple):
     """DAM OKD P3-Track Information Channel Information Entry"""
 
+    LAYOUT = struct.Struct(">BBBB")
+
     @staticmethod
-    def read(stream: bitstring.BitStream):
-        attribute: int = stream.read("uint:8")
-        ports: int = stream.read("uint:8") & 0x07
-        control_change_ax: int = stream.read("uint:8")
-        control_change_cx: int = stream.read("uint:8")
+    def read(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
+        attribute: int = stream.u8()
+        ports: int = stream.u8() & 0x07
+        control_change_ax: int = stream.u8()
+        control_change_cx: int = stream.u8()
         return OkdP3TrackInfoChannelInfoEntry(
             attribute, ports, control_change_ax, control_change_cx
         )
@@ -23,11 +30,10 @@ class OkdP3TrackInfoChannelInfoEntry(NamedTuple):
     def is_guide_melody(self):
         return self.attribute & 0x80 != 0x80
 
-    def write(self, stream: bitstring.BitStream):
-        stream.append(bitstring.pack("uint:8", self.attribute))
-        stream.append(bitstring.pack("uint:8", self.ports))
-        stream.append(bitstring.pack("uint:8", self.control_change_ax))
-        stream.append(bitstring.pack("uint:8", self.control_change_cx))
+    def write(self, stream: bytearray | bitstring.BitStream):
+        stream += OkdP3TrackInfoChannelInfoEntry.LAYOUT.pack(
+            self.attribute, self.ports, self.control_change_ax, self.control_change_cx
+        )
 
     attribute: int
     ports: int
@@ -35,35 +41,41 @@ class OkdP3TrackInfoChannelInfoEntry(NamedTuple):
     control_change_cx: int
 
 
-class OkdP3TrackInfoChunk(NamedTuple):
-    """DAM OKD P3-Track Information Chunk"""
+class OkdP3TrackInfoEntry(NamedTuple):
+    """DAM OKD P3-Track Information Entry"""
+
+    HEADER_LAYOUT = struct.Struct(">BBH")
+    SINGLE_CHANNEL_GROUP_LAYOUT = struct.Struct(">H")
+    CHANNEL_GROUPS_LAYOUT = struct.Struct(">16H")
+    SYSTEM_EX_PORTS_LAYOUT = struct.Struct("<H")
 
     __logger = getLogger("OkdP3TrackInfoEntry")
 
     @staticmethod
-    def read(stream: bitstring.BitStream):
-        track_number: int = stream.read("uint:8")
-        track_status: int = stream.read("uint:8")
-        use_channel_group_flag: int = stream.read("uintbe:16")
+    def read(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
+        track_number: int = stream.u8()
+        track_status: int = stream.u8()
+        use_channel_group_flag: int = stream.u16be()
 
         single_channel_groups: list[int] = []
         for channel in range(16):
             if (use_channel_group_flag >> channel) & 0x0001 == 0x0001:
-                single_channel_groups.append(stream.read("uintbe:16"))
+                single_channel_groups.append(stream.u16be())
             else:
                 single_channel_groups.append(0x0000)
 
         channel_groups: list[int] = []
         for channel in range(16):
-            channel_groups.append(stream.read("uintbe:16"))
+            channel_groups.append(stream.u16be())
 
         channel_info: list[int] = []
         for channel in range(16):
             channel_info.append(OkdP3TrackInfoChannelInfoEntry.read(stream))
 
-        system_ex_ports: int = stream.read("uintle:16")
+        system_ex_ports: int = stream.u16le()
 
-        return OkdP3TrackInfoChunk(
+        return OkdP3TrackInfoEntry(
             track_number,
             track_status,
             use_channel_group_flag,
@@ -73,18 +85,43 @@ class OkdP3TrackInfoChunk(NamedTuple):
             system_ex_ports,
         )
 
-    def write(self, stream: bitstring.BitStream):
-        stream.append(bitstring.pack("uint:8", self.track_number))
-        stream.append(bitstring.pack("uint:8", self.track_status))
-        stream.append(bitstring.pack("uintbe:16", self.use_channel_group_flag))
+    def write(self, stream: bytearray | bitstring.BitStream):
+        stream += OkdP3TrackInfoEntry.HEADER_LAYOUT.pack(
+            self.track_number, self.track_status, self.use_channel_group_flag
+        )
         for channel, single_channel_group in enumerate(self.single_channel_groups):
             if (self.use_channel_group_flag >> channel) & 0x0001 == 0x0001:
-                stream.append(bitstring.pack("uintbe:16", single_channel_group))
-        for channel_group in self.channel_groups:
-            stream.append(bitstring.pack("uintbe:16", channel_group))
+                stream += OkdP3TrackInfoEntry.SINGLE_CHANNEL_GROUP_LAYOUT.pack(
+                    single_channel_group
+                )
+        stream += OkdP3TrackInfoEntry.CHANNEL_GROUPS_LAYOUT.pack(*self.channel_groups)
         for channel_info_entry in self.channel_info:
             channel_info_entry.write(stream)
-        stream.append(bitstring.pack("uintle:16", self.system_ex_ports))
+        stream += OkdP3TrackInfoEntry.SYSTEM_EX_PORTS_LAYOUT.pack(self.system_ex_ports)
+
+    track_number: int
+    track_status: int
+    use_channel_group_flag: int
+    single_channel_groups: list[int]
+    channel_groups: list[int]
+    channel_info: list[OkdP3TrackInfoChannelInfoEntry]
+    system_ex_ports: int
+
+
+class OkdP3TrackInfoChunk(OkdP3TrackInfoEntry):
+    """DAM OKD P3-Track Information Chunk"""
+
+    @staticmethod
+    def read(stream: ByteCursor | bitstring.BitStream):
+        chunk = OkdP3TrackInfoChunk(*OkdP3TrackInfoEntry.read(stream))
+        # Derived once at parse time
+        chunk.track_info
+        return chunk
+
+    @functools.cached_property
+    def track_info(self):
+        # The chunk is its own single entry
+        return OkdPTrackInfoList([self])
 
     @staticmethod
     def from_json_object(json_object: object):
@@ -96,7 +133,7 @@ class OkdP3TrackInfoChunk(NamedTuple):
                 json_object["control_change_cx"],
             )
         elif "track_number" in json_object:
-            return OkdP3TrackInfoChunk(
+            chunk = OkdP3TrackInfoChunk(
                 json_object["track_number"],
                 json_object["track_status"],
                 json_object["use_channel_group_flag"],
@@ -105,11 +142,5 @@ class OkdP3TrackInfoChunk(NamedTuple):
                 json_object["channel_info"],
                 json_object["system_ex_ports"],
             )
-
-    track_number: int
-    track_status: int
-    use_channel_group_flag: int
-    single_channel_groups: list[int]
-    channel_groups: list[int]
-    channel_info: list[OkdP3TrackInfoChannelInfoEntry]
-    system_ex_ports: int
+            chunk.track_info
+            return chunk
@@ -1,13 +1,18 @@
 import bitstring
 import mido
-from typing import NamedTuple
+from typing import Iterable, NamedTuple
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.customized_logger import getLogger
 from dam_okd_utility.okd_midi import OkdMidiMessage
 from dam_okd_utility.okd_p_track_midi import OkdPTrackMidi
 from dam_okd_utility.okd_p_track_info_chunk import OkdPTrackInfoEntry
 from dam_okd_utility.okd_extended_p_track_info_chunk import OkdExtendedPTrackInfoEntry
 from dam_okd_utility.okd_p3_track_info_chunk import OkdP3TrackInfoChunk
+from dam_okd_utility.standard_midi_file import (
+    StandardMidiFile,
+    StandardMidiFileWriter,
+)
 
 
 class OkdPTrackChunk(NamedTuple):
@@ -18,11 +23,11 @@ class OkdPTrackChunk(NamedTuple):
     __logger = getLogger("OkdPTrackChunk")
 
     @staticmethod
-    def read(stream: bitstring.BitStream, chunk_number: int):
+    def read(stream: ByteCursor | bitstring.BitStream, chunk_number: int):
         messages = OkdPTrackMidi.read(stream)
         return OkdPTrackChunk(chunk_number, messages)
 
-    def write(self, stream: bitstring.BitStream):
+    def write(self, stream: bytearray | bitstring.BitStream):
         OkdPTrackMidi.write(stream, self.messages)
 
     @staticmethod
@@ -38,29 +43,25 @@ class OkdPTrackChunk(NamedTuple):
         return p_track_chunks
 
     @staticmethod
-    def to_midi(
+    def from_smf(smf: StandardMidiFile):
+        relative_time_tracks = OkdPTrackMidi.smf_to_relative_time_tracks(smf)
+        p_track_chunks: list[OkdPTrackChunk] = []
+        for track_index, relative_time_track in enumerate(relative_time_tracks):
+            if relative_time_track is None:
+                continue
+
+            p_track_chunks.append(OkdPTrackChunk(track_index, relative_time_track))
+
+        return p_track_chunks
+
+    @staticmethod
+    def __iter_track_messages(
         track_info: list[OkdPTrackInfoEntry]
         | list[OkdExtendedPTrackInfoEntry]
         | list[OkdP3TrackInfoChunk],
         relative_time_tracks: list[tuple[int, list[OkdMidiMessage]]],
-        general_midi=True,
+        general_midi: bool,
     ):
-        midi = mido.MidiFile()
-        for port in range(OkdPTrackMidi.PORT_COUNT):
-            for channel in range(OkdPTrackMidi.CHANNEL_COUNT_PER_PORT):
-                midi_track = mido.MidiTrack()
-                # Port
-                midi_track.append(
-                    mido.MetaMessage(
-                        "midi_port",
-                        port=port,
-                    )
-                )
-                midi.tracks.append(midi_track)
-
-        # Tempo
-        midi.tracks[0].append(mido.MetaMessage("set_tempo", tempo=mido.bpm2tempo(125)))
-
         absolute_time_track = (
             OkdPTrackMidi.relative_time_tracks_to_absolute_time_tracks(
                 track_info, relative_time_tracks, general_midi
@@ -88,18 +89,91 @@ class OkdPTrackChunk(NamedTuple):
             delta_time = message.time - track_current_times[message.track]
             track_current_times[message.track] = message.time
 
+            yield message.track, delta_time, message.data
+
+    @staticmethod
+    def to_midi(
+        track_info: list[OkdPTrackInfoEntry]
+        | list[OkdExtendedPTrackInfoEntry]
+        | list[OkdP3TrackInfoChunk],
+        relative_time_tracks: list[tuple[int, list[OkdMidiMessage]]],
+        general_midi=True,
+    ):
+        midi = mido.MidiFile()
+        for port in range(OkdPTrackMidi.PORT_COUNT):
+            for channel in range(OkdPTrackMidi.CHANNEL_COUNT_PER_PORT):
+                midi_track = mido.MidiTrack()
+                # Port
+                midi_track.append(
+                    mido.MetaMessage(
+                        "midi_port",
+                        port=port,
+                    )
+                )
+                midi.tracks.append(midi_track)
+
+        # Tempo
+        midi.tracks[0].append(mido.MetaMessage("set_tempo", tempo=mido.bpm2tempo(125)))
+
+        for track, delta_time, data in OkdPTrackChunk.__iter_track_messages(
+            track_info, relative_time_tracks, general_midi
+        ):
             midi_message: mido.Message
             try:
-                midi_message = mido.Message.from_bytes(message.data, delta_time)
+                midi_message = mido.Message.from_bytes(data, delta_time)
             except ValueError:
                 OkdPTrackChunk.__logger.warning(
-                    f"Invalid message data. status_byte={hex(status_byte)}"
+                    f"Invalid message data. status_byte={hex(data[0])}"
                 )
                 continue
-            midi.tracks[message.track].append(midi_message)
+            midi.tracks[track].append(midi_message)
 
         return midi
 
+    @staticmethod
+    def to_smf(
+        track_info: list[OkdPTrackInfoEntry]
+        | list[OkdExtendedPTrackInfoEntry]
+        | list[OkdP3TrackInfoChunk],
+        relative_time_tracks: list[tuple[int, list[OkdMidiMessage]]],
+        general_midi=True,
+    ):
+        smf_writer = StandardMidiFileWriter(OkdPTrackMidi.TOTAL_CHANNEL_COUNT)
+        for port in range(OkdPTrackMidi.PORT_COUNT):
+            for channel in range(OkdPTrackMidi.CHANNEL_COUNT_PER_PORT):
+                # Port
+                smf_writer.append_meta_message(
+                    port * OkdPTrackMidi.CHANNEL_COUNT_PER_PORT + channel,
+                    0,
+                    0x21,
+                    port.to_bytes(1, byteorder="big"),
+                )
+
+        # Tempo
+        smf_writer.append_meta_message(
+            0, 0, 0x51, mido.bpm2tempo(125).to_bytes(3, byteorder="big")
+        )
+
+        for track, delta_time, data in OkdPTrackChunk.__iter_track_messages(
+            track_info, relative_time_tracks, general_midi
+        ):
+            try:
+                data = StandardMidiFileWriter.normalize_message(data)
+            except ValueError:
+                OkdPTrackChunk.__logger.warning(
+                    f"Invalid message data. status_byte={hex(data[0])}"
+                )
+                continue
+            smf_writer.append_message(track, delta_time, data)
+
+        # The first track keeps the tempo
+        track_indices = [
+            track_index
+            for track_index, message_count in enumerate(smf_writer.message_counts)
+            if track_index == 0 or message_count != 0
+        ]
+        return smf_writer.to_bytes(track_indices)
+
     def to_json_serializable(self):
         json_track = []
         for message in self.messages:
@@ -114,3 +188,60 @@ class OkdPTrackChunk(NamedTuple):
 
     chunk_number: int
     messages: list[OkdMidiMessage]
+
+
+class OkdLazyPTrackChunk:
+    """DAM OKD P-Track Chunk decoded on first access"""
+
+    def __init__(self, chunk_number: int, buffer: bytes | memoryview):
+        self.chunk_number = chunk_number
+        self.buffer = buffer
+        self.__messages: tuple[OkdMidiMessage, ...] | None = None
+        self.__is_modified = False
+
+    @staticmethod
+    def read(stream: ByteCursor | bitstring.BitStream, chunk_number: int):
+        stream = ByteCursor.from_stream(stream)
+        return OkdLazyPTrackChunk(chunk_number, stream.slice())
+
+    @property
+    def size(self):
+        return len(self.buffer)
+
+    @property
+    def is_decoded(self):
+        return self.__messages is not None
+
+    @property
+    def messages(self):
+        # Immutable, edits go through the setter so that write() sees them
+        if self.__messages is None:
+            self.__messages = tuple(OkdPTrackMidi.read(ByteCursor(self.buffer)))
+        return self.__messages
+
+    @messages.setter
+    def messages(self, messages: Iterable[OkdMidiMessage]):
+        self.__messages = tuple(messages)
+        self.__is_modified = True
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def iter_messages(self):
+        if self.__messages is not None:
+            return iter(self.__messages)
+        # Decode one event per step without materializing the message list
+        return OkdPTrackMidi.iter_messages(ByteCursor(self.buffer))
+
+    def write(self, stream: bytearray | bitstring.BitStream):
+        if not self.__is_modified:
+            # Decoding does not round-trip durations, re-emit the original bytes
+            stream += bytes(self.buffer)
+            return
+        OkdPTrackMidi.write(stream, self.__messages)
+
+    def to_chunk(self):
+        return OkdPTrackChunk(self.chunk_number, list(self.messages))
+
+    def to_json_serializable(self):
+        return self.to_chunk().to_json_serializable()
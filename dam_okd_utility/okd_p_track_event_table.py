@@ -0,0 +1,62 @@
+import array
+
+from dam_okd_utility.okd_midi import OkdMidiGenericMessage, intern_data
+
+
+class OkdPTrackEventTable:
+    """DAM OKD P-Track Event Table"""
+
+    def __init__(self, buffer: bytes | memoryview):
+        self.buffer = buffer
+        self.delta_times = array.array("Q")
+        self.absolute_times = array.array("Q")
+        self.statuses = array.array("B")
+        # Offset and length of the whole message, including the status byte
+        self.data_offsets = array.array("I")
+        self.data_lengths = array.array("I")
+        self.durations = array.array("I")
+
+    def __len__(self):
+        return len(self.delta_times)
+
+    def __getitem__(self, index: int):
+        data_offset = self.data_offsets[index]
+        data = self.buffer[data_offset : data_offset + self.data_lengths[index]]
+        return OkdMidiGenericMessage(
+            self.delta_times[index], intern_data(bytes(data)), self.durations[index]
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def nbytes(self):
+        return sum(
+            column.itemsize * len(column)
+            for column in [
+                self.delta_times,
+                self.absolute_times,
+                self.statuses,
+                self.data_offsets,
+                self.data_lengths,
+                self.durations,
+            ]
+        )
+
+    def append(
+        self, delta_time: int, data_offset: int, data_length: int, duration: int
+    ):
+        absolute_time = delta_time
+        if 0 < len(self.absolute_times):
+            absolute_time += self.absolute_times[-1]
+
+        self.delta_times.append(delta_time)
+        self.absolute_times.append(absolute_time)
+        self.statuses.append(self.buffer[data_offset])
+        self.data_offsets.append(data_offset)
+        self.data_lengths.append(data_length)
+        self.durations.append(duration)
+
+    def messages(self):
+        return list(self)
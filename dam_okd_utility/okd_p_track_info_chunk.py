@@ -1,18 +1,24 @@
 import bitstring
+import struct
 from typing import NamedTuple
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.customized_logger import getLogger
+from dam_okd_utility.okd_p_track_midi_data import OkdPTrackInfoList
 
 
 class OkdPTrackInfoChannelInfoEntry(NamedTuple):
     """DAM OKD P-Track Information Channel Information Entry"""
 
+    LAYOUT = struct.Struct(">BBBB")
+
     @staticmethod
-    def read(stream: bitstring.BitStream):
-        attribute: int = stream.read("uint:8")
-        ports: int = stream.read("uint:8") & 0x07
-        control_change_ax: int = stream.read("uint:8")
-        control_change_cx: int = stream.read("uint:8")
+    def read(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
+        attribute: int = stream.u8()
+        ports: int = stream.u8() & 0x07
+        control_change_ax: int = stream.u8()
+        control_change_cx: int = stream.u8()
         return OkdPTrackInfoChannelInfoEntry(
             attribute, ports, control_change_ax, control_change_cx
         )
@@ -23,11 +29,10 @@ class OkdPTrackInfoChannelInfoEntry(NamedTuple):
     def is_guide_melody(self):
         return self.attribute & 0x80 != 0x80
 
-    def write(self, stream: bitstring.BitStream):
-        stream.append(bitstring.pack("uint:8", self.attribute))
-        stream.append(bitstring.pack("uint:8", self.ports))
-        stream.append(bitstring.pack("uint:8", self.control_change_ax))
-        stream.append(bitstring.pack("uint:8", self.control_change_cx))
+    def write(self, stream: bytearray | bitstring.BitStream):
+        stream += OkdPTrackInfoChannelInfoEntry.LAYOUT.pack(
+            self.attribute, self.ports, self.control_change_ax, self.control_change_cx
+        )
 
     attribute: int
     ports: int
@@ -38,30 +43,36 @@ class OkdPTrackInfoChannelInfoEntry(NamedTuple):
 class OkdPTrackInfoEntry(NamedTuple):
     """DAM OKD P-Track Information Entry"""
 
+    HEADER_LAYOUT = struct.Struct(">BBH")
+    SINGLE_CHANNEL_GROUP_LAYOUT = struct.Struct(">H")
+    CHANNEL_GROUPS_LAYOUT = struct.Struct(">16H")
+    SYSTEM_EX_PORTS_LAYOUT = struct.Struct("<H")
+
     __logger = getLogger("OkdPTrackInfoEntry")
 
     @staticmethod
-    def read(stream: bitstring.BitStream):
-        track_number: int = stream.read("uint:8")
-        track_status: int = stream.read("uint:8")
-        use_channel_group_flag: int = stream.read("uintbe:16")
+    def read(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
+        track_number: int = stream.u8()
+        track_status: int = stream.u8()
+        use_channel_group_flag: int = stream.u16be()
 
         single_channel_groups: list[int] = []
         for channel in range(16):
             if (use_channel_group_flag >> channel) & 0x0001 == 0x0001:
-                single_channel_groups.append(stream.read("uintbe:16"))
+                single_channel_groups.append(stream.u16be())
             else:
                 single_channel_groups.append(0x0000)
 
         channel_groups: list[int] = []
         for channel in range(16):
-            channel_groups.append(stream.read("uintbe:16"))
+            channel_groups.append(stream.u16be())
 
         channel_info: list[int] = []
         for channel in range(16):
             channel_info.append(OkdPTrackInfoChannelInfoEntry.read(stream))
 
-        system_ex_ports: int = stream.read("uintle:16")
+        system_ex_ports: int = stream.u16le()
 
         return OkdPTrackInfoEntry(
             track_number,
@@ -73,18 +84,19 @@ class OkdPTrackInfoEntry(NamedTuple):
             system_ex_ports,
         )
 
-    def write(self, stream: bitstring.BitStream):
-        stream.append(bitstring.pack("uint:8", self.track_number))
-        stream.append(bitstring.pack("uint:8", self.track_status))
-        stream.append(bitstring.pack("uintbe:16", self.use_channel_group_flag))
+    def write(self, stream: bytearray | bitstring.BitStream):
+        stream += OkdPTrackInfoEntry.HEADER_LAYOUT.pack(
+            self.track_number, self.track_status, self.use_channel_group_flag
+        )
         for channel, single_channel_group in enumerate(self.single_channel_groups):
             if (self.use_channel_group_flag >> channel) & 0x0001 == 0x0001:
-                stream.append(bitstring.pack("uintbe:16", single_channel_group))
-        for channel_group in self.channel_groups:
-            stream.append(bitstring.pack("uintbe:16", channel_group))
+                stream += OkdPTrackInfoEntry.SINGLE_CHANNEL_GROUP_LAYOUT.pack(
+                    single_channel_group
+                )
+        stream += OkdPTrackInfoEntry.CHANNEL_GROUPS_LAYOUT.pack(*self.channel_groups)
         for channel_info_entry in self.channel_info:
             channel_info_entry.write(stream)
-        stream.append(bitstring.pack("uintle:16", self.system_ex_ports))
+        stream += OkdPTrackInfoEntry.SYSTEM_EX_PORTS_LAYOUT.pack(self.system_ex_ports)
 
     track_number: int
     track_status: int
@@ -98,16 +110,19 @@ class OkdPTrackInfoEntry(NamedTuple):
 class OkdPTrackInfoChunk(NamedTuple):
     """DAM OKD P-Track Information Chunk"""
 
+    ENTRY_COUNT_LAYOUT = struct.Struct(">H")
+
     __logger = getLogger("OkdPTrackInfoChunk")
 
     @staticmethod
-    def read(stream: bitstring.BitStream):
+    def read(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
         p_track_info: list[OkdPTrackInfoEntry] = []
-        entry_count = stream.read("uintbe:16")
+        entry_count = stream.u16be()
         for _ in range(entry_count):
             entry = OkdPTrackInfoEntry.read(stream)
             p_track_info.append(entry)
-        return OkdPTrackInfoChunk(p_track_info)
+        return OkdPTrackInfoChunk(OkdPTrackInfoList(p_track_info))
 
     @staticmethod
     def from_json_object(json_object: object):
@@ -129,10 +144,10 @@ class OkdPTrackInfoChunk(NamedTuple):
                 json_object["system_ex_ports"],
             )
         elif "data" in json_object:
-            return OkdPTrackInfoChunk(json_object["data"])
+            return OkdPTrackInfoChunk(OkdPTrackInfoList(json_object["data"]))
 
-    def write(self, stream: bitstring.BitStream):
-        stream.append(bitstring.pack("uintbe:16", len(self.data)))
+    def write(self, stream: bytearray | bitstring.BitStream):
+        stream += OkdPTrackInfoChunk.ENTRY_COUNT_LAYOUT.pack(len(self.data))
         for entry in self.data:
             entry.write(stream)
 
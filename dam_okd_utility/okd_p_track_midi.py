@@ -1,14 +1,20 @@
 import bitstring
+import heapq
 import mido
+from typing import Iterable
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.customized_logger import getLogger
+from dam_okd_utility.okd_compact_track import OkdCompactTrack
 from dam_okd_utility.midi import get_first_tempo, is_meta_track, get_track_port
 from dam_okd_utility.okd_midi import (
+    STATUS_BYTE_PATTERN,
     is_data_bytes,
     read_variable_int,
-    write_variable_int,
+    encode_variable_int,
     read_extended_variable_int,
-    write_extended_variable_int,
+    encode_extended_variable_int,
+    intern_data,
     OkdMidiGenericMessage,
     OkdMidiMessage,
 )
@@ -21,7 +27,14 @@ from dam_okd_utility.okd_extended_p_track_info_chunk import (
 from dam_okd_utility.okd_p3_track_info_chunk import (
     OkdP3TrackInfoChunk,
 )
-from dam_okd_utility.okd_p_track_midi_data import OkdPTrackAbsoluteTimeMessage
+from dam_okd_utility.okd_p_track_event_table import OkdPTrackEventTable
+from dam_okd_utility.standard_midi_file import StandardMidiFile
+from dam_okd_utility.okd_p_track_midi_data import (
+    OkdPTrackAbsoluteTimeMessage,
+    OkdPTrackRelocationPlan,
+    OkdPTrackInfoEntryState,
+    OkdPTrackInfoList,
+)
 from dam_okd_utility.yamaha_mmt_tg import YamahaMmtTg
 
 
@@ -32,84 +45,57 @@ class OkdPTrackMidi:
 
     __logger = getLogger("OkdPTrackMidi")
 
+    __STATUS_BYTES = [
+        status_byte.to_bytes(1, byteorder="big") for status_byte in range(0x100)
+    ]
+
     @staticmethod
     def __relocate_message(
-        track_info_entry: OkdPTrackInfoEntry | OkdExtendedPTrackInfoEntry,
+        relocation_plan: OkdPTrackRelocationPlan,
         time: int,
         data: bytes,
         is_channel_group_enabled: bool,
     ):
         status_byte = data[0]
-        status_type = status_byte & 0xF0
 
         if status_byte == 0xFE:
             data = data[1:]
             status_byte = data[0]
-            status_type = status_byte & 0xF0
 
-        absolute_time_messages: list[OkdPTrackAbsoluteTimeMessage] = []
+        status_type = status_byte & 0xF0
 
         if status_type == 0xF0:
-            if status_byte == 0xF0:
-                for port in range(OkdPTrackMidi.PORT_COUNT):
-                    if (track_info_entry.system_ex_ports >> port) & 0x0001 != 0x0001:
-                        continue
-
-                    track = port * OkdPTrackMidi.CHANNEL_COUNT_PER_PORT
-                    absolute_time_messages.append(
-                        OkdPTrackAbsoluteTimeMessage(
-                            time,
-                            port,
-                            track,
-                            data,
-                        )
-                    )
-        else:
-            channel = status_byte & 0x0F
-            channel_info_entry = track_info_entry.channel_info[channel]
-
-            single_channel_group = track_info_entry.single_channel_groups[channel]
-            # Fill single channel group
-            if single_channel_group == 0x0000:
-                single_channel_group = 0x0001 << channel
-
-            for port in range(OkdPTrackMidi.PORT_COUNT):
-                # Check target track
-                if (channel_info_entry.ports >> port) & 0x0001 != 0x0001:
-                    continue
-
-                for grouped_channel in range(OkdPTrackMidi.CHANNEL_COUNT_PER_PORT):
-                    if is_channel_group_enabled:
-                        if (
-                            track_info_entry.channel_groups[channel] >> grouped_channel
-                        ) & 0x0001 != 0x0001:
-                            continue
-                    else:
-                        if (single_channel_group >> grouped_channel) & 0x0001 != 0x0001:
-                            continue
-
-                    track = (
-                        port * OkdPTrackMidi.CHANNEL_COUNT_PER_PORT
-                    ) + grouped_channel
-                    absolute_time_message_status_byte = status_type | grouped_channel
-                    absolute_time_message_data = (
-                        absolute_time_message_status_byte.to_bytes(1, byteorder="big")
-                        + data[1:]
-                    )
-                    absolute_time_messages.append(
-                        OkdPTrackAbsoluteTimeMessage(
-                            time, port, track, absolute_time_message_data
-                        )
-                    )
-
-        return absolute_time_messages
+            if status_byte != 0xF0:
+                return []
+            return [
+                OkdPTrackAbsoluteTimeMessage(time, target.port, target.track, data)
+                for target in relocation_plan.system_ex_targets
+            ]
+
+        targets = relocation_plan.channel_targets[is_channel_group_enabled][
+            status_byte & 0x0F
+        ]
+        data_bytes = data[1:]
+        return [
+            OkdPTrackAbsoluteTimeMessage(
+                time,
+                target.port,
+                target.track,
+                OkdPTrackMidi.__STATUS_BYTES[status_type | target.channel] + data_bytes,
+            )
+            for target in targets
+        ]
 
     @staticmethod
     def __relative_time_track_to_absolute_time_track(
-        track_info_entry: OkdPTrackInfoEntry | OkdExtendedPTrackInfoEntry,
+        track_info_entry_state: OkdPTrackInfoEntryState,
         relative_time_track: list[OkdMidiMessage],
     ):
-        is_lossless_track = track_info_entry.track_status & 0x08
+        track_info_entry: OkdPTrackInfoEntry | OkdExtendedPTrackInfoEntry = (
+            track_info_entry_state.entry
+        )
+        is_lossless_track = track_info_entry_state.is_lossless_track
+        relocation_plan = track_info_entry_state.relocation_plan
 
         absolute_time_track: list[OkdPTrackAbsoluteTimeMessage] = []
         absolute_time = 0
@@ -138,7 +124,7 @@ class OkdPTrackMidi:
                 note_on_bytearray[2] = note_on_velocity
                 absolute_time_track.extend(
                     OkdPTrackMidi.__relocate_message(
-                        track_info_entry,
+                        relocation_plan,
                         absolute_time,
                         bytes(note_on_bytearray),
                         is_channel_group_enabled,
@@ -151,7 +137,7 @@ class OkdPTrackMidi:
                 note_off_bytearray[2] = note_off_velocity
                 absolute_time_track.extend(
                     OkdPTrackMidi.__relocate_message(
-                        track_info_entry,
+                        relocation_plan,
                         absolute_time + duration,
                         bytes(note_off_bytearray),
                         is_channel_group_enabled,
@@ -167,7 +153,7 @@ class OkdPTrackMidi:
 
                 absolute_time_track.extend(
                     OkdPTrackMidi.__relocate_message(
-                        track_info_entry,
+                        relocation_plan,
                         absolute_time,
                         bytes(message.data),
                         is_channel_group_enabled,
@@ -180,7 +166,7 @@ class OkdPTrackMidi:
                 note_off_bytearray[2] = 0x40
                 absolute_time_track.extend(
                     OkdPTrackMidi.__relocate_message(
-                        track_info_entry,
+                        relocation_plan,
                         absolute_time + duration,
                         bytes(note_off_bytearray),
                         is_channel_group_enabled,
@@ -197,7 +183,7 @@ class OkdPTrackMidi:
                 message_data_bytearray[2] = message.data[1]
                 absolute_time_track.extend(
                     OkdPTrackMidi.__relocate_message(
-                        track_info_entry,
+                        relocation_plan,
                         absolute_time,
                         bytes(message_data_bytearray),
                         is_channel_group_enabled,
@@ -214,7 +200,7 @@ class OkdPTrackMidi:
                 message_data_bytearray[2] = message.data[1]
                 absolute_time_track.extend(
                     OkdPTrackMidi.__relocate_message(
-                        track_info_entry,
+                        relocation_plan,
                         absolute_time,
                         bytes(message_data_bytearray),
                         is_channel_group_enabled,
@@ -223,7 +209,7 @@ class OkdPTrackMidi:
             else:
                 absolute_time_track.extend(
                     OkdPTrackMidi.__relocate_message(
-                        track_info_entry,
+                        relocation_plan,
                         absolute_time,
                         bytes(message.data),
                         is_channel_group_enabled,
@@ -249,24 +235,27 @@ class OkdPTrackMidi:
         relative_time_tracks: list[tuple[int, list[OkdMidiMessage]]],
         general_midi: bool,
     ):
-        merged_absolute_time_track: list[OkdPTrackAbsoluteTimeMessage] = []
+        if not isinstance(track_info, OkdPTrackInfoList):
+            if len(track_info) == 1 and isinstance(track_info[0], OkdP3TrackInfoChunk):
+                # Indexed when the P3-Track information chunk was read
+                track_info = track_info[0].track_info
+            else:
+                track_info = OkdPTrackInfoList(track_info)
+
+        # Each source is sorted by time, merged in order to keep equal-time events stable
+        absolute_time_tracks: list[list[OkdPTrackAbsoluteTimeMessage]] = []
         relative_time_track_count = len(relative_time_tracks)
         for p_track_chunk_number, relative_time_track in relative_time_tracks:
-            track_info_entry: tuple[
-                int, OkdPTrackInfoEntry | OkdExtendedPTrackInfoEntry
-            ] | None = None
-            for index, entry in enumerate(track_info):
-                if entry.track_number == p_track_chunk_number:
-                    track_info_entry = (index, entry)
-            if track_info_entry is None:
+            track_info_entry_state = track_info.find(p_track_chunk_number)
+            if track_info_entry_state is None:
                 raise ValueError("P-Track Information Entry not found.")
 
             absolute_time_track = (
                 OkdPTrackMidi.__relative_time_track_to_absolute_time_track(
-                    track_info_entry[1], relative_time_track
+                    track_info_entry_state, relative_time_track
                 )
             )
-            merged_absolute_time_track.extend(absolute_time_track)
+            absolute_time_tracks.append(absolute_time_track)
 
             if general_midi:
                 is_sysex_track = False
@@ -274,7 +263,7 @@ class OkdPTrackMidi:
                 if relative_time_track_count <= 2:
                     is_sysex_track = True
                 else:
-                    if track_info_entry[0] % 2 == 0:
+                    if track_info_entry_state.index % 2 == 0:
                         is_sysex_track = True
                         tracks_per_sysex_track = (
                             OkdPTrackMidi.CHANNEL_COUNT_PER_PORT * 2
@@ -282,9 +271,10 @@ class OkdPTrackMidi:
 
                 if is_sysex_track:
                     midi_device = YamahaMmtTg()
-                    port = track_info_entry[0]
+                    port = track_info_entry_state.index
                     track_number = (
-                        track_info_entry[0] * OkdPTrackMidi.CHANNEL_COUNT_PER_PORT
+                        track_info_entry_state.index
+                        * OkdPTrackMidi.CHANNEL_COUNT_PER_PORT
                     )
 
                     # Setup tracks
@@ -293,7 +283,12 @@ class OkdPTrackMidi:
                             port, tracks_per_sysex_track
                         )
                     )
-                    merged_absolute_time_track.extend(general_midi_messages)
+                    absolute_time_tracks.append(
+                        sorted(
+                            general_midi_messages,
+                            key=lambda absolute_time_message: absolute_time_message.time,
+                        )
+                    )
 
                     # SysEx messages to GM messages
                     general_midi_messages = (
@@ -304,26 +299,29 @@ class OkdPTrackMidi:
                             absolute_time_track,
                         )
                     )
-                    merged_absolute_time_track.extend(general_midi_messages)
+                    absolute_time_tracks.append(
+                        sorted(
+                            general_midi_messages,
+                            key=lambda absolute_time_message: absolute_time_message.time,
+                        )
+                    )
 
-        merged_absolute_time_track.sort(
-            key=lambda absolute_time_message: absolute_time_message.time
+        return heapq.merge(
+            *absolute_time_tracks,
+            key=lambda absolute_time_message: absolute_time_message.time,
         )
 
-        return merged_absolute_time_track
-
     @staticmethod
-    def read(stream: bitstring.BitStream):
-        track: list[OkdMidiMessage] = []
-
+    def __read_events(stream: ByteCursor):
         while True:
-            end_of_track: bytes = stream.peek("bytes:4")
+            end_of_track: bytes = stream.peek(4)
             if end_of_track == b"\x00\x00\x00\x00":
                 break
 
             delta_time = read_extended_variable_int(stream)
 
-            status_byte = stream.read("uint:8")
+            status_byte = stream.u8()
+            status_offset = stream.bytepos - 1
             if status_byte == 0x00:
                 break
             if status_byte & 0x80 != 0x80:
@@ -355,22 +353,14 @@ class OkdPTrackMidi:
                 data_length = 2
             # System messages
             elif status_byte == 0xF0:
-                start_position = stream.bytepos
-                unterminated_sysex_detected = False
-                while True:
-                    byte = stream.read("uint:8")
-                    if byte & 0x80 == 0x80:
-                        if byte != 0xF7:
-                            OkdPTrackMidi.__logger.warning(
-                                f"Unterminated SysEx message detected. stop_byte={hex(byte)}"
-                            )
-                            unterminated_sysex_detected = True
-                        data_length = stream.bytepos - start_position
-                        stream.bytepos = start_position
-                        break
-                if unterminated_sysex_detected:
+                stop_position = stream.search(STATUS_BYTE_PATTERN)
+                stop_byte = stream.buffer[stop_position]
+                if stop_byte != 0xF7:
+                    OkdPTrackMidi.__logger.warning(
+                        f"Unterminated SysEx message detected. stop_byte={hex(stop_byte)}"
+                    )
                     continue
-                stream.bytepos = start_position
+                data_length = stop_position + 1 - stream.bytepos
             elif status_byte == 0xF8:
                 data_length = 3
             elif status_byte == 0xF9:
@@ -380,7 +370,7 @@ class OkdPTrackMidi:
             elif status_byte == 0xFD:
                 data_length = 0
             elif status_byte == 0xFE:
-                byte = stream.peek("uint:8")
+                byte = stream.peek_u8()
                 if byte & 0xF0 == 0xA0:
                     data_length = 3
                 elif byte & 0xF0 == 0xC0:
@@ -392,16 +382,16 @@ class OkdPTrackMidi:
                     f"Unknown message detected. status_byte={hex(status_byte)}"
                 )
 
-            status_buffer = status_byte.to_bytes(1, byteorder="big")
-            data_buffer = stream.read(8 * data_length).bytes
-            message_buffer = status_buffer + data_buffer
+            data_buffer = stream.slice(data_length)
             if (
                 status_byte != 0xF0
                 and status_byte != 0xFE
                 and not is_data_bytes(data_buffer)
             ):
+                status_buffer = status_byte.to_bytes(1, byteorder="big")
+                message_buffer = status_buffer + data_buffer
                 OkdPTrackMidi.__logger.warning(
-                    f"Invalid data bytes detected. status_byte={hex(status_byte)} message_buffer={message_buffer.hex()}"
+                    f"Invalid data bytes detected. status_byte={hex(status_byte)} message_buffer={message_buffer.hex()} offset={status_offset}"
                 )
                 continue
 
@@ -409,35 +399,58 @@ class OkdPTrackMidi:
             if status_type == 0x80 or status_type == 0x90:
                 duration = read_variable_int(stream)
 
-            track.append(OkdMidiGenericMessage(delta_time, message_buffer, duration))
+            yield delta_time, status_offset, 1 + data_length, duration
 
-        return track
+    @staticmethod
+    def read_event_table(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
+        event_table = OkdPTrackEventTable(stream.buffer)
+        append_event = event_table.append
+        for event in OkdPTrackMidi.__read_events(stream):
+            append_event(*event)
+        return event_table
 
     @staticmethod
-    def __midi_to_absolute_time_tracks(midi: mido.MidiFile):
-        midi_tempo = get_first_tempo(midi)
-        ppq_conversion_ratio = 480.0 / midi.ticks_per_beat
-        tempo_conversion_ratio = 125.0 / mido.tempo2bpm(midi_tempo)
+    def iter_messages(stream: ByteCursor | bitstring.BitStream):
+        stream = ByteCursor.from_stream(stream)
+        for (
+            delta_time,
+            data_offset,
+            data_length,
+            duration,
+        ) in OkdPTrackMidi.__read_events(stream):
+            data = stream.buffer[data_offset : data_offset + data_length]
+            yield OkdMidiGenericMessage(delta_time, intern_data(bytes(data)), duration)
+
+    @staticmethod
+    def read(stream: ByteCursor | bitstring.BitStream):
+        return OkdPTrackMidi.read_event_table(stream).messages()
+
+    @staticmethod
+    def read_compact(stream: ByteCursor | bitstring.BitStream):
+        return OkdCompactTrack(OkdPTrackMidi.read_event_table(stream))
+
+    @staticmethod
+    def __port_tracks_to_absolute_time_tracks(
+        ticks_per_beat: int,
+        tempo: int,
+        port_tracks: Iterable[tuple[int, Iterable[tuple[int, bytes]]]],
+    ):
+        ppq_conversion_ratio = 480.0 / ticks_per_beat
+        tempo_conversion_ratio = 125.0 / mido.tempo2bpm(tempo)
         time_conversion_ratio = ppq_conversion_ratio * tempo_conversion_ratio
 
         absolute_time_tracks: list[list[OkdPTrackAbsoluteTimeMessage]] = [
             None
         ] * OkdPTrackMidi.PORT_COUNT
-        for midi_track in midi.tracks:
-            if is_meta_track(midi_track):
-                continue
-
-            port = get_track_port(midi_track)
+        for port, port_track in port_tracks:
             if absolute_time_tracks[port] is None:
                 absolute_time_tracks[port] = []
 
-            absolute_time = 0
-            for midi_message in midi_track:
-                midi_message_data = bytes(midi_message.bin())
+            for absolute_time, midi_message_data in port_track:
                 status_byte = midi_message_data[0]
                 status_type = status_byte & 0xF0
 
-                absolute_time += midi_message.time
                 converted_absoulte_time = round(absolute_time * time_conversion_ratio)
 
                 if status_type == 0xF0:
@@ -473,12 +486,71 @@ class OkdPTrackMidi:
 
         return absolute_time_tracks
 
+    @staticmethod
+    def __midi_track_messages(midi_track: mido.MidiTrack):
+        absolute_time = 0
+        for midi_message in midi_track:
+            absolute_time += midi_message.time
+            yield absolute_time, bytes(midi_message.bin())
+
+    @staticmethod
+    def __midi_to_absolute_time_tracks(midi: mido.MidiFile):
+        return OkdPTrackMidi.__port_tracks_to_absolute_time_tracks(
+            midi.ticks_per_beat,
+            get_first_tempo(midi),
+            (
+                (
+                    get_track_port(midi_track),
+                    OkdPTrackMidi.__midi_track_messages(midi_track),
+                )
+                for midi_track in midi.tracks
+                if not is_meta_track(midi_track)
+            ),
+        )
+
+    @staticmethod
+    def __smf_to_absolute_time_tracks(smf: StandardMidiFile):
+        # Meta events are dropped from P-Tracks, they are not converted
+        return OkdPTrackMidi.__port_tracks_to_absolute_time_tracks(
+            smf.ticks_per_beat,
+            smf.get_first_tempo(),
+            (
+                (
+                    StandardMidiFile.get_track_port(smf_track),
+                    (
+                        (event.time, event.data)
+                        for event in smf_track
+                        if event.data[0] != 0xFF
+                    ),
+                )
+                for smf_track in smf.tracks
+                if not StandardMidiFile.is_meta_track(smf_track)
+            ),
+        )
+
+    @staticmethod
+    def __note_off_times(absolute_time_track: list[OkdPTrackAbsoluteTimeMessage]):
+        # Time of the first later note off with the same channel and note number
+        note_off_times: list[int | None] = [None] * len(absolute_time_track)
+        next_note_off_times: dict[tuple[int, int], int] = {}
+        for index in range(len(absolute_time_track) - 1, -1, -1):
+            absolute_time_message = absolute_time_track[index]
+            status_byte = absolute_time_message.data[0]
+            status_type = status_byte & 0xF0
+            if status_type == 0x80:
+                note_key = (status_byte & 0x0F, absolute_time_message.data[1])
+                next_note_off_times[note_key] = absolute_time_message.time
+            elif status_type == 0x90:
+                note_key = (status_byte & 0x0F, absolute_time_message.data[1])
+                note_off_times[index] = next_note_off_times.get(note_key)
+        return note_off_times
+
     @staticmethod
     def __absolute_time_track_to_relative_time_track(
         absolute_time_track: list[OkdPTrackAbsoluteTimeMessage],
     ):
         relative_time_track: list[OkdMidiMessage] = []
-        absolute_time_track_length = len(absolute_time_track)
+        note_off_times = OkdPTrackMidi.__note_off_times(absolute_time_track)
         current_time = 0
         for absolute_time_message_index, absolute_time_message in enumerate(
             absolute_time_track
@@ -491,22 +563,9 @@ class OkdPTrackMidi:
                 # Do nothing
                 continue
             elif status_type == 0x90:
-                channel = status_byte & 0x0F
-                note_number = absolute_time_message.data[1]
-                note_off_time = absolute_time_message.time
-                for i in range(absolute_time_message_index, absolute_time_track_length):
-                    note_off_message = absolute_time_track[i]
-                    note_off_message_status_byte = note_off_message.data[0]
-                    note_off_message_status_type = note_off_message_status_byte & 0xF0
-                    note_off_message_channel = note_off_message_status_byte & 0x0F
-                    if (
-                        note_off_message_status_type == 0x80
-                        and note_off_message_channel == channel
-                    ):
-                        note_off_message_note_number = note_off_message.data[1]
-                        if note_off_message_note_number == note_number:
-                            note_off_time = note_off_message.time
-                            break
+                note_off_time = note_off_times[absolute_time_message_index]
+                if note_off_time is None:
+                    note_off_time = absolute_time_message.time
                 duration = note_off_time - absolute_time_message.time
                 relative_time_track.append(
                     OkdMidiGenericMessage(
@@ -549,8 +608,9 @@ class OkdPTrackMidi:
         return relative_time_track
 
     @staticmethod
-    def midi_to_relative_time_tracks(midi: mido.MidiFile):
-        absolute_time_tracks = OkdPTrackMidi.__midi_to_absolute_time_tracks(midi)
+    def __absolute_time_tracks_to_relative_time_tracks(
+        absolute_time_tracks: list[list[OkdPTrackAbsoluteTimeMessage]],
+    ):
         relative_time_tracks: list[list[OkdMidiMessage]] = [
             None
         ] * OkdPTrackMidi.PORT_COUNT
@@ -569,16 +629,30 @@ class OkdPTrackMidi:
         return relative_time_tracks
 
     @staticmethod
-    def write(stream: bitstring.BitStream, track: list[OkdMidiMessage]):
+    def midi_to_relative_time_tracks(midi: mido.MidiFile):
+        return OkdPTrackMidi.__absolute_time_tracks_to_relative_time_tracks(
+            OkdPTrackMidi.__midi_to_absolute_time_tracks(midi)
+        )
+
+    @staticmethod
+    def smf_to_relative_time_tracks(smf: StandardMidiFile):
+        return OkdPTrackMidi.__absolute_time_tracks_to_relative_time_tracks(
+            OkdPTrackMidi.__smf_to_absolute_time_tracks(smf)
+        )
+
+    @staticmethod
+    def write(stream: bytearray | bitstring.BitStream, track: list[OkdMidiMessage]):
+        buffers: list[bytes] = []
         for message in track:
             status_byte = message.data[0]
             status_type = status_byte & 0xF0
 
-            write_extended_variable_int(stream, message.delta_time)
-            stream.append(message.data)
+            buffers.append(encode_extended_variable_int(message.delta_time))
+            buffers.append(message.data)
 
             if status_type == 0x80 or status_type == 0x90:
-                write_variable_int(stream, message.duration >> 2)
+                buffers.append(encode_variable_int(message.duration >> 2))
 
         # End of track
-        stream.append(b"\x00\x00\x00\x00\x00\x00\x00\x00")
+        buffers.append(b"\x00\x00\x00\x00\x00\x00\x00\x00")
+        stream += b"".join(buffers)
@@ -1,4 +1,4 @@
-from typing import NamedTuple
+from typing import Iterable, NamedTuple
 
 
 class OkdPTrackAbsoluteTimeMessage(NamedTuple):
@@ -6,3 +6,111 @@ class OkdPTrackAbsoluteTimeMessage(NamedTuple):
     port: int
     track: int
     data: bytes
+
+
+class OkdPTrackRelocationTarget(NamedTuple):
+    port: int
+    track: int
+    channel: int
+
+
+class OkdPTrackRelocationPlan(NamedTuple):
+    PORT_COUNT = 5
+    CHANNEL_COUNT_PER_PORT = 16
+
+    @staticmethod
+    def compile(
+        channel_ports: list[int],
+        single_channel_groups: list[int],
+        channel_groups: list[int],
+        system_ex_ports: int,
+    ):
+        system_ex_targets: list[OkdPTrackRelocationTarget] = []
+        for port in range(OkdPTrackRelocationPlan.PORT_COUNT):
+            if (system_ex_ports >> port) & 0x0001 != 0x0001:
+                continue
+
+            track = port * OkdPTrackRelocationPlan.CHANNEL_COUNT_PER_PORT
+            system_ex_targets.append(OkdPTrackRelocationTarget(port, track, 0))
+
+        channel_targets: list[tuple[tuple[OkdPTrackRelocationTarget, ...], ...]] = []
+        for is_channel_group_enabled in [False, True]:
+            channel_group_targets: list[tuple[OkdPTrackRelocationTarget, ...]] = []
+            for channel in range(OkdPTrackRelocationPlan.CHANNEL_COUNT_PER_PORT):
+                if is_channel_group_enabled:
+                    channel_group = channel_groups[channel]
+                else:
+                    channel_group = single_channel_groups[channel]
+                    # Fill single channel group
+                    if channel_group == 0x0000:
+                        channel_group = 0x0001 << channel
+
+                targets: list[OkdPTrackRelocationTarget] = []
+                for port in range(OkdPTrackRelocationPlan.PORT_COUNT):
+                    # Check target track
+                    if (channel_ports[channel] >> port) & 0x0001 != 0x0001:
+                        continue
+
+                    for grouped_channel in range(
+                        OkdPTrackRelocationPlan.CHANNEL_COUNT_PER_PORT
+                    ):
+                        if (channel_group >> grouped_channel) & 0x0001 != 0x0001:
+                            continue
+
+                        track = (
+                            port * OkdPTrackRelocationPlan.CHANNEL_COUNT_PER_PORT
+                        ) + grouped_channel
+                        targets.append(
+                            OkdPTrackRelocationTarget(port, track, grouped_channel)
+                        )
+                channel_group_targets.append(tuple(targets))
+            channel_targets.append(tuple(channel_group_targets))
+
+        return OkdPTrackRelocationPlan(tuple(channel_targets), tuple(system_ex_targets))
+
+    # Indexed by channel group enabled flag, then by channel
+    channel_targets: tuple[tuple[tuple[OkdPTrackRelocationTarget, ...], ...], ...]
+    system_ex_targets: tuple[OkdPTrackRelocationTarget, ...]
+
+
+class OkdPTrackInfoEntryState(NamedTuple):
+    @staticmethod
+    def from_entry(index: int, entry: tuple):
+        return OkdPTrackInfoEntryState(
+            index,
+            entry,
+            entry.track_status & 0x08 == 0x08,
+            OkdPTrackRelocationPlan.compile(
+                [channel_info_entry.ports for channel_info_entry in entry.channel_info],
+                entry.single_channel_groups,
+                entry.channel_groups,
+                entry.system_ex_ports,
+            ),
+        )
+
+    index: int
+    entry: tuple
+    is_lossless_track: bool
+    relocation_plan: OkdPTrackRelocationPlan
+
+
+class OkdPTrackInfoList(tuple):
+    """DAM OKD P-Track Information List"""
+
+    def __new__(cls, entries: Iterable[tuple] = ()):
+        self = super().__new__(cls, entries)
+        # Derived once, the list is immutable
+        self.entry_states = tuple(
+            OkdPTrackInfoEntryState.from_entry(index, entry)
+            for index, entry in enumerate(self)
+        )
+        self.__entry_states_by_track_number: dict[int, OkdPTrackInfoEntryState] = {}
+        for entry_state in self.entry_states:
+            # The last entry wins on duplicate track numbers
+            self.__entry_states_by_track_number[
+                entry_state.entry.track_number
+            ] = entry_state
+        return self
+
+    def find(self, track_number: int):
+        return self.__entry_states_by_track_number.get(track_number)
@@ -0,0 +1,100 @@
+import io
+
+from dam_okd_utility.mapped_stream import MappedStream
+from dam_okd_utility.okd_file import OkdFile, OkdFileType
+from dam_okd_utility.okd_file_data import OkdChunkIndexEntry, OkdFileLayout
+from dam_okd_utility.okd_scramble import (
+    descramble_buffer,
+    next_scramble_pattern_index,
+)
+
+
+class OkdReader:
+    """DAM OKD Random Access Reader"""
+
+    def __init__(
+        self,
+        stream: io.BufferedReader | MappedStream,
+        file_type: OkdFileType,
+        layout: OkdFileLayout | None = None,
+        chunks: list[OkdChunkIndexEntry] | None = None,
+    ):
+        self.__stream = stream
+        if layout is None:
+            layout = OkdFile.read_layout(stream, file_type)
+        self.__layout = layout
+        self.__chunks = chunks
+
+    @property
+    def layout(self):
+        return self.__layout
+
+    @property
+    def header(self):
+        return self.__layout.header
+
+    @property
+    def scramble_pattern_index(self):
+        return self.__layout.scramble_pattern_index
+
+    def __read(self, offset: int, length: int):
+        # Scrambled words are aligned to the start of chunks
+        aligned_offset = offset - offset % 2
+        self.__stream.seek(self.__layout.chunks_position + aligned_offset)
+        buffer = self.__stream.read(length + (offset - aligned_offset))
+
+        scrambled_length = self.__layout.scrambled_length
+        scrambled_length += scrambled_length % 2
+        descramble_length = min(len(buffer), scrambled_length - aligned_offset)
+        if 0 < descramble_length:
+            descramble_length -= descramble_length % 2
+            scramble_pattern_index = next_scramble_pattern_index(
+                self.__layout.scramble_pattern_index, aligned_offset
+            )
+            plaintext_buffer = descramble_buffer(
+                buffer[:descramble_length], scramble_pattern_index
+            )
+            if descramble_length < len(buffer):
+                # Extended data is not scrambled
+                plaintext_buffer = b"".join(
+                    [plaintext_buffer, buffer[descramble_length:]]
+                )
+            buffer = plaintext_buffer
+
+        return buffer[offset - aligned_offset :]
+
+    def chunks(self):
+        if self.__chunks is not None:
+            return self.__chunks
+
+        chunks: list[OkdChunkIndexEntry] = []
+        offset = 0
+        while True:
+            chunk_header_buffer = self.__read(offset, 8)
+            if len(chunk_header_buffer) < 8:
+                break
+            chunk_id = bytes(chunk_header_buffer[0:4])
+            chunk_size = int.from_bytes(chunk_header_buffer[4:8], byteorder="big")
+            chunks.append(OkdChunkIndexEntry(chunk_id, offset, chunk_size))
+            offset += 8 + chunk_size
+
+        self.__chunks = chunks
+        return chunks
+
+    def read_chunk_buffer(self, index: int):
+        chunk = self.chunks()[index]
+        return self.__read(chunk.offset, 8 + chunk.size)
+
+    def read_chunk(self, index: int, lazy_p_track=False):
+        return OkdFile.parse_chunk(self.read_chunk_buffer(index), lazy_p_track)
+
+    def find(self, chunk_id: bytes):
+        for index, chunk in enumerate(self.chunks()):
+            if chunk.chunk_id.startswith(chunk_id):
+                return index
+
+    def get(self, chunk_id: bytes, lazy_p_track=False):
+        index = self.find(chunk_id)
+        if index is None:
+            return
+        return self.read_chunk(index, lazy_p_track)
@@ -0,0 +1,372 @@
+import concurrent.futures
+import io
+import itertools
+import os
+import stat
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from dam_okd_utility.okd_scramble_pattern import OKD_SCRAMBLE_PATTERN
+
+OKD_SCRAMBLE_PATTERN_COUNT = len(OKD_SCRAMBLE_PATTERN)
+OKD_UNINDEXED_SCRAMBLE_PATTERN = 0x17D7
+OKD_SCRAMBLE_DEFAULT_BLOCK_SIZE = 0x10000
+OKD_SCRAMBLE_PARALLEL_SLICE_SIZE = 0x100000
+
+OKD_SCRAMBLE_KEY_STREAM = b"".join(
+    [
+        scramble_pattern.to_bytes(2, byteorder="big")
+        for scramble_pattern in OKD_SCRAMBLE_PATTERN
+    ]
+)
+OKD_UNINDEXED_SCRAMBLE_KEY_STREAM = OKD_UNINDEXED_SCRAMBLE_PATTERN.to_bytes(
+    2, byteorder="big"
+)
+
+
+def __build_scramble_key_index():
+    # The first 32-bit key of a stream identifies its scramble_pattern_index
+    scramble_key_index: dict[int, int] = {}
+    for scramble_pattern_index in range(OKD_SCRAMBLE_PATTERN_COUNT):
+        next_scramble_pattern = OKD_SCRAMBLE_PATTERN[
+            (scramble_pattern_index + 1) % OKD_SCRAMBLE_PATTERN_COUNT
+        ]
+        scramble_key = (
+            OKD_SCRAMBLE_PATTERN[scramble_pattern_index] << 16
+        ) | next_scramble_pattern
+        scramble_key_index.setdefault(scramble_key, scramble_pattern_index)
+    return scramble_key_index
+
+
+OKD_SCRAMBLE_KEY_INDEX = __build_scramble_key_index()
+OKD_MAGIC_BYTES = [b"YKS1", b"YOKA"]
+
+
+def get_scramble_key_stream(scramble_pattern_index: int | None, length: int):
+    key_stream_unit: bytes
+    if scramble_pattern_index is None:
+        key_stream_unit = OKD_UNINDEXED_SCRAMBLE_KEY_STREAM
+    else:
+        key_stream_offset = (scramble_pattern_index % OKD_SCRAMBLE_PATTERN_COUNT) * 2
+        key_stream_unit = (
+            OKD_SCRAMBLE_KEY_STREAM[key_stream_offset:]
+            + OKD_SCRAMBLE_KEY_STREAM[:key_stream_offset]
+        )
+    repeat_count = -(-length // len(key_stream_unit))
+    return (key_stream_unit * repeat_count)[:length]
+
+
+def detect_scramble_index(buffer: bytes, magic_bytes: bytes | None = None):
+    if len(buffer) < 4:
+        raise RuntimeError("Invalid buffer length.")
+    magic_bytes_int = int.from_bytes(buffer[0:4], byteorder="big")
+
+    candidated_magic_bytes = OKD_MAGIC_BYTES if magic_bytes is None else [magic_bytes]
+    for expected_magic_bytes in candidated_magic_bytes:
+        expected_magic_bytes_int = int.from_bytes(expected_magic_bytes, byteorder="big")
+        if magic_bytes_int == expected_magic_bytes_int:
+            # Not scrambled
+            return None
+        scramble_pattern_index = OKD_SCRAMBLE_KEY_INDEX.get(
+            magic_bytes_int ^ expected_magic_bytes_int
+        )
+        if scramble_pattern_index is not None:
+            return scramble_pattern_index
+
+    raise RuntimeError("Failed to detect OKD file scramble_pattern_index.")
+
+
+def next_scramble_pattern_index(scramble_pattern_index: int | None, length: int):
+    if scramble_pattern_index is None:
+        return None
+    return scramble_pattern_index + length // 2
+
+
+def descramble_buffer(buffer: bytes, scramble_pattern_index: int | None):
+    buffer_length = len(buffer)
+    if buffer_length % 2 != 0:
+        raise RuntimeError("Invalid buffer length.")
+    if buffer_length == 0:
+        return b""
+
+    key_stream = get_scramble_key_stream(scramble_pattern_index, buffer_length)
+    if numpy is not None:
+        return numpy.bitwise_xor(
+            numpy.frombuffer(buffer, dtype=numpy.uint8),
+            numpy.frombuffer(key_stream, dtype=numpy.uint8),
+        ).tobytes()
+
+    plaintext = int.from_bytes(buffer, byteorder="big") ^ int.from_bytes(
+        key_stream, byteorder="big"
+    )
+    return plaintext.to_bytes(buffer_length, byteorder="big")
+
+
+def scramble_buffer(buffer: bytes, scramble_pattern_index: int | None):
+    # XOR scrambling is symmetric
+    return descramble_buffer(buffer, scramble_pattern_index)
+
+
+def __validate_block_size(block_size: int):
+    if block_size <= 0 or block_size % 2 != 0:
+        raise ValueError(f"Invalid block_size. block_size={block_size}")
+
+
+def __read_blocks(
+    input_stream: io.BufferedReader,
+    length: int | None,
+    block_size: int,
+):
+    remaining_length: int | None = None
+    if length is not None:
+        remaining_length = length + length % 2
+    while remaining_length is None or 0 < remaining_length:
+        read_length = block_size
+        if remaining_length is not None:
+            read_length = min(block_size, remaining_length)
+        input_buffer = input_stream.read(read_length)
+        input_buffer_length = len(input_buffer)
+        if remaining_length is None:
+            if input_buffer_length == 0:
+                break
+        else:
+            if input_buffer_length != read_length:
+                raise RuntimeError("Invalid input_buffer length.")
+            remaining_length -= input_buffer_length
+        if input_buffer_length % 2 != 0:
+            raise RuntimeError("Invalid input_buffer length.")
+
+        yield input_buffer
+
+
+def __descramble_slice_in_place(
+    buffer: memoryview, scramble_pattern_index: int | None, block_size: int
+):
+    # XOR in cache sized blocks without allocating the slice again
+    for offset in range(0, len(buffer), block_size):
+        block = numpy.frombuffer(
+            buffer[offset : offset + block_size], dtype=numpy.uint8
+        )
+        key_stream = get_scramble_key_stream(
+            next_scramble_pattern_index(scramble_pattern_index, offset), len(block)
+        )
+        numpy.bitwise_xor(
+            block, numpy.frombuffer(key_stream, dtype=numpy.uint8), out=block
+        )
+
+
+def __xor_stream_parallel(
+    input_stream: io.BufferedReader,
+    output_stream: io.BufferedWriter,
+    scramble_pattern_index: int | None,
+    length: int | None,
+    block_size: int,
+    workers: int,
+):
+    # Each worker XORs one contiguous slice per round, starting at its own index
+    slice_size = max(OKD_SCRAMBLE_PARALLEL_SLICE_SIZE, block_size)
+    if length is not None:
+        worker_length = -(-length // workers)
+        slice_size = min(slice_size, max(worker_length + worker_length % 2, 2))
+    remaining_length: int | None = None
+    if length is not None:
+        remaining_length = length + length % 2
+
+    # Slice buffers are reused across rounds
+    slice_buffers = [bytearray(slice_size) for _ in range(workers)]
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        while remaining_length is None or 0 < remaining_length:
+            slices: list[memoryview] = []
+            scramble_pattern_indexes: list[int | None] = []
+            for slice_buffer in slice_buffers:
+                read_length = slice_size
+                if remaining_length is not None:
+                    read_length = min(slice_size, remaining_length)
+                if read_length == 0:
+                    break
+                slice_view = memoryview(slice_buffer)[:read_length]
+                input_buffer_length = input_stream.readinto(slice_view)
+                if remaining_length is None:
+                    if input_buffer_length == 0:
+                        break
+                else:
+                    if input_buffer_length != read_length:
+                        raise RuntimeError("Invalid input_buffer length.")
+                    remaining_length -= input_buffer_length
+                if input_buffer_length % 2 != 0:
+                    raise RuntimeError("Invalid input_buffer length.")
+
+                slices.append(slice_view[:input_buffer_length])
+                scramble_pattern_indexes.append(scramble_pattern_index)
+                scramble_pattern_index = next_scramble_pattern_index(
+                    scramble_pattern_index, input_buffer_length
+                )
+                if input_buffer_length < read_length:
+                    break
+            if len(slices) == 0:
+                break
+
+            for _ in executor.map(
+                __descramble_slice_in_place,
+                slices,
+                scramble_pattern_indexes,
+                itertools.repeat(block_size),
+            ):
+                pass
+            for slice_view in slices:
+                output_stream.write(slice_view)
+            if len(slices) < workers:
+                break
+    return scramble_pattern_index
+
+
+def __xor_stream(
+    input_stream: io.BufferedReader,
+    output_stream: io.BufferedWriter,
+    scramble_pattern_index: int | None,
+    length: int | None,
+    block_size: int,
+    workers: int | None = None,
+):
+    __validate_block_size(block_size)
+    if workers is not None and workers <= 0:
+        raise ValueError(f"Invalid workers. workers={workers}")
+
+    # Only NumPy releases the GIL while XORing
+    if workers is not None and 1 < workers and numpy is not None:
+        return __xor_stream_parallel(
+            input_stream,
+            output_stream,
+            scramble_pattern_index,
+            length,
+            block_size,
+            workers,
+        )
+
+    for input_buffer in __read_blocks(input_stream, length, block_size):
+        output_stream.write(descramble_buffer(input_buffer, scramble_pattern_index))
+        scramble_pattern_index = next_scramble_pattern_index(
+            scramble_pattern_index, len(input_buffer)
+        )
+    return scramble_pattern_index
+
+
+def descramble_stream(
+    input_stream: io.BufferedReader,
+    output_stream: io.BufferedWriter,
+    scramble_pattern_index: int | None,
+    length: int | None = None,
+    block_size: int = OKD_SCRAMBLE_DEFAULT_BLOCK_SIZE,
+    workers: int | None = None,
+):
+    return __xor_stream(
+        input_stream,
+        output_stream,
+        scramble_pattern_index,
+        length,
+        block_size,
+        workers,
+    )
+
+
+def scramble_stream(
+    input_stream: io.BufferedReader,
+    output_stream: io.BufferedWriter,
+    scramble_pattern_index: int | None,
+    length: int | None = None,
+    block_size: int = OKD_SCRAMBLE_DEFAULT_BLOCK_SIZE,
+    workers: int | None = None,
+):
+    return __xor_stream(
+        input_stream,
+        output_stream,
+        scramble_pattern_index,
+        length,
+        block_size,
+        workers,
+    )
+
+
+def __get_regular_file_descriptor(stream: io.IOBase):
+    file_descriptor: int
+    try:
+        file_descriptor = stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+    if not stat.S_ISREG(os.fstat(file_descriptor).st_mode):
+        return None
+    return file_descriptor
+
+
+def __copy_file_descriptor(
+    input_file_descriptor: int,
+    output_file_descriptor: int,
+    input_position: int,
+    output_position: int,
+    length: int,
+):
+    copied_length = 0
+    try:
+        while copied_length < length:
+            count = length - copied_length
+            if hasattr(os, "copy_file_range"):
+                written_length = os.copy_file_range(
+                    input_file_descriptor,
+                    output_file_descriptor,
+                    count,
+                    input_position + copied_length,
+                    output_position + copied_length,
+                )
+            else:
+                os.lseek(
+                    output_file_descriptor,
+                    output_position + copied_length,
+                    os.SEEK_SET,
+                )
+                written_length = os.sendfile(
+                    output_file_descriptor,
+                    input_file_descriptor,
+                    input_position + copied_length,
+                    count,
+                )
+            if written_length == 0:
+                break
+            copied_length += written_length
+    except OSError:
+        pass
+    return copied_length
+
+
+def copy_stream(
+    input_stream: io.BufferedReader,
+    output_stream: io.BufferedWriter,
+    block_size: int = OKD_SCRAMBLE_DEFAULT_BLOCK_SIZE,
+):
+    __validate_block_size(block_size)
+
+    input_file_descriptor = __get_regular_file_descriptor(input_stream)
+    output_file_descriptor = __get_regular_file_descriptor(output_stream)
+    if input_file_descriptor is not None and output_file_descriptor is not None:
+        input_position = input_stream.tell()
+        output_stream.flush()
+        output_position = output_stream.tell()
+        length = os.fstat(input_file_descriptor).st_size - input_position
+        copied_length = __copy_file_descriptor(
+            input_file_descriptor,
+            output_file_descriptor,
+            input_position,
+            output_position,
+            length,
+        )
+        # Resynchronize buffered streams with file descriptors
+        input_stream.seek(input_position + copied_length)
+        output_stream.seek(output_position + copied_length)
+
+    while True:
+        buffer = input_stream.read(block_size)
+        if len(buffer) == 0:
+            break
+        output_stream.write(buffer)
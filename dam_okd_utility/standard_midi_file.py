@@ -0,0 +1,392 @@
+import functools
+import struct
+from typing import Iterable, NamedTuple
+
+
+@functools.lru_cache(maxsize=4096)
+def encode_variable_length_quantity(value: int):
+    if value < 0x00000000 or 0x0FFFFFFF < value:
+        raise ValueError(f"Invalid variable length quantity. value={value}")
+
+    buffer = bytearray([value & 0x7F])
+    value >>= 7
+    while 0x00 < value:
+        buffer.append(0x80 | (value & 0x7F))
+        value >>= 7
+    buffer.reverse()
+    return bytes(buffer)
+
+
+def decode_variable_length_quantity(buffer: bytes | memoryview, offset: int):
+    value = 0
+    while True:
+        try:
+            byte = buffer[offset]
+        except IndexError:
+            raise ValueError(
+                f"Reading off the end of the data. position={offset}"
+            ) from None
+        offset += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte & 0x80 != 0x80:
+            return value, offset
+
+
+class StandardMidiFileEvent(NamedTuple):
+    """Standard MIDI File Event"""
+
+    def is_meta(self):
+        return self.data[0] == 0xFF
+
+    def meta_type(self):
+        if self.data[0] != 0xFF:
+            return
+        return self.data[1]
+
+    def meta_data(self):
+        _, offset = decode_variable_length_quantity(self.data, 2)
+        return self.data[offset:]
+
+    # Absolute time in ticks
+    time: int
+    # Meta events keep their length, SysEx events are framed by F0 and F7
+    data: bytes
+
+
+class StandardMidiFile(NamedTuple):
+    """Standard MIDI File"""
+
+    HEADER_LAYOUT = struct.Struct(">hhh")
+    CHUNK_HEADER_LAYOUT = struct.Struct(">4sI")
+    DEFAULT_TEMPO = 500000
+    STATUS_BYTES = [
+        status_byte.to_bytes(1, byteorder="big") for status_byte in range(0x100)
+    ]
+    # Message length by status byte, including the status byte
+    MESSAGE_LENGTHS = {
+        **{status_byte: 3 for status_byte in range(0x80, 0xC0)},
+        **{status_byte: 2 for status_byte in range(0xC0, 0xE0)},
+        **{status_byte: 3 for status_byte in range(0xE0, 0xF0)},
+        0xF1: 2,
+        0xF2: 3,
+        0xF3: 2,
+        0xF6: 1,
+        0xF8: 1,
+        0xFA: 1,
+        0xFB: 1,
+        0xFC: 1,
+        0xFE: 1,
+    }
+
+    @staticmethod
+    def __read_chunk_header(buffer: bytes, position: int):
+        if len(buffer) < position + StandardMidiFile.CHUNK_HEADER_LAYOUT.size:
+            raise ValueError(f"Reading off the end of the data. position={position}")
+        return StandardMidiFile.CHUNK_HEADER_LAYOUT.unpack_from(buffer, position)
+
+    @staticmethod
+    def __read_track(buffer: bytes, position: int, end_position: int):
+        track: list[StandardMidiFileEvent] = []
+        absolute_time = 0
+        running_status_byte: int | None = None
+        while position < end_position:
+            delta_time, position = decode_variable_length_quantity(buffer, position)
+            absolute_time += delta_time
+
+            status_position = position
+            try:
+                status_byte = buffer[position]
+            except IndexError:
+                raise ValueError(
+                    f"Reading off the end of the data. position={position}"
+                ) from None
+            position += 1
+            is_running_status = status_byte < 0x80
+            if is_running_status:
+                if running_status_byte is None:
+                    raise ValueError(
+                        f"Running status without status byte. position={status_position}"
+                    )
+                status_byte = running_status_byte
+                # The data byte was already consumed
+                position = status_position
+            elif status_byte != 0xFF:
+                running_status_byte = status_byte
+
+            if status_byte == 0xFF:
+                data_length, data_position = decode_variable_length_quantity(
+                    buffer, position + 1
+                )
+                position = data_position + data_length
+                if len(buffer) < position:
+                    raise ValueError(
+                        f"Reading off the end of the data. position={position}"
+                    )
+                data = buffer[status_position:position]
+            elif status_byte == 0xF0 or status_byte == 0xF7:
+                if is_running_status:
+                    # A data byte is discarded, as with mido
+                    position += 1
+                data_length, position = decode_variable_length_quantity(
+                    buffer, position
+                )
+                data = buffer[position : position + data_length]
+                position += data_length
+                if len(data) != data_length:
+                    raise ValueError(
+                        f"Reading off the end of the data. position={position}"
+                    )
+                if data[:1] == b"\xf0":
+                    data = data[1:]
+                if data[-1:] == b"\xf7":
+                    data = data[:-1]
+                if not data.isascii():
+                    raise ValueError(
+                        f"Invalid SysEx data byte. position={status_position}"
+                    )
+                data = b"\xf0" + data + b"\xf7"
+            else:
+                message_length = StandardMidiFile.MESSAGE_LENGTHS.get(status_byte)
+                if message_length is None:
+                    raise ValueError(
+                        f"Invalid status byte. status_byte={hex(status_byte)} position={status_position}"
+                    )
+                if is_running_status and message_length == 1:
+                    raise ValueError(
+                        f"Invalid running status. status_byte={hex(status_byte)} position={status_position}"
+                    )
+                data_buffer = buffer[position : position + message_length - 1]
+                position += message_length - 1
+                if len(data_buffer) != message_length - 1:
+                    raise ValueError(
+                        f"Reading off the end of the data. position={position}"
+                    )
+                if not data_buffer.isascii():
+                    raise ValueError(
+                        f"Invalid data byte. status_byte={hex(status_byte)} position={status_position}"
+                    )
+                if is_running_status:
+                    data = StandardMidiFile.STATUS_BYTES[status_byte] + data_buffer
+                else:
+                    data = buffer[status_position:position]
+
+            track.append(StandardMidiFileEvent(absolute_time, data))
+
+        if position != end_position:
+            raise ValueError(
+                f"Invalid track length. position={position} end_position={end_position}"
+            )
+        return track
+
+    @staticmethod
+    def read(buffer: bytes):
+        buffer = bytes(buffer)
+        chunk_id, chunk_size = StandardMidiFile.__read_chunk_header(buffer, 0)
+        if chunk_id != b"MThd":
+            raise ValueError(f"Invalid header chunk ID. chunk_id={chunk_id}")
+        if (
+            chunk_size < StandardMidiFile.HEADER_LAYOUT.size
+            or len(buffer) < 8 + chunk_size
+        ):
+            raise ValueError(f"Invalid header chunk size. chunk_size={chunk_size}")
+        (
+            format_type,
+            track_count,
+            ticks_per_beat,
+        ) = StandardMidiFile.HEADER_LAYOUT.unpack_from(buffer, 8)
+
+        position = 8 + chunk_size
+        tracks: list[list[StandardMidiFileEvent]] = []
+        for _ in range(track_count):
+            chunk_id, chunk_size = StandardMidiFile.__read_chunk_header(
+                buffer, position
+            )
+            if chunk_id != b"MTrk":
+                raise ValueError(f"Invalid track chunk ID. chunk_id={chunk_id}")
+            position += StandardMidiFile.CHUNK_HEADER_LAYOUT.size
+            tracks.append(
+                StandardMidiFile.__read_track(buffer, position, position + chunk_size)
+            )
+            position += chunk_size
+
+        return StandardMidiFile(format_type, ticks_per_beat, tracks)
+
+    @staticmethod
+    def is_meta_track(track: list[StandardMidiFileEvent]):
+        for event in track:
+            if not event.is_meta():
+                return False
+
+        return True
+
+    @staticmethod
+    def get_track_port(track: list[StandardMidiFileEvent]):
+        for event in track:
+            if event.meta_type() == 0x21:
+                meta_data = event.meta_data()
+                # Empty port meta events occur in some files
+                return meta_data[0] if len(meta_data) != 0 else 0
+
+        return 0
+
+    def get_first_tempo(self):
+        for track in self.tracks:
+            for event in track:
+                if event.meta_type() == 0x51:
+                    return int.from_bytes(event.meta_data()[:3], byteorder="big")
+
+        return StandardMidiFile.DEFAULT_TEMPO
+
+    def get_port_tracks(self, port: int):
+        port_tracks: list[list[StandardMidiFileEvent]] = []
+        for track in self.tracks:
+            for event in track:
+                if event.meta_type() != 0x21:
+                    continue
+                meta_data = event.meta_data()
+                if (meta_data[0] if len(meta_data) != 0 else 0) == port:
+                    port_tracks.append(track)
+                    break
+
+        return port_tracks
+
+    def get_port_channel_track(self, port: int, channel: int):
+        for port_track in self.get_port_tracks(port):
+            for event in port_track:
+                if event.data[0] == 0x90 | channel:
+                    return port_track
+
+    def remove_port_tracks(self, port: int):
+        # Same as midi.remove_port_tracks, the track after a removed one is kept
+        index = 0
+        while index < len(self.tracks):
+            if StandardMidiFile.get_track_port(self.tracks[index]) == port:
+                self.tracks.pop(index)
+            index += 1
+
+    def get_first_note_on_time(self):
+        first_note_time = 16777216
+        for track in self.tracks:
+            for event in track:
+                if event.data[0] & 0xF0 == 0x90:
+                    first_note_time = min(event.time, first_note_time)
+                    break
+
+        return first_note_time
+
+    def get_last_note_off_time(self):
+        last_note_time = 0
+        for track in self.tracks:
+            for event in reversed(track):
+                if event.data[0] & 0xF0 == 0x80:
+                    last_note_time = max(event.time, last_note_time)
+                    break
+
+        return last_note_time
+
+    format_type: int
+    ticks_per_beat: int
+    tracks: list[list[StandardMidiFileEvent]]
+
+
+class StandardMidiFileWriter:
+    """Standard MIDI File Writer"""
+
+    HEADER_LAYOUT = struct.Struct(">4sIhhh")
+    CHUNK_HEADER_LAYOUT = struct.Struct(">4sI")
+    DEFAULT_TICKS_PER_BEAT = 480
+    END_OF_TRACK = b"\x00\xff\x2f\x00"
+    # Data length by status type, excluding the status byte
+    DATA_LENGTHS = {
+        0x80: 2,
+        0x90: 2,
+        0xA0: 2,
+        0xB0: 2,
+        0xC0: 1,
+        0xD0: 1,
+        0xE0: 2,
+    }
+
+    def __init__(self, track_count: int, ticks_per_beat=DEFAULT_TICKS_PER_BEAT):
+        self.ticks_per_beat = ticks_per_beat
+        self.tracks = [bytearray() for _ in range(track_count)]
+        self.message_counts = [0] * track_count
+        self.__running_status_bytes: list[int | None] = [None] * track_count
+
+    @staticmethod
+    def normalize_message(data: bytes):
+        if len(data) == 0:
+            raise ValueError("Invalid message length. length=0")
+
+        status_byte = data[0]
+        status_type = status_byte & 0xF0
+        if status_byte == 0xF0:
+            if len(data) < 2 or data[-1] != 0xF7:
+                raise ValueError("Invalid SysEx end byte.")
+            if not data[1:-1].isascii():
+                raise ValueError("Invalid data byte.")
+            return data
+
+        data_length = StandardMidiFileWriter.DATA_LENGTHS.get(status_type)
+        if data_length is None:
+            raise ValueError(f"Invalid status byte. status_byte={hex(status_byte)}")
+        if not data[1:].isascii():
+            raise ValueError("Invalid data byte.")
+        if status_type == 0xE0:
+            # Pitch bend keeps the first 2 data bytes
+            if len(data) < 1 + data_length:
+                raise ValueError(f"Invalid message length. length={len(data)}")
+            return data[: 1 + data_length]
+        if len(data) != 1 + data_length:
+            raise ValueError(f"Invalid message length. length={len(data)}")
+        return data
+
+    def append_meta_message(
+        self, track_index: int, delta_time: int, meta_type: int, data: bytes
+    ):
+        track = self.tracks[track_index]
+        track += encode_variable_length_quantity(delta_time)
+        track.append(0xFF)
+        track.append(meta_type)
+        track += encode_variable_length_quantity(len(data))
+        track += data
+        self.__running_status_bytes[track_index] = None
+
+    def append_message(self, track_index: int, delta_time: int, data: bytes):
+        track = self.tracks[track_index]
+        track += encode_variable_length_quantity(delta_time)
+
+        status_byte = data[0]
+        if status_byte == 0xF0:
+            track.append(0xF0)
+            track += encode_variable_length_quantity(len(data) - 1)
+            track += data[1:]
+            self.__running_status_bytes[track_index] = None
+        elif status_byte == self.__running_status_bytes[track_index]:
+            track += data[1:]
+        else:
+            track += data
+            self.__running_status_bytes[track_index] = status_byte
+
+        self.message_counts[track_index] += 1
+
+    def to_bytes(self, track_indices: Iterable[int] | None = None):
+        if track_indices is None:
+            track_indices = range(len(self.tracks))
+        track_indices = list(track_indices)
+
+        buffers = [
+            StandardMidiFileWriter.HEADER_LAYOUT.pack(
+                b"MThd", 6, 1, len(track_indices), self.ticks_per_beat
+            )
+        ]
+        for track_index in track_indices:
+            track = self.tracks[track_index]
+            buffers.append(
+                StandardMidiFileWriter.CHUNK_HEADER_LAYOUT.pack(
+                    b"MTrk", len(track) + len(StandardMidiFileWriter.END_OF_TRACK)
+                )
+            )
+            buffers.append(track)
+            buffers.append(StandardMidiFileWriter.END_OF_TRACK)
+        return b"".join(buffers)
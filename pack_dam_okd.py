@@ -9,7 +9,6 @@ import simplejson
 
 from dam_okd_utility.customized_logger import getLogger
 from dam_okd_utility.okd_file import OkdFile
-from dam_okd_utility.okd_file_data import OkdChunk
 from dam_okd_utility.okd_p_track_info_chunk import (
     OkdPTrackInfoChunk,
 )
@@ -55,22 +54,24 @@ class DamOkdPacker:
         raise ValueError(f"Unknown file type detected. mime_type={mime_type[0]}")
 
     @staticmethod
-    def pack(
-        output_stream: io.BufferedWriter,
-        *input_file_paths: str,
-    ):
-        chunks: list[OkdChunk] = []
+    def load_files(*input_file_paths: str):
         for input_file_path in input_file_paths:
             chunk = DamOkdPacker.load_file(input_file_path)
             if chunk is None:
                 continue
 
             if isinstance(chunk, list):
-                chunks.extend(chunk)
+                yield from chunk
             else:
-                chunks.append(chunk)
+                yield chunk
 
-        OkdFile.scramble(output_stream, chunks)
+    @staticmethod
+    def pack(
+        output_stream: io.BufferedWriter,
+        *input_file_paths: str,
+    ):
+        # Each chunk is written as soon as its input file is loaded
+        OkdFile.scramble(output_stream, DamOkdPacker.load_files(*input_file_paths))
 
 
 def main(argv=None):
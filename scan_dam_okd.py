@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import argparse
+import concurrent.futures
+import csv
+import io
+import logging
+import os
+import simplejson
+
+from dam_okd_utility.customized_logger import getLogger
+from dam_okd_utility.okd_file import OkdFile, OkdFileType
+from dam_okd_utility.okd_file_data import (
+    GenericOkdHeader,
+    MmtOkdHeader,
+    MmkOkdHeader,
+    SprOkdHeader,
+    DioOkdHeader,
+    OkaHeader,
+)
+from dam_okd_utility.okd_scramble import detect_scramble_index
+
+
+class DamOkdScanner:
+    HEADER_TYPE_NAMES = {
+        GenericOkdHeader: "Generic",
+        MmtOkdHeader: "Mmt",
+        MmkOkdHeader: "Mmk",
+        SprOkdHeader: "Spr",
+        DioOkdHeader: "Dio",
+        OkaHeader: "Oka",
+    }
+    FIELD_NAMES = [
+        "path",
+        "header_type",
+        "scramble_pattern_index",
+        "magic_bytes",
+        "length",
+        "version",
+        "id_karaoke",
+        "adpcm_offset",
+        "encryption_mode",
+        "yks_chunks_length",
+        "mmt_chunks_length",
+        "mmk_chunks_length",
+        "spr_chunks_length",
+        "dio_chunks_length",
+        "error",
+    ]
+
+    __logger = getLogger("DamOkdScanner")
+
+    @staticmethod
+    def initialize_worker():
+        # Per-file INFO messages would dominate the scan time
+        logging.getLogger("OkdFile").setLevel(logging.WARNING)
+
+    @staticmethod
+    def __detect_file_type(stream: io.BufferedReader):
+        magic_bytes_buffer = stream.read(4)
+        if magic_bytes_buffer == b"SPRC":
+            stream.seek(16)
+            magic_bytes_buffer = stream.read(4)
+        stream.seek(0)
+
+        try:
+            detect_scramble_index(magic_bytes_buffer, b"YKS1")
+            return OkdFileType.OKD
+        except RuntimeError:
+            pass
+        detect_scramble_index(magic_bytes_buffer, b"YOKA")
+        return OkdFileType.M3
+
+    @staticmethod
+    def scan_file(path: str):
+        row: dict[str, object] = {"path": path}
+        try:
+            with open(path, "rb") as stream:
+                file_type = DamOkdScanner.__detect_file_type(stream)
+                layout = OkdFile.read_layout(stream, file_type)
+        except Exception as error:
+            # A broken file must not stop the whole scan
+            row["error"] = f"{type(error).__name__}: {error}"
+            return row
+
+        header = layout.header
+        row["header_type"] = DamOkdScanner.HEADER_TYPE_NAMES[type(header)]
+        row["scramble_pattern_index"] = layout.scramble_pattern_index
+        for field_name, value in header._asdict().items():
+            if field_name not in DamOkdScanner.FIELD_NAMES:
+                continue
+            if isinstance(value, bytes):
+                value = value.decode("ascii", errors="replace")
+            row[field_name] = value
+        if isinstance(header, OkaHeader):
+            row["adpcm_offset"] = header.data_offset
+        return row
+
+    @staticmethod
+    def find_files(input_paths: list[str], extensions: list[str] | None = None):
+        for input_path in input_paths:
+            file_paths: list[str]
+            if os.path.isdir(input_path):
+                file_paths = []
+                for directory_path, directory_names, file_names in os.walk(input_path):
+                    directory_names.sort()
+                    for file_name in sorted(file_names):
+                        file_paths.append(os.path.join(directory_path, file_name))
+            else:
+                file_paths = [input_path]
+
+            for file_path in file_paths:
+                if extensions is not None:
+                    extension = os.path.splitext(file_path)[1].lower()
+                    if extension not in extensions:
+                        continue
+                yield file_path
+
+    @staticmethod
+    def scan(
+        output_stream: io.TextIOBase,
+        input_paths: list[str],
+        output_format="csv",
+        workers: int | None = None,
+        extensions: list[str] | None = None,
+    ):
+        DamOkdScanner.initialize_worker()
+
+        csv_writer: csv.DictWriter | None = None
+        if output_format == "csv":
+            csv_writer = csv.DictWriter(output_stream, DamOkdScanner.FIELD_NAMES)
+            csv_writer.writeheader()
+        elif output_format != "jsonl":
+            raise ValueError(f"Unknown output format. output_format={output_format}")
+
+        file_paths = DamOkdScanner.find_files(input_paths, extensions)
+        scanned_count = 0
+        with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=DamOkdScanner.initialize_worker
+        ) as executor:
+            for row in executor.map(DamOkdScanner.scan_file, file_paths, chunksize=64):
+                if csv_writer is not None:
+                    csv_writer.writerow(row)
+                else:
+                    output_stream.write(simplejson.dumps(row) + "\n")
+                scanned_count += 1
+
+        DamOkdScanner.__logger.info(f"Files scanned. scanned_count={scanned_count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DAM OKD Scanner")
+    parser.add_argument("output_path", help="Output CSV or JSON Lines file path")
+    parser.add_argument(
+        "input_path", help="Input DAM OKD file or directory path", nargs="+"
+    )
+    parser.add_argument(
+        "--format",
+        help="Output format",
+        choices=["csv", "jsonl"],
+        default="csv",
+    )
+    parser.add_argument("--workers", help="Worker process count", type=int)
+    parser.add_argument(
+        "--extension",
+        help="Scan only files with this extension (e.g. .okd)",
+        action="append",
+    )
+    args = parser.parse_args()
+
+    extensions: list[str] | None = None
+    if args.extension is not None:
+        extensions = [extension.lower() for extension in args.extension]
+
+    with open(args.output_path, "w", newline="", encoding="utf-8") as output_file:
+        DamOkdScanner.scan(
+            output_file, args.input_path, args.format, args.workers, extensions
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import io
+import os
+import tempfile
+import unittest
+
+from dam_okd_utility.mapped_stream import MappedStream
+
+
+class TestMappedStream(unittest.TestCase):
+    def test_read_seek(self):
+        buffer = bytes(range(0x10))
+        stream = MappedStream(buffer)
+        reference_stream = io.BytesIO(buffer)
+        for offset, whence, size in [
+            (0, os.SEEK_SET, 4),
+            (2, os.SEEK_CUR, None),
+            (-3, os.SEEK_END, -1),
+            (0x20, os.SEEK_SET, 4),
+            (-0x10, os.SEEK_CUR, 0),
+            (5, os.SEEK_SET, 0x100),
+        ]:
+            with self.subTest(offset=offset, whence=whence, size=size):
+                self.assertEqual(
+                    stream.seek(offset, whence), reference_stream.seek(offset, whence)
+                )
+                buffer = stream.read(size)
+                self.assertIsInstance(buffer, memoryview)
+                self.assertEqual(buffer, reference_stream.read(size))
+                self.assertEqual(stream.tell(), reference_stream.tell())
+
+        self.assertRaises(ValueError, stream.seek, -1)
+        self.assertRaises(ValueError, stream.seek, 0, 3)
+
+    def test_readinto(self):
+        stream = MappedStream(bytes(range(0x10)))
+        stream.seek(0xC)
+        buffer = bytearray(8)
+        self.assertEqual(stream.readinto(buffer), 4)
+        self.assertEqual(buffer, bytes(range(0xC, 0x10)) + b"\x00" * 4)
+        self.assertEqual(stream.readinto(buffer), 0)
+
+    def test_open(self):
+        with tempfile.TemporaryDirectory() as directory_path:
+            path = os.path.join(directory_path, "data")
+            with open(path, "wb") as file:
+                file.write(b"YKS1\x00\x01")
+            with MappedStream.open(path) as stream:
+                self.assertEqual(stream.read(4), b"YKS1")
+                # Slices may outlive the stream
+                buffer = stream.read()
+            self.assertEqual(buffer, b"\x00\x01")
+
+            empty_path = os.path.join(directory_path, "empty")
+            open(empty_path, "wb").close()
+            with MappedStream.open(empty_path) as stream:
+                self.assertEqual(stream.read(), b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
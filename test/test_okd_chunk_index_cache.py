@@ -0,0 +1,163 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from dam_okd_utility.okd_chunk_index_cache import (
+    OkdChunkIndexCache,
+    OkdChunkIndexCacheEntry,
+)
+from dam_okd_utility.okd_file import OkdFileType
+from dam_okd_utility.okd_reader import OkdReader
+from dam_okd_utility.okd_scramble import scramble_buffer
+
+
+def create_okd_file(chunk_data: bytes, scramble_pattern_index=0x10):
+    chunks_buffer = b"YKYI" + len(chunk_data).to_bytes(4, byteorder="big") + chunk_data
+    header_buffer = bytearray()
+    header_buffer += b"YKS1"
+    header_buffer += (32 + len(chunks_buffer)).to_bytes(4, byteorder="big")
+    header_buffer += b"YKS-1   v6.0v110"
+    header_buffer += b"\x00" * 16
+    return scramble_buffer(bytes(header_buffer), scramble_pattern_index) + (
+        scramble_buffer(chunks_buffer, scramble_pattern_index)
+    )
+
+
+class TestOkdChunkIndexCache(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.cache_directory_path = os.path.join(self.temporary_directory.name, "cache")
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def __write_file(self, file_name: str, buffer: bytes):
+        path = os.path.join(self.temporary_directory.name, file_name)
+        with open(path, "wb") as file:
+            file.write(buffer)
+        return path
+
+    def __entry_names(self):
+        return {
+            entry_name
+            for entry_name in os.listdir(self.cache_directory_path)
+            if entry_name.endswith(".json")
+        }
+
+    def test_hit(self):
+        path = self.__write_file("a.okd", create_okd_file(b"\x01\x02" * 4))
+        cache = OkdChunkIndexCache(self.cache_directory_path)
+        self.assertIsNone(cache.get(path))
+
+        with open(path, "rb") as stream:
+            reader = cache.open_reader(path, stream, OkdFileType.OKD)
+            chunks = reader.chunks()
+        entry = cache.get(path)
+        self.assertEqual(entry, OkdChunkIndexCacheEntry(reader.layout, chunks))
+
+        # A hit does not read the layout or the chunk index from the stream
+        cached_reader = cache.open_reader(path, io.BytesIO(), OkdFileType.OKD)
+        self.assertEqual(cached_reader.layout, reader.layout)
+        self.assertEqual(cached_reader.chunks(), chunks)
+
+    def test_invalidation(self):
+        path = self.__write_file("a.okd", create_okd_file(b"\x01\x02" * 4))
+        cache = OkdChunkIndexCache(self.cache_directory_path)
+        with open(path, "rb") as stream:
+            cache.put(
+                path,
+                OkdChunkIndexCacheEntry(OkdReader(stream, OkdFileType.OKD).layout, []),
+            )
+        stat_result = os.stat(path)
+        self.assertIsNotNone(cache.get(path))
+
+        # Same size and mtime, different content
+        self.__write_file("a.okd", create_okd_file(b"\x01\x02" * 4, 0x20))
+        os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+        self.assertIsNone(cache.get(path))
+
+        # Same content, different mtime
+        self.__write_file("a.okd", create_okd_file(b"\x01\x02" * 4))
+        os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+        self.assertIsNotNone(cache.get(path))
+        os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1000))
+        self.assertIsNone(cache.get(path))
+
+    def test_eviction(self):
+        paths = [
+            self.__write_file(file_name, create_okd_file(b"\x01\x02" * 4))
+            for file_name in ["a.okd", "b.okd", "c.okd"]
+        ]
+        cache = OkdChunkIndexCache(self.cache_directory_path)
+
+        entry_names: list[str] = []
+        for entry_time, path in enumerate(paths[:2]):
+            with open(path, "rb") as stream:
+                cache.open_reader(path, stream, OkdFileType.OKD)
+            (entry_name,) = self.__entry_names() - set(entry_names)
+            entry_names.append(entry_name)
+            # Deterministic use order regardless of the file system time resolution
+            os.utime(
+                os.path.join(self.cache_directory_path, entry_name),
+                (entry_time, entry_time),
+            )
+        entry_size = os.path.getsize(
+            os.path.join(self.cache_directory_path, entry_names[0])
+        )
+
+        # Using the first entry makes the second one least recently used
+        self.assertIsNotNone(cache.get(paths[0]))
+
+        cache = OkdChunkIndexCache(self.cache_directory_path, entry_size * 2 + 1)
+        with open(paths[2], "rb") as stream:
+            cache.open_reader(paths[2], stream, OkdFileType.OKD)
+        self.assertEqual(len(self.__entry_names()), 2)
+        self.assertIsNotNone(cache.get(paths[0]))
+        self.assertIsNone(cache.get(paths[1]))
+        self.assertIsNotNone(cache.get(paths[2]))
+
+    def test_eviction_on_overflow(self):
+        paths = [
+            self.__write_file(file_name, create_okd_file(b"\x01\x02" * 4))
+            for file_name in ["a.okd", "b.okd", "c.okd"]
+        ]
+        cache = OkdChunkIndexCache(self.cache_directory_path)
+        with open(paths[0], "rb") as stream:
+            cache.open_reader(paths[0], stream, OkdFileType.OKD)
+        (entry_name,) = self.__entry_names()
+        entry_size = os.path.getsize(
+            os.path.join(self.cache_directory_path, entry_name)
+        )
+
+        cache = OkdChunkIndexCache(self.cache_directory_path, entry_size * 2)
+        with mock.patch.object(cache, "evict", wraps=cache.evict) as evict:
+            # Within the limit, including the entry written by the previous cache
+            with open(paths[1], "rb") as stream:
+                cache.open_reader(paths[1], stream, OkdFileType.OKD)
+            evict.assert_not_called()
+
+            with open(paths[2], "rb") as stream:
+                cache.open_reader(paths[2], stream, OkdFileType.OKD)
+            evict.assert_called_once()
+        self.assertEqual(len(self.__entry_names()), 2)
+
+    def test_put_failure(self):
+        path = self.__write_file("a.okd", create_okd_file(b"\x01\x02" * 4))
+        cache = OkdChunkIndexCache(self.cache_directory_path)
+        with open(path, "rb") as stream:
+            entry = OkdChunkIndexCacheEntry(
+                OkdReader(stream, OkdFileType.OKD).layout, []
+            )
+
+        # Not an OSError, the temporary file must be removed anyway
+        with mock.patch("os.replace", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                cache.put(path, entry)
+        self.assertEqual(os.listdir(self.cache_directory_path), [])
+        self.assertIsNone(cache.get(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
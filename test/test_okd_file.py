@@ -0,0 +1,85 @@
+import io
+import random
+import unittest
+
+from dam_okd_utility.okd_adpcm_chunk import OkdAdpcmChunk
+from dam_okd_utility.okd_file import OkdFile, OkdFileType
+from dam_okd_utility.okd_file_data import OkdGenericChunk
+from dam_okd_utility.okd_midi import OkdMidiGenericMessage
+from dam_okd_utility.okd_p_track_chunk import OkdPTrackChunk
+
+
+class UnseekableStream(io.RawIOBase):
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def write(self, buffer: bytes):
+        self.buffer += buffer
+        return len(buffer)
+
+
+class TestOkdFile(unittest.TestCase):
+    def setUp(self):
+        self.chunks = [
+            OkdGenericChunk(b"YKYI", b"\x01\x02\x03"),
+            OkdPTrackChunk(
+                1,
+                [
+                    OkdMidiGenericMessage(0, b"\xb0\x07\x64", 0),
+                    OkdMidiGenericMessage(0x10, b"\x90\x3c\x40", 0x1E0),
+                ],
+            ),
+            OkdAdpcmChunk([b"\x10" * 0x11, b"\x20" * 0x20]),
+        ]
+
+    def test_scramble_unseekable(self):
+        stream = io.BytesIO()
+        OkdFile.scramble(stream, self.chunks, random.Random(0))
+        unseekable_stream = UnseekableStream()
+        OkdFile.scramble(unseekable_stream, iter(self.chunks), random.Random(0))
+        self.assertEqual(bytes(unseekable_stream.buffer), stream.getvalue())
+
+        chunks_stream = io.BytesIO()
+        header = OkdFile.descramble(
+            io.BytesIO(stream.getvalue()), chunks_stream, OkdFileType.OKD
+        )
+        self.assertEqual(header.length, len(stream.getvalue()) - 8)
+        chunks_stream.seek(0)
+        chunks_buffer = chunks_stream.getvalue()
+        index = OkdFile.index_chunk(chunks_stream)
+        self.assertEqual(len(index), len(self.chunks))
+        for (position, length), chunk in zip(index, self.chunks):
+            chunk_data_buffer = bytearray()
+            chunk.write(chunk_data_buffer)
+            chunk_data_buffer += b"\x00" * (len(chunk_data_buffer) % 2)
+            self.assertEqual(length, 8 + len(chunk_data_buffer))
+            self.assertEqual(
+                chunks_buffer[position + 8 : position + length], chunk_data_buffer
+            )
+        # Trailer
+        self.assertEqual(chunks_buffer[index[-1][0] + index[-1][1] :], b"\x00" * 4)
+
+    def test_scramble_unseekable_streaming(self):
+        unseekable_stream = UnseekableStream()
+        written_lengths: list[int] = []
+
+        class RecordingChunk(OkdGenericChunk):
+            def write(self, stream: bytearray):
+                written_lengths.append(len(unseekable_stream.buffer))
+                super().write(stream)
+
+        chunks = self.chunks + [RecordingChunk(b"YREC", b"\x00" * 0x10)]
+        OkdFile.scramble(unseekable_stream, chunks, random.Random(0))
+        # Earlier chunks reach the stream before the last one is encoded
+        self.assertEqual(len(written_lengths), 1)
+        self.assertLess(0x40, written_lengths[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,17 @@
+import array
 import bitstring
+import random
 import unittest
 
+from dam_okd_utility.byte_cursor import ByteCursor
 from dam_okd_utility.okd_midi import (
+    decode_variable_int,
+    decode_variable_ints,
+    decode_extended_variable_int,
+    encode_variable_int,
+    encode_extended_variable_int,
+    find_invalid_data_bytes,
+    is_data_bytes,
     read_variable_int,
     write_variable_int,
     read_extended_variable_int,
@@ -9,6 +19,31 @@ from dam_okd_utility.okd_midi import (
 )
 
 
+def read_variable_int_reference(stream: bitstring.BitStream):
+    value = 0
+    for i in range(3):
+        byte: int = stream.read("uint:8")
+        if byte & 0x80 == 0x80:
+            raise ValueError("Invalid data byte.")
+        value += byte << (i * 6)
+        if byte & 0x40 != 0x40:
+            return value
+    raise ValueError("Invalid byte sequence.")
+
+
+def read_extended_variable_int_reference(stream: bitstring.BitStream):
+    total_value = 0
+    while True:
+        byte: int = stream.peek("uint:8")
+        if byte & 0x80 == 0x80:
+            break
+        if byte == 0x00:
+            stream.bytepos += 1
+            break
+        total_value += read_variable_int_reference(stream)
+    return total_value
+
+
 class TestOkdMidi(unittest.TestCase):
     VALUES: list[tuple[int, bytes]] = [
         (0x000000, b"\x00"),
@@ -58,6 +93,80 @@ class TestOkdMidi(unittest.TestCase):
                 read_value = read_extended_variable_int(stream)
                 self.assertEqual(value, read_value)
 
+    def test_read_variable_int_from_byte_cursor(self):
+        for value, buffer in TestOkdMidi.VALUES:
+            with self.subTest(value=value, buffer=buffer):
+                stream = ByteCursor(buffer)
+                read_value = read_variable_int(stream)
+                self.assertEqual(value, read_value)
+                self.assertEqual(len(buffer), stream.bytepos)
+
+        with self.assertRaises(ValueError):
+            stream = ByteCursor(b"\x7f\x7f\x7f")
+            read_variable_int(stream)
+        with self.assertRaises(bitstring.ReadError):
+            stream = ByteCursor(b"\x7f")
+            read_variable_int(stream)
+
+    def test_read_extended_variable_int_from_byte_cursor(self):
+        for value, buffer in TestOkdMidi.EXTENDED_VALUES:
+            with self.subTest(value=value, buffer=buffer):
+                stream = ByteCursor(buffer + b"\x80")
+                read_value = read_extended_variable_int(stream)
+                self.assertEqual(value, read_value)
+
+    def test_decode_variable_int(self):
+        for value, buffer in TestOkdMidi.VALUES:
+            with self.subTest(value=value, buffer=buffer):
+                decoded = decode_variable_int(b"\x80" + buffer + b"\x80", 1)
+                self.assertEqual((value, 1 + len(buffer)), decoded)
+
+        with self.assertRaises(ValueError):
+            decode_variable_int(b"\x7f\x7f\x7f", 0)
+        with self.assertRaises(ValueError):
+            decode_variable_int(b"\x7f\x90", 0)
+        with self.assertRaises(bitstring.ReadError):
+            decode_variable_int(b"\x7f", 0)
+
+    def test_decode_variable_ints(self):
+        buffer = b"".join(buffer for _, buffer in TestOkdMidi.VALUES)
+        values, offset = decode_variable_ints(buffer, 0)
+        self.assertEqual(
+            array.array("I", [value for value, _ in TestOkdMidi.VALUES]), values
+        )
+        self.assertEqual(len(buffer), offset)
+
+        values, offset = decode_variable_ints(buffer + b"\x80", 1, 2)
+        self.assertEqual(array.array("I", [0x00003F, 0x00103F]), values)
+        self.assertEqual(4, offset)
+
+    def test_decode_extended_variable_int(self):
+        for value, buffer in TestOkdMidi.EXTENDED_VALUES:
+            with self.subTest(value=value, buffer=buffer):
+                decoded = decode_extended_variable_int(buffer + b"\x80", 0)
+                self.assertEqual((value, len(buffer)), decoded)
+
+    def test_decode_cross_check(self):
+        random_generator = random.Random(0)
+        for _ in range(1000):
+            buffer = bytes(
+                random_generator.choice([0x00, 0x3F, 0x40, 0x7F, 0x80])
+                for _ in range(random_generator.randrange(1, 8))
+            )
+            for read, decode in [
+                (read_variable_int_reference, decode_variable_int),
+                (read_extended_variable_int_reference, decode_extended_variable_int),
+            ]:
+                with self.subTest(buffer=buffer, read=read.__name__):
+                    stream = bitstring.BitStream(buffer)
+                    try:
+                        expected = (read(stream), stream.bytepos)
+                    except (ValueError, bitstring.ReadError) as error:
+                        with self.assertRaises(type(error)):
+                            decode(buffer, 0)
+                        continue
+                    self.assertEqual(expected, decode(buffer, 0))
+
     def test_write_extended_variable_int(self):
         for value, buffer in TestOkdMidi.EXTENDED_VALUES:
             with self.subTest(value=value, buffer=buffer):
@@ -66,6 +175,37 @@ class TestOkdMidi(unittest.TestCase):
                 written_buffer: bytes = stream.read("bytes")
                 self.assertEqual(buffer, written_buffer)
 
+    def test_encode_variable_int(self):
+        for value, buffer in TestOkdMidi.VALUES:
+            with self.subTest(value=value, buffer=buffer):
+                self.assertEqual(buffer, encode_variable_int(value))
+
+        with self.assertRaises(ValueError):
+            encode_variable_int(0x04104F)
+
+    def test_encode_extended_variable_int(self):
+        # Zero is written as nothing
+        for value, buffer in TestOkdMidi.EXTENDED_VALUES[1:]:
+            with self.subTest(value=value, buffer=buffer):
+                self.assertEqual(buffer, encode_extended_variable_int(value))
+
+    def test_is_data_bytes(self):
+        for data, expected in [
+            (b"", True),
+            (b"\x00\x7f", True),
+            (b"\x00\x80", False),
+            (b"\xff", False),
+        ]:
+            with self.subTest(data=data):
+                self.assertEqual(expected, is_data_bytes(data))
+                self.assertEqual(expected, is_data_bytes(memoryview(data)))
+
+    def test_find_invalid_data_bytes(self):
+        buffer = b"\x01\x90\x02\x03\xf7"
+        self.assertEqual([1, 4], find_invalid_data_bytes(buffer))
+        self.assertEqual([4], find_invalid_data_bytes(buffer, 2))
+        self.assertEqual([], find_invalid_data_bytes(buffer, 2, 4))
+
 
 if __name__ == "__main__":
     unittest.main()
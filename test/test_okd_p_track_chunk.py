@@ -0,0 +1,74 @@
+import unittest
+
+from dam_okd_utility.byte_cursor import ByteCursor
+from dam_okd_utility.okd_midi import OkdMidiGenericMessage
+from dam_okd_utility.okd_p_track_chunk import OkdLazyPTrackChunk
+from dam_okd_utility.okd_p_track_midi import OkdPTrackMidi
+
+
+class TestOkdLazyPTrackChunk(unittest.TestCase):
+    def setUp(self):
+        buffer = bytearray()
+        OkdPTrackMidi.write(
+            buffer,
+            [
+                OkdMidiGenericMessage(0, b"\xb0\x07\x64", 0),
+                OkdMidiGenericMessage(0x10, b"\x90\x3c\x40", 0x1E0),
+                OkdMidiGenericMessage(0x20, b"\xf0\x43\x10\x4c\xf7", 0),
+                OkdMidiGenericMessage(0x200, b"\x91\x3e\x40", 0x3C00),
+            ],
+        )
+        self.buffer = bytes(buffer)
+
+    def test_write_unmodified(self):
+        for access in [
+            lambda chunk: chunk.messages,
+            lambda chunk: list(chunk),
+            lambda chunk: list(chunk.iter_messages()),
+            lambda chunk: chunk.to_chunk(),
+            lambda chunk: chunk.to_json_serializable(),
+        ]:
+            p_track_chunk = OkdLazyPTrackChunk.read(ByteCursor(self.buffer), 0)
+            access(p_track_chunk)
+            stream = bytearray()
+            p_track_chunk.write(stream)
+            self.assertEqual(bytes(stream), self.buffer)
+
+    def test_messages_immutable(self):
+        p_track_chunk = OkdLazyPTrackChunk.read(ByteCursor(self.buffer), 0)
+        self.assertIsInstance(p_track_chunk.messages, tuple)
+        self.assertRaises(AttributeError, getattr, p_track_chunk.messages, "pop")
+
+        stream = bytearray()
+        p_track_chunk.write(stream)
+        self.assertEqual(bytes(stream), self.buffer)
+
+    def test_iter_messages(self):
+        p_track_chunk = OkdLazyPTrackChunk.read(ByteCursor(self.buffer), 0)
+        self.assertEqual(
+            list(p_track_chunk.iter_messages()),
+            list(OkdPTrackMidi.read(ByteCursor(self.buffer))),
+        )
+        self.assertFalse(p_track_chunk.is_decoded)
+
+        # Events are decoded one at a time, a broken tail is only hit when reached
+        broken_buffer = self.buffer[:3] + b"\x00" + b"\x10" * 4
+        messages = OkdLazyPTrackChunk(0, broken_buffer).iter_messages()
+        self.assertEqual(next(messages), OkdMidiGenericMessage(0, b"\xb0\x07\x64", 0))
+        self.assertRaises(ValueError, next, messages)
+
+    def test_write_modified(self):
+        p_track_chunk = OkdLazyPTrackChunk.read(ByteCursor(self.buffer), 0)
+        messages = p_track_chunk.messages[:2]
+        p_track_chunk.messages = messages
+
+        stream = bytearray()
+        p_track_chunk.write(stream)
+        expected_stream = bytearray()
+        OkdPTrackMidi.write(expected_stream, messages)
+        self.assertEqual(stream, expected_stream)
+        self.assertNotEqual(bytes(stream), self.buffer)
+
+
+if __name__ == "__main__":
+    unittest.main()
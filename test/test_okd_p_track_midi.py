@@ -0,0 +1,426 @@
+import bitstring
+import random
+import unittest
+
+from dam_okd_utility.byte_cursor import ByteCursor
+from dam_okd_utility.okd_compact_track import OkdCompactTrack
+from dam_okd_utility.okd_midi import (
+    MAX_INTERNED_DATA_LENGTH,
+    OkdMidiGenericMessage,
+    clear_interned_data,
+    encode_extended_variable_int,
+    encode_variable_int,
+    intern_data,
+    is_data_bytes,
+    read_extended_variable_int,
+    read_variable_int,
+)
+from dam_okd_utility.okd_p3_track_info_chunk import OkdP3TrackInfoChunk
+from dam_okd_utility.okd_p_track_info_chunk import (
+    OkdPTrackInfoChannelInfoEntry,
+    OkdPTrackInfoEntry,
+    OkdPTrackInfoChunk,
+)
+from dam_okd_utility.okd_p_track_midi import OkdPTrackMidi
+from dam_okd_utility.okd_p_track_midi_data import (
+    OkdPTrackRelocationTarget,
+    OkdPTrackRelocationPlan,
+    OkdPTrackInfoList,
+)
+from dam_okd_utility.standard_midi_file import StandardMidiFile, StandardMidiFileEvent
+
+
+def create_track_info_entry(track_number: int, ports: int):
+    return OkdPTrackInfoEntry(
+        track_number,
+        0x08,
+        0x0000,
+        [0x0000] * 16,
+        [0x0000] * 16,
+        [OkdPTrackInfoChannelInfoEntry(0xFF, ports, 0x0B, 0x0A)] * 16,
+        ports,
+    )
+
+
+def read_p_track_reference(stream: bitstring.BitStream):
+    track: list[OkdMidiGenericMessage] = []
+    while True:
+        end_of_track: bytes = stream.peek("bytes:4")
+        if end_of_track == b"\x00\x00\x00\x00":
+            break
+
+        delta_time = read_extended_variable_int(stream)
+        status_byte = stream.read("uint:8")
+        status_type = status_byte & 0xF0
+
+        data_length = {
+            0x80: 3,
+            0x90: 2,
+            0xA0: 1,
+            0xB0: 2,
+            0xC0: 1,
+            0xD0: 1,
+            0xE0: 2,
+        }.get(status_type, 0)
+        if status_byte == 0xF0:
+            start_position = stream.bytepos
+            while stream.read("uint:8") & 0x80 != 0x80:
+                pass
+            data_length = stream.bytepos - start_position
+            stream.bytepos = start_position
+        elif status_byte == 0xFE:
+            byte = stream.peek("uint:8")
+            if byte & 0xF0 == 0xA0:
+                data_length = 3
+            elif byte & 0xF0 == 0xC0:
+                data_length = 2
+
+        data_buffer = stream.read(8 * data_length).bytes
+        if (
+            status_byte != 0xF0
+            and status_byte != 0xFE
+            and not is_data_bytes(data_buffer)
+        ):
+            continue
+
+        duration = 0
+        if status_type == 0x80 or status_type == 0x90:
+            duration = read_variable_int(stream)
+
+        track.append(
+            OkdMidiGenericMessage(
+                delta_time,
+                status_byte.to_bytes(1, byteorder="big") + data_buffer,
+                duration,
+            )
+        )
+    return track
+
+
+def create_p_track_buffer(events: list[tuple[int, bytes, int | None]]):
+    buffer = bytearray()
+    for delta_time, data, duration in events:
+        buffer += encode_extended_variable_int(delta_time)
+        buffer += data
+        if duration is not None:
+            buffer += encode_variable_int(duration)
+    buffer += b"\x00\x00\x00\x00\x00\x00\x00\x00"
+    return bytes(buffer)
+
+
+P_TRACK_EVENTS: list[tuple[int, bytes, int | None]] = [
+    (0, b"\xb0\x07\x64", None),
+    (0, b"\x90\x3c\x40", 0x78),
+    (0x10, b"\xf0\x43\x10\x4c\x00\x00\x7e\x00\xf7", None),
+    # Invalid data byte, the message is skipped
+    (0x20, b"\xb1\x07\xc0", None),
+    (0x30, b"\x80\x3c\x40\x40", 0x3000),
+    (0x40, b"\xfe\xa1\x07\x64", None),
+    (0, b"\xfe\xc2\x05", None),
+    (0x4000, b"\xc2\x05", None),
+    (0, b"\xe3\x00\x40", None),
+    (0, b"\x90\x3c\x40", 0x78),
+]
+
+
+def note_durations_reference(events: list[tuple[int, bytes]]):
+    durations: list[int] = []
+    for index, (time, data) in enumerate(events):
+        if data[0] & 0xF0 != 0x90:
+            continue
+        note_off_time = time
+        for note_off_time_candidate, note_off_data in events[index:]:
+            if (
+                note_off_data[0] == 0x80 | (data[0] & 0x0F)
+                and note_off_data[1] == data[1]
+            ):
+                note_off_time = note_off_time_candidate
+                break
+        durations.append(note_off_time - time)
+    return durations
+
+
+class TestOkdPTrackMidi(unittest.TestCase):
+    def test_relative_time_tracks_to_absolute_time_tracks_order(self):
+        track_info = [
+            create_track_info_entry(0, 0x01),
+            create_track_info_entry(1, 0x02),
+        ]
+        relative_time_tracks = [
+            (
+                0,
+                [
+                    OkdMidiGenericMessage(0, b"\xb0\x07\x64", 0),
+                    OkdMidiGenericMessage(0, b"\xb1\x07\x64", 0),
+                    OkdMidiGenericMessage(10, b"\x90\x3c\x40", 10),
+                    OkdMidiGenericMessage(0, b"\xb0\x0a\x40", 0),
+                ],
+            ),
+            (
+                1,
+                [
+                    OkdMidiGenericMessage(0, b"\xb2\x07\x64", 0),
+                    OkdMidiGenericMessage(10, b"\xb2\x0a\x40", 0),
+                    OkdMidiGenericMessage(10, b"\xb2\x0b\x7f", 0),
+                ],
+            ),
+        ]
+
+        absolute_time_track = list(
+            OkdPTrackMidi.relative_time_tracks_to_absolute_time_tracks(
+                track_info, relative_time_tracks, False
+            )
+        )
+        self.assertEqual(
+            [
+                (message.time, message.track, message.data)
+                for message in absolute_time_track
+            ],
+            [
+                (0, 0, b"\xb0\x07\x64"),
+                (0, 1, b"\xb1\x07\x64"),
+                (0, 18, b"\xb2\x07\x64"),
+                (10, 0, b"\x90\x3c\x40"),
+                (10, 0, b"\xb0\x0a\x40"),
+                (10, 18, b"\xb2\x0a\x40"),
+                (20, 0, b"\x80\x3c\x40"),
+                (20, 18, b"\xb2\x0b\x7f"),
+            ],
+        )
+
+    def test_relocation_plan_compile(self):
+        single_channel_groups = [0x0000] * 16
+        single_channel_groups[1] = 0x0006
+        channel_groups = [0x0000] * 16
+        channel_groups[1] = 0x8001
+        channel_ports = [0x01] * 16
+        channel_ports[1] = 0x05
+        relocation_plan = OkdPTrackRelocationPlan.compile(
+            channel_ports, single_channel_groups, channel_groups, 0x0003
+        )
+
+        self.assertEqual(
+            relocation_plan.system_ex_targets,
+            (OkdPTrackRelocationTarget(0, 0, 0), OkdPTrackRelocationTarget(1, 16, 0)),
+        )
+        self.assertEqual(
+            relocation_plan.channel_targets[False][0],
+            (OkdPTrackRelocationTarget(0, 0, 0),),
+        )
+        self.assertEqual(
+            relocation_plan.channel_targets[False][1],
+            (
+                OkdPTrackRelocationTarget(0, 1, 1),
+                OkdPTrackRelocationTarget(0, 2, 2),
+                OkdPTrackRelocationTarget(2, 33, 1),
+                OkdPTrackRelocationTarget(2, 34, 2),
+            ),
+        )
+        self.assertEqual(
+            relocation_plan.channel_targets[True][1],
+            (
+                OkdPTrackRelocationTarget(0, 0, 0),
+                OkdPTrackRelocationTarget(0, 15, 15),
+                OkdPTrackRelocationTarget(2, 32, 0),
+                OkdPTrackRelocationTarget(2, 47, 15),
+            ),
+        )
+        self.assertEqual(relocation_plan.channel_targets[True][0], ())
+
+    def test_track_info_list(self):
+        p_track_info_chunk = OkdPTrackInfoChunk(
+            [
+                create_track_info_entry(0, 0x01),
+                create_track_info_entry(2, 0x02)._replace(track_status=0x00),
+                create_track_info_entry(2, 0x04),
+            ]
+        )
+        stream = bytearray()
+        p_track_info_chunk.write(stream)
+        track_info = OkdPTrackInfoChunk.read(bytes(stream)).data
+
+        self.assertIsInstance(track_info, OkdPTrackInfoList)
+        self.assertEqual(list(track_info), p_track_info_chunk.data)
+        # Derived at parse time
+        self.assertEqual(len(track_info.entry_states), 3)
+        self.assertTrue(track_info.find(0).is_lossless_track)
+        # The last entry wins on duplicate track numbers
+        self.assertEqual(track_info.find(2).index, 2)
+        self.assertEqual(
+            track_info.find(2).relocation_plan.system_ex_targets,
+            (OkdPTrackRelocationTarget(2, 32, 0),),
+        )
+        self.assertIsNone(track_info.find(1))
+
+    def test_p3_track_info(self):
+        entry = create_track_info_entry(1, 0x04)
+        stream = bytearray()
+        OkdP3TrackInfoChunk(*entry).write(stream)
+        p3_track_info_chunk = OkdP3TrackInfoChunk.read(bytes(stream))
+
+        self.assertEqual(p3_track_info_chunk, entry)
+        track_info = p3_track_info_chunk.track_info
+        self.assertIsInstance(track_info, OkdPTrackInfoList)
+        self.assertIs(p3_track_info_chunk.track_info, track_info)
+        self.assertIs(track_info.find(1).entry, p3_track_info_chunk)
+        self.assertEqual(
+            track_info.find(1).relocation_plan.system_ex_targets,
+            (OkdPTrackRelocationTarget(2, 32, 0),),
+        )
+
+        relative_time_tracks = [(1, [OkdMidiGenericMessage(0, b"\xb0\x07\x64", 0)])]
+        self.assertEqual(
+            list(
+                OkdPTrackMidi.relative_time_tracks_to_absolute_time_tracks(
+                    [p3_track_info_chunk], relative_time_tracks, False
+                )
+            ),
+            list(
+                OkdPTrackMidi.relative_time_tracks_to_absolute_time_tracks(
+                    [entry], relative_time_tracks, False
+                )
+            ),
+        )
+
+    def test_note_durations(self):
+        random_generator = random.Random(0)
+        random_events: list[tuple[int, bytes]] = []
+        time = 0
+        for _ in range(2000):
+            time += random_generator.choice([0, 0, 10, 40])
+            status_byte = random_generator.choice(
+                [0x80, 0x90]
+            ) | random_generator.randrange(3)
+            note_number = random_generator.randrange(60, 64)
+            velocity = random_generator.choice([0x00, 0x40])
+            random_events.append((time, bytes([status_byte, note_number, velocity])))
+
+        for name, events in [
+            (
+                "retrigger",
+                [
+                    (0, b"\x90\x3c\x40"),
+                    (10, b"\x90\x3c\x40"),
+                    (20, b"\x80\x3c\x40"),
+                    (30, b"\x80\x3c\x40"),
+                ],
+            ),
+            (
+                "missing_note_off",
+                [
+                    (0, b"\x90\x3c\x40"),
+                    (10, b"\x90\x3e\x40"),
+                    (20, b"\x80\x3e\x40"),
+                ],
+            ),
+            (
+                "channels",
+                [
+                    (0, b"\x90\x3c\x40"),
+                    (0, b"\x91\x3c\x40"),
+                    (10, b"\x81\x3c\x40"),
+                    (20, b"\x80\x3c\x40"),
+                ],
+            ),
+            (
+                "velocity_zero",
+                [
+                    (0, b"\x90\x3c\x40"),
+                    (10, b"\x90\x3c\x00"),
+                    (20, b"\x80\x3c\x40"),
+                ],
+            ),
+            (
+                "same_time",
+                [
+                    (0, b"\x80\x3c\x40"),
+                    (0, b"\x90\x3c\x40"),
+                    (10, b"\x80\x3c\x40"),
+                    (10, b"\x90\x3c\x40"),
+                    (10, b"\x80\x3c\x40"),
+                ],
+            ),
+            ("random", random_events),
+        ]:
+            with self.subTest(name=name):
+                # 125 BPM at 480 ticks per beat keeps times unconverted
+                smf = StandardMidiFile(
+                    1,
+                    480,
+                    [
+                        [StandardMidiFileEvent(0, b"\xff\x51\x03\x07\x53\x00")],
+                        [StandardMidiFileEvent(time, data) for time, data in events],
+                    ],
+                )
+                relative_time_tracks = OkdPTrackMidi.smf_to_relative_time_tracks(smf)
+                self.assertEqual(
+                    [
+                        message.duration
+                        for message in relative_time_tracks[0]
+                        if message.data[0] & 0xF0 == 0x90
+                    ],
+                    note_durations_reference(events),
+                )
+
+    def test_read_event_table(self):
+        buffer = create_p_track_buffer(P_TRACK_EVENTS)
+        expected_messages = read_p_track_reference(bitstring.BitStream(buffer))
+        self.assertEqual(len(expected_messages), len(P_TRACK_EVENTS) - 1)
+
+        event_table = OkdPTrackMidi.read_event_table(ByteCursor(buffer))
+        self.assertEqual(len(event_table), len(expected_messages))
+        self.assertEqual(list(event_table), expected_messages)
+        self.assertEqual(event_table.messages(), expected_messages)
+        self.assertEqual(OkdPTrackMidi.read(ByteCursor(buffer)), expected_messages)
+
+        absolute_time = 0
+        for index, expected_message in enumerate(expected_messages):
+            absolute_time += expected_message.delta_time
+            self.assertEqual(event_table.absolute_times[index], absolute_time)
+            self.assertEqual(event_table.statuses[index], expected_message.data[0])
+
+    def test_compact_track(self):
+        buffer = create_p_track_buffer(P_TRACK_EVENTS)
+        expected_messages = read_p_track_reference(bitstring.BitStream(buffer))
+
+        compact_track = OkdCompactTrack(
+            OkdPTrackMidi.read_event_table(ByteCursor(buffer))
+        )
+        self.assertEqual(len(compact_track), len(expected_messages))
+        self.assertEqual(list(compact_track), expected_messages)
+        self.assertEqual(compact_track, expected_messages)
+        self.assertEqual(compact_track[1], expected_messages[1])
+        self.assertEqual(compact_track[-1], expected_messages[-1])
+        self.assertEqual(compact_track[2:5], expected_messages[2:5])
+        # Repeated payloads are stored once
+        self.assertEqual(
+            len(compact_track.data_table),
+            len({message.data for message in expected_messages}),
+        )
+
+        compact_track.append(OkdMidiGenericMessage(0, b"\x90\x3c\x40", 0x10))
+        self.assertEqual(
+            compact_track[-1], OkdMidiGenericMessage(0, b"\x90\x3c\x40", 0x10)
+        )
+        self.assertNotEqual(compact_track, expected_messages)
+
+    def test_intern_data(self):
+        buffer = create_p_track_buffer(P_TRACK_EVENTS)
+        messages = OkdPTrackMidi.read(ByteCursor(buffer))
+        other_messages = OkdPTrackMidi.read(ByteCursor(bytes(buffer)))
+        self.assertEqual(messages, other_messages)
+        for message, other_message in zip(messages, other_messages):
+            if len(message.data) <= MAX_INTERNED_DATA_LENGTH:
+                self.assertIs(message.data, other_message.data)
+            else:
+                self.assertIsNot(message.data, other_message.data)
+
+        data = bytes([0xB5, 0x07, 0x11])
+        interned = intern_data(data[:1] + data[1:])
+        self.assertIs(intern_data(data[:1] + data[1:]), interned)
+        clear_interned_data()
+        self.assertIsNot(intern_data(data[:1] + data[1:]), interned)
+
+
+if __name__ == "__main__":
+    unittest.main()
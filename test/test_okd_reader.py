@@ -0,0 +1,157 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+
+from dam_okd_utility.mapped_stream import MappedStream
+from dam_okd_utility.okd_file import OkdFile, OkdFileType
+from dam_okd_utility.okd_file_data import OkdChunkIndexEntry, OkdGenericChunk
+from dam_okd_utility.okd_midi import OkdMidiGenericMessage
+from dam_okd_utility.okd_p_track_midi import OkdPTrackMidi
+from dam_okd_utility.okd_reader import OkdReader
+from dam_okd_utility.okd_scramble import scramble_buffer
+
+
+def create_chunk_buffer(chunk_id: bytes, chunk_data: bytes):
+    return chunk_id + len(chunk_data).to_bytes(4, byteorder="big") + chunk_data
+
+
+def create_p_track_chunk_buffer():
+    p_track_buffer = bytearray()
+    OkdPTrackMidi.write(
+        p_track_buffer,
+        [
+            OkdMidiGenericMessage(0, b"\xb0\x07\x64", 0),
+            OkdMidiGenericMessage(0x10, b"\x90\x3c\x40", 0x1E0),
+            OkdMidiGenericMessage(0x20, b"\x91\x3e\x40", 0x3C00),
+        ],
+    )
+    if len(p_track_buffer) % 2 != 0:
+        p_track_buffer += b"\x00"
+    return create_chunk_buffer(b"\xffPR\x00", bytes(p_track_buffer))
+
+
+def create_okd_file(
+    chunks_buffer: bytes, extended_data_buffer=b"", scramble_pattern_index=0xF0
+):
+    adpcm_offset = 0
+    if len(extended_data_buffer) != 0:
+        adpcm_offset = 40 + len(chunks_buffer)
+    header_buffer = bytearray()
+    header_buffer += b"YKS1"
+    header_buffer += (32 + len(chunks_buffer) + len(extended_data_buffer)).to_bytes(
+        4, byteorder="big"
+    )
+    header_buffer += b"YKS-1   v6.0v110"
+    header_buffer += (0).to_bytes(4, byteorder="big")
+    header_buffer += adpcm_offset.to_bytes(4, byteorder="big")
+    header_buffer += (0).to_bytes(4, byteorder="big")
+    header_buffer += (0).to_bytes(4, byteorder="big")
+    # Chunks restart the key stream of the header
+    return (
+        scramble_buffer(bytes(header_buffer), scramble_pattern_index)
+        + scramble_buffer(chunks_buffer, scramble_pattern_index)
+        + extended_data_buffer
+    )
+
+
+class TestOkdReader(unittest.TestCase):
+    def setUp(self):
+        random_generator = random.Random(0)
+        chunks_buffer = b"".join(
+            [
+                create_chunk_buffer(b"YKYI", random_generator.randbytes(0x20)),
+                create_p_track_chunk_buffer(),
+                create_chunk_buffer(b"YEMP", b""),
+                create_chunk_buffer(b"YMMT", random_generator.randbytes(0x1002)),
+            ]
+        )
+        extended_data_buffer = create_chunk_buffer(
+            b"YEXT", random_generator.randbytes(0x102)
+        )
+        self.okd_files = {
+            "chunks": create_okd_file(chunks_buffer),
+            "extended_data": create_okd_file(chunks_buffer, extended_data_buffer),
+        }
+
+    def assertReaderEqual(self, reader: OkdReader, okd_file: bytes):
+        chunks_stream = io.BytesIO()
+        header = OkdFile.descramble(
+            io.BytesIO(okd_file), chunks_stream, OkdFileType.OKD
+        )
+        chunks_stream.seek(0)
+        chunks_buffer = chunks_stream.getvalue()
+        index = OkdFile.index_chunk(chunks_stream)
+
+        self.assertEqual(reader.header, header)
+        self.assertEqual(
+            reader.chunks(),
+            [
+                OkdChunkIndexEntry(
+                    chunks_buffer[position : position + 4], position, length - 8
+                )
+                for position, length in index
+            ],
+        )
+        for chunk_index, (position, length) in enumerate(index):
+            chunk_buffer = chunks_buffer[position : position + length]
+            chunk_id = chunk_buffer[0:4]
+            self.assertEqual(reader.read_chunk_buffer(chunk_index), chunk_buffer)
+            self.assertEqual(reader.find(chunk_id), chunk_index)
+
+            chunk = reader.get(chunk_id, lazy_p_track=True)
+            expected_chunk = OkdFile.parse_chunk(chunk_buffer, lazy_p_track=True)
+            if isinstance(expected_chunk, OkdGenericChunk):
+                self.assertEqual(chunk, expected_chunk)
+            else:
+                self.assertEqual(chunk.messages, expected_chunk.messages)
+            self.assertEqual(reader.get(chunk_id), OkdFile.parse_chunk(chunk_buffer))
+        self.assertIsNone(reader.find(b"YNUL"))
+        self.assertIsNone(reader.get(b"YNUL"))
+
+    def test_reader(self):
+        for name, okd_file in self.okd_files.items():
+            with self.subTest(name=name):
+                reader = OkdReader(io.BytesIO(okd_file), OkdFileType.OKD)
+                self.assertReaderEqual(reader, okd_file)
+
+    def test_reader_file(self):
+        with tempfile.TemporaryDirectory() as directory_path:
+            for name, okd_file in self.okd_files.items():
+                with self.subTest(name=name):
+                    path = os.path.join(directory_path, name + ".okd")
+                    with open(path, "wb") as file:
+                        file.write(okd_file)
+                    with open(path, "rb") as stream:
+                        reader = OkdReader(stream, OkdFileType.OKD)
+                        self.assertReaderEqual(reader, okd_file)
+
+    def test_reader_mapped_stream(self):
+        with tempfile.TemporaryDirectory() as directory_path:
+            for name, okd_file in self.okd_files.items():
+                with self.subTest(name=name):
+                    path = os.path.join(directory_path, name + ".okd")
+                    with open(path, "wb") as file:
+                        file.write(okd_file)
+                    with MappedStream.open(path) as stream:
+                        reader = OkdReader(stream, OkdFileType.OKD)
+                        self.assertReaderEqual(reader, okd_file)
+                        if name == "extended_data":
+                            # Extended data is not scrambled and is not copied
+                            self.assertIsInstance(
+                                reader.read_chunk_buffer(len(reader.chunks()) - 1),
+                                memoryview,
+                            )
+
+    def test_reader_cached_index(self):
+        okd_file = self.okd_files["extended_data"]
+        reader = OkdReader(io.BytesIO(okd_file), OkdFileType.OKD)
+        cached_reader = OkdReader(
+            io.BytesIO(okd_file), OkdFileType.OKD, reader.layout, reader.chunks()
+        )
+        self.assertReaderEqual(cached_reader, okd_file)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,318 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+import unittest.mock
+
+from dam_okd_utility import okd_scramble
+from dam_okd_utility.mapped_stream import MappedStream
+from dam_okd_utility.okd_scramble import (
+    copy_stream,
+    descramble_buffer,
+    descramble_stream,
+    detect_scramble_index,
+    next_scramble_pattern_index,
+    scramble_buffer,
+)
+from dam_okd_utility.okd_scramble_pattern import OKD_SCRAMBLE_PATTERN
+
+
+def descramble_buffer_reference(buffer: bytes, scramble_pattern_index: int | None):
+    output_buffer = bytearray()
+    for offset in range(0, len(buffer), 2):
+        plaintext_buffer = buffer[offset : offset + 2]
+        if len(plaintext_buffer) != 2:
+            raise RuntimeError("Invalid plaintext_buffer length.")
+        plaintext = int.from_bytes(plaintext_buffer, byteorder="big")
+        scramble_pattern: int
+        if scramble_pattern_index is None:
+            scramble_pattern = 0x17D7
+        else:
+            scramble_pattern = OKD_SCRAMBLE_PATTERN[scramble_pattern_index % 0x100]
+        scrambled = plaintext ^ scramble_pattern
+        output_buffer += scrambled.to_bytes(2, byteorder="big")
+        if scramble_pattern_index is not None:
+            scramble_pattern_index += 1
+    return bytes(output_buffer)
+
+
+def descramble_stream_reference(
+    input_stream: io.BufferedReader,
+    output_stream: io.BufferedWriter,
+    scramble_pattern_index: int | None,
+    length: int | None = None,
+):
+    start_position = input_stream.tell()
+    while length is None or (input_stream.tell() - start_position) < length:
+        plaintext_buffer = input_stream.read(2)
+        if length is None and len(plaintext_buffer) == 0:
+            break
+        output_stream.write(
+            descramble_buffer_reference(plaintext_buffer, scramble_pattern_index)
+        )
+        if scramble_pattern_index is not None:
+            scramble_pattern_index += 1
+    return scramble_pattern_index
+
+
+def detect_scramble_index_reference(buffer: bytes, magic_bytes: bytes):
+    magic_bytes_int = int.from_bytes(buffer[0:4], byteorder="big")
+    expected_magic_bytes_int = int.from_bytes(magic_bytes, byteorder="big")
+    if magic_bytes_int == expected_magic_bytes_int:
+        return None
+    expected_key = magic_bytes_int ^ expected_magic_bytes_int
+    for scramble_pattern_index in range(0x100):
+        candidated_key: int
+        if scramble_pattern_index == 0xFF:
+            candidated_key = 0x87D2
+        else:
+            candidated_key = OKD_SCRAMBLE_PATTERN[scramble_pattern_index + 1]
+        candidated_key |= OKD_SCRAMBLE_PATTERN[scramble_pattern_index] << 16
+        if expected_key == candidated_key:
+            return scramble_pattern_index
+    raise RuntimeError("Failed to detect OKD file scramble_pattern_index.")
+
+
+class TestOkdScramble(unittest.TestCase):
+    def test_descramble_buffer(self):
+        random_generator = random.Random(0)
+        for scramble_pattern_index in [None, 0, 1, 0xFE, 0xFF, 0x100, 0x1F3]:
+            for length in [0, 2, 4, 0x1FE, 0x200, 0x202, 0x1000]:
+                buffer = random_generator.randbytes(length)
+                with self.subTest(
+                    scramble_pattern_index=scramble_pattern_index, length=length
+                ):
+                    self.assertEqual(
+                        descramble_buffer(buffer, scramble_pattern_index),
+                        descramble_buffer_reference(buffer, scramble_pattern_index),
+                    )
+                    with unittest.mock.patch.object(okd_scramble, "numpy", None):
+                        self.assertEqual(
+                            descramble_buffer(buffer, scramble_pattern_index),
+                            descramble_buffer_reference(buffer, scramble_pattern_index),
+                        )
+                    self.assertEqual(
+                        scramble_buffer(buffer, scramble_pattern_index),
+                        descramble_buffer_reference(buffer, scramble_pattern_index),
+                    )
+
+    def test_descramble_buffer_odd_length(self):
+        for length in [1, 3, 0x201]:
+            with self.subTest(length=length):
+                self.assertRaises(
+                    RuntimeError, descramble_buffer, os.urandom(length), 0
+                )
+                self.assertRaises(
+                    RuntimeError, descramble_buffer_reference, os.urandom(length), 0
+                )
+
+    def test_next_scramble_pattern_index(self):
+        buffer = random.Random(1).randbytes(0x300)
+        # Descrambling in pieces continues the key stream
+        for scramble_pattern_index in [None, 0, 0xF0]:
+            output_buffer = bytearray()
+            next_index = scramble_pattern_index
+            for offset in range(0, len(buffer), 0x32):
+                piece = buffer[offset : offset + 0x32]
+                output_buffer += descramble_buffer(piece, next_index)
+                next_index = next_scramble_pattern_index(next_index, len(piece))
+            self.assertEqual(
+                bytes(output_buffer),
+                descramble_buffer_reference(buffer, scramble_pattern_index),
+            )
+
+    def test_descramble_stream(self):
+        buffer = random.Random(2).randbytes(0x1000)
+        for scramble_pattern_index in [None, 0, 0xFF, 0x1F3]:
+            for length in [None, 0, 1, 2, 0x1FF, 0x200, 0x7FF, 0xFFE]:
+                for block_size in [2, 0x100, 0x10000]:
+                    with self.subTest(
+                        scramble_pattern_index=scramble_pattern_index,
+                        length=length,
+                        block_size=block_size,
+                    ):
+                        input_stream = io.BytesIO(buffer)
+                        input_stream.seek(2)
+                        output_stream = io.BytesIO()
+                        next_index = descramble_stream(
+                            input_stream,
+                            output_stream,
+                            scramble_pattern_index,
+                            length,
+                            block_size,
+                        )
+
+                        reference_input_stream = io.BytesIO(buffer)
+                        reference_input_stream.seek(2)
+                        reference_output_stream = io.BytesIO()
+                        reference_next_index = descramble_stream_reference(
+                            reference_input_stream,
+                            reference_output_stream,
+                            scramble_pattern_index,
+                            length,
+                        )
+
+                        self.assertEqual(
+                            output_stream.getvalue(),
+                            reference_output_stream.getvalue(),
+                        )
+                        self.assertEqual(next_index, reference_next_index)
+                        self.assertEqual(
+                            input_stream.tell(), reference_input_stream.tell()
+                        )
+
+    def test_descramble_stream_workers(self):
+        buffer = random.Random(5).randbytes(0x1000)
+        for slice_size in [0x100, 0x1000000]:
+            for scramble_pattern_index in [None, 0, 0xFF, 0x1F3]:
+                for length in [None, 0, 1, 2, 0x1FF, 0x202, 0xFFE]:
+                    for workers in [1, 2, 3, 8]:
+                        with self.subTest(
+                            slice_size=slice_size,
+                            scramble_pattern_index=scramble_pattern_index,
+                            length=length,
+                            workers=workers,
+                        ), unittest.mock.patch.object(
+                            okd_scramble, "OKD_SCRAMBLE_PARALLEL_SLICE_SIZE", slice_size
+                        ):
+                            input_stream = io.BytesIO(buffer)
+                            input_stream.seek(2)
+                            output_stream = io.BytesIO()
+                            next_index = descramble_stream(
+                                input_stream,
+                                output_stream,
+                                scramble_pattern_index,
+                                length,
+                                0x40,
+                                workers,
+                            )
+
+                            reference_input_stream = io.BytesIO(buffer)
+                            reference_input_stream.seek(2)
+                            reference_output_stream = io.BytesIO()
+                            reference_next_index = descramble_stream_reference(
+                                reference_input_stream,
+                                reference_output_stream,
+                                scramble_pattern_index,
+                                length,
+                            )
+
+                            self.assertEqual(
+                                output_stream.getvalue(),
+                                reference_output_stream.getvalue(),
+                            )
+                            self.assertEqual(next_index, reference_next_index)
+                            self.assertEqual(
+                                input_stream.tell(), reference_input_stream.tell()
+                            )
+
+        # Memory-mapped input and the serial fallback without NumPy
+        for numpy_module in [okd_scramble.numpy, None]:
+            with self.subTest(numpy=numpy_module), unittest.mock.patch.object(
+                okd_scramble, "numpy", numpy_module
+            ):
+                output_stream = io.BytesIO()
+                descramble_stream(MappedStream(buffer), output_stream, 0x10, workers=4)
+                self.assertEqual(
+                    output_stream.getvalue(), descramble_buffer_reference(buffer, 0x10)
+                )
+
+        for workers in [0, -1]:
+            self.assertRaises(
+                ValueError,
+                descramble_stream,
+                io.BytesIO(buffer),
+                io.BytesIO(),
+                0,
+                workers=workers,
+            )
+        self.assertRaises(
+            RuntimeError,
+            descramble_stream,
+            io.BytesIO(b"\x00" * 4),
+            io.BytesIO(),
+            0,
+            6,
+            workers=2,
+        )
+
+    def test_descramble_stream_invalid(self):
+        # An odd trailing byte or a short stream cannot be descrambled
+        self.assertRaises(
+            RuntimeError, descramble_stream, io.BytesIO(b"\x00" * 3), io.BytesIO(), 0
+        )
+        self.assertRaises(
+            RuntimeError,
+            descramble_stream,
+            io.BytesIO(b"\x00" * 4),
+            io.BytesIO(),
+            0,
+            6,
+        )
+        self.assertRaises(
+            ValueError,
+            descramble_stream,
+            io.BytesIO(b"\x00" * 4),
+            io.BytesIO(),
+            0,
+            None,
+            3,
+        )
+
+    def test_copy_stream(self):
+        buffer = random.Random(3).randbytes(0x3001)
+        for block_size in [2, 0x1000, 0x10000]:
+            with self.subTest(block_size=block_size):
+                input_stream = io.BytesIO(buffer)
+                input_stream.seek(5)
+                output_stream = io.BytesIO()
+                output_stream.write(b"head")
+                copy_stream(input_stream, output_stream, block_size)
+                self.assertEqual(output_stream.getvalue(), b"head" + buffer[5:])
+
+        with tempfile.TemporaryDirectory() as directory_path:
+            input_path = os.path.join(directory_path, "input")
+            output_path = os.path.join(directory_path, "output")
+            with open(input_path, "wb") as input_file:
+                input_file.write(buffer)
+            # Regular files take the file descriptor path
+            with open(input_path, "rb") as input_stream, open(
+                output_path, "wb"
+            ) as output_stream:
+                input_stream.read(5)
+                output_stream.write(b"head")
+                copy_stream(input_stream, output_stream)
+                output_stream.write(b"tail")
+                self.assertEqual(input_stream.read(), b"")
+            with open(output_path, "rb") as output_file:
+                self.assertEqual(output_file.read(), b"head" + buffer[5:] + b"tail")
+
+    def test_detect_scramble_index(self):
+        random_generator = random.Random(4)
+        for magic_bytes in [b"YKS1", b"YOKA"]:
+            buffers = [magic_bytes, random_generator.randbytes(4)]
+            for scramble_pattern_index in range(0x100):
+                buffers.append(scramble_buffer(magic_bytes, scramble_pattern_index))
+            buffers.append(scramble_buffer(magic_bytes, None))
+            for buffer in buffers:
+                with self.subTest(magic_bytes=magic_bytes, buffer=buffer):
+                    try:
+                        expected = detect_scramble_index_reference(buffer, magic_bytes)
+                    except RuntimeError:
+                        self.assertRaises(
+                            RuntimeError, detect_scramble_index, buffer, magic_bytes
+                        )
+                        continue
+                    self.assertEqual(
+                        detect_scramble_index(buffer + b"\x00\x00", magic_bytes),
+                        expected,
+                    )
+
+        # Without magic bytes, both file types are tried
+        self.assertEqual(detect_scramble_index(scramble_buffer(b"YOKA", 0x42)), 0x42)
+        self.assertRaises(RuntimeError, detect_scramble_index, b"YKS")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import io
+import os
+import simplejson
+import tempfile
+import unittest
+
+from dam_okd_utility.okd_scramble import scramble_buffer
+from scan_dam_okd import DamOkdScanner
+
+
+def create_okd_file(
+    option_data: bytes,
+    scramble_pattern_index=7,
+    adpcm_offset=0,
+    chunks_buffer=b"YPTI\x00\x00\x00\x02\x00\x00",
+):
+    plaintext = bytearray()
+    plaintext += b"YKS1"
+    plaintext += (32 + len(option_data) + len(chunks_buffer)).to_bytes(4, "big")
+    plaintext += b"YKS-1   v6.0v110"
+    plaintext += (0x12345678).to_bytes(4, "big")
+    plaintext += adpcm_offset.to_bytes(4, "big")
+    plaintext += (0).to_bytes(4, "big")
+    plaintext += len(option_data).to_bytes(4, "big")
+    plaintext += option_data
+    plaintext += chunks_buffer
+    return scramble_buffer(bytes(plaintext), scramble_pattern_index)
+
+
+def create_oka_file(scramble_pattern_index=3):
+    data = b"\x00\x01" * 8
+    plaintext = bytearray()
+    plaintext += b"YOKA"
+    plaintext += (32 + len(data)).to_bytes(4, "big")
+    plaintext += b"YKS-1   v6.0v110"
+    plaintext += (0x00000042).to_bytes(4, "big")
+    plaintext += (40 + 8).to_bytes(4, "big")
+    plaintext += (0).to_bytes(4, "big")
+    plaintext += (0xABCD).to_bytes(4, "big")
+    plaintext += data
+    return scramble_buffer(bytes(plaintext), scramble_pattern_index)
+
+
+def create_option_data(chunk_lengths: list[int], crc_count: int, padding_length=0):
+    option_data = bytearray()
+    for chunk_length in chunk_lengths:
+        option_data += chunk_length.to_bytes(4, "big")
+    for crc_index in range(crc_count):
+        option_data += (0x1000 + crc_index).to_bytes(2, "big")
+    option_data += b"\x00" * padding_length
+    return bytes(option_data)
+
+
+class TestDamOkdScanner(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def __write_file(self, file_name: str, buffer: bytes):
+        path = os.path.join(self.temporary_directory.name, file_name)
+        with open(path, "wb") as file:
+            file.write(buffer)
+        return path
+
+    def test_scan_file_header_types(self):
+        for file_name, buffer, header_type, chunk_lengths in [
+            ("generic.okd", create_okd_file(b""), "Generic", {}),
+            (
+                "generic_adpcm.okd",
+                create_okd_file(b"", 0xFF, 40 + 8),
+                "Generic",
+                {"adpcm_offset": 48},
+            ),
+            (
+                "mmt.okd",
+                create_okd_file(create_option_data([1, 2], 2)),
+                "Mmt",
+                {"yks_chunks_length": 1, "mmt_chunks_length": 2},
+            ),
+            (
+                "mmk.okd",
+                create_okd_file(create_option_data([1, 2, 3], 3, 2)),
+                "Mmk",
+                {"mmk_chunks_length": 3},
+            ),
+            (
+                "spr.okd",
+                create_okd_file(create_option_data([1, 2, 3, 4], 4)),
+                "Spr",
+                {"spr_chunks_length": 4},
+            ),
+            (
+                "spr_header.okd",
+                b"SPRC" + b"\x00" * 12 + create_okd_file(b""),
+                "Generic",
+                {},
+            ),
+            (
+                "dio.okd",
+                create_okd_file(create_option_data([1, 2, 3, 4, 5], 5, 2)),
+                "Dio",
+                {"dio_chunks_length": 5},
+            ),
+            ("oka.oka", create_oka_file(), "Oka", {"adpcm_offset": 48}),
+        ]:
+            with self.subTest(file_name=file_name):
+                row = DamOkdScanner.scan_file(self.__write_file(file_name, buffer))
+                self.assertNotIn("error", row)
+                self.assertEqual(row["header_type"], header_type)
+                self.assertEqual(
+                    row["length"], len(buffer.removeprefix(b"SPRC" + b"\x00" * 12)) - 8
+                )
+                for field_name, value in chunk_lengths.items():
+                    self.assertEqual(row[field_name], value)
+
+    def test_scan_file_error(self):
+        for file_name, buffer in [
+            ("empty.okd", b""),
+            ("unknown.okd", b"\x00\x01\x02\x03" * 16),
+            ("truncated.okd", create_okd_file(b"")[:20]),
+        ]:
+            with self.subTest(file_name=file_name):
+                row = DamOkdScanner.scan_file(self.__write_file(file_name, buffer))
+                self.assertIn("error", row)
+                self.assertNotIn("header_type", row)
+
+    def test_scan_continues_after_error(self):
+        self.__write_file("a.okd", b"\x00\x01\x02\x03" * 16)
+        self.__write_file("b.okd", create_okd_file(create_option_data([1, 2], 2)))
+        self.__write_file("c.oka", create_oka_file())
+
+        output_stream = io.StringIO()
+        DamOkdScanner.scan(
+            output_stream, [self.temporary_directory.name], "jsonl", workers=1
+        )
+        rows = [
+            simplejson.loads(line) for line in output_stream.getvalue().splitlines()
+        ]
+        self.assertEqual(
+            [os.path.basename(row["path"]) for row in rows], ["a.okd", "b.okd", "c.oka"]
+        )
+        self.assertIn("error", rows[0])
+        self.assertEqual(rows[1]["header_type"], "Mmt")
+        self.assertEqual(rows[2]["header_type"], "Oka")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import io
+import mido
+import unittest
+from unittest import mock
+
+from dam_okd_utility.okd_midi import OkdMidiGenericMessage
+from dam_okd_utility.okd_p_track_chunk import OkdPTrackChunk
+from dam_okd_utility.okd_p_track_info_chunk import (
+    OkdPTrackInfoChannelInfoEntry,
+    OkdPTrackInfoEntry,
+)
+from dam_okd_utility.standard_midi_file import (
+    decode_variable_length_quantity,
+    encode_variable_length_quantity,
+    StandardMidiFile,
+    StandardMidiFileWriter,
+)
+
+
+class TestStandardMidiFile(unittest.TestCase):
+    def test_encode_variable_length_quantity(self):
+        for value, buffer in [
+            (0x00000000, b"\x00"),
+            (0x0000007F, b"\x7f"),
+            (0x00000080, b"\x81\x00"),
+            (0x00003FFF, b"\xff\x7f"),
+            (0x00004000, b"\x81\x80\x00"),
+            (0x0FFFFFFF, b"\xff\xff\xff\x7f"),
+        ]:
+            self.assertEqual(encode_variable_length_quantity(value), buffer)
+        self.assertRaises(ValueError, encode_variable_length_quantity, 0x10000000)
+        self.assertEqual(
+            decode_variable_length_quantity(b"\x00\xff\x7f\x00", 1), (0x3FFF, 3)
+        )
+
+    def test_read(self):
+        with open("test/data/p_track.mid", "rb") as midi_file:
+            buffer = midi_file.read()
+        smf = StandardMidiFile.read(buffer)
+        midi = mido.MidiFile(file=io.BytesIO(buffer))
+
+        self.assertEqual(smf.format_type, midi.type)
+        self.assertEqual(smf.ticks_per_beat, midi.ticks_per_beat)
+        self.assertEqual(len(smf.tracks), len(midi.tracks))
+        for track, midi_track in zip(smf.tracks, midi.tracks):
+            absolute_time = 0
+            midi_events: list[tuple[int, bytes]] = []
+            for midi_message in midi_track:
+                absolute_time += midi_message.time
+                midi_events.append((absolute_time, bytes(midi_message.bin())))
+            self.assertEqual(track, midi_events)
+
+    def test_read_running_status(self):
+        smf_writer = StandardMidiFileWriter(1)
+        smf_writer.append_message(0, 0, b"\x90\x3c\x40")
+        smf_writer.append_meta_message(0, 0x10, 0x01, b"a")
+        smf_writer.append_message(0, 0x10, b"\x90\x3c\x00")
+        smf_writer.append_message(0, 0x10, b"\x80\x3c\x40")
+        smf = StandardMidiFile.read(smf_writer.to_bytes())
+
+        self.assertEqual(
+            smf.tracks[0],
+            [
+                (0x00, b"\x90\x3c\x40"),
+                (0x10, b"\xff\x01\x01a"),
+                (0x20, b"\x90\x3c\x00"),
+                (0x30, b"\x80\x3c\x40"),
+                (0x30, b"\xff\x2f\x00"),
+            ],
+        )
+        self.assertEqual(smf.get_first_note_on_time(), 0)
+        self.assertEqual(smf.get_last_note_off_time(), 0x30)
+        self.assertRaises(ValueError, StandardMidiFile.read, b"MThd")
+
+    def test_writer(self):
+        smf_writer = StandardMidiFileWriter(2)
+        smf_writer.append_meta_message(0, 0, 0x21, b"\x00")
+        smf_writer.append_message(0, 0, b"\x90\x3c\x40")
+        smf_writer.append_message(0, 0x80, b"\x90\x3c\x00")
+        smf_writer.append_message(0, 0, b"\xf0\x7e\x7f\xf7")
+        smf_writer.append_message(0, 0, b"\x90\x3e\x40")
+        smf_writer.append_meta_message(1, 0, 0x21, b"\x01")
+
+        midi = mido.MidiFile(file=io.BytesIO(smf_writer.to_bytes([0])))
+        self.assertEqual(midi.type, 1)
+        self.assertEqual(len(midi.tracks), 1)
+        self.assertEqual(
+            [message.bytes() for message in midi.tracks[0]],
+            [
+                [0xFF, 0x21, 0x01, 0x00],
+                [0x90, 0x3C, 0x40],
+                [0x90, 0x3C, 0x00],
+                [0xF0, 0x7E, 0x7F, 0xF7],
+                [0x90, 0x3E, 0x40],
+                [0xFF, 0x2F, 0x00],
+            ],
+        )
+        self.assertEqual(smf_writer.message_counts, [4, 0])
+
+    def test_normalize_message(self):
+        self.assertEqual(
+            StandardMidiFileWriter.normalize_message(b"\xe0\x00\x40\x10"),
+            b"\xe0\x00\x40",
+        )
+        for data in [
+            b"",
+            b"\x90\x3c",
+            b"\x90\x3c\x80",
+            b"\xc0\x01\x02",
+            b"\xf0\x01",
+            b"\xf0\x81\xf7",
+        ]:
+            self.assertRaises(
+                ValueError, StandardMidiFileWriter.normalize_message, data
+            )
+
+    def test_p_track_round_trip(self):
+        track_info = [
+            OkdPTrackInfoEntry(
+                0,
+                0x00,
+                0x0000,
+                [0x0000] * 16,
+                [0x0000] * 16,
+                [OkdPTrackInfoChannelInfoEntry(0xFF, 0x03, 0x0B, 0x0A)] * 16,
+                0x0001,
+            )
+        ]
+        relative_time_tracks = [
+            (
+                0,
+                [
+                    OkdMidiGenericMessage(0, b"\xb0\x07\x64", 0),
+                    OkdMidiGenericMessage(0, b"\xf0\x7e\x7f\x09\x01\xf7", 0),
+                    OkdMidiGenericMessage(0, b"\x90\x3c\x40", 0x30),
+                    OkdMidiGenericMessage(0x10, b"\x91\x3e\x40", 0x30),
+                    OkdMidiGenericMessage(0, b"\xa1\x10", 0),
+                    OkdMidiGenericMessage(0x20, b"\xe1\x00\x40", 0),
+                    OkdMidiGenericMessage(0, b"\x80\x40\x40\x40", 0x10),
+                ],
+            )
+        ]
+
+        for general_midi in [True, False]:
+            midi = OkdPTrackChunk.to_midi(
+                track_info, relative_time_tracks, general_midi
+            )
+            midi.tracks = [
+                midi_track
+                for track_index, midi_track in enumerate(midi.tracks)
+                if track_index == 0
+                or any(not midi_message.is_meta for midi_message in midi_track)
+            ]
+            midi_stream = io.BytesIO()
+            midi.save(file=midi_stream)
+
+            self.assertEqual(
+                OkdPTrackChunk.to_smf(track_info, relative_time_tracks, general_midi),
+                midi_stream.getvalue(),
+            )
+
+        # Both writers report messages mido does not know
+        with mock.patch.object(mido.messages.specs, "SPEC_BY_STATUS", {}):
+            for convert in [OkdPTrackChunk.to_midi, OkdPTrackChunk.to_smf]:
+                with self.assertLogs("OkdPTrackChunk", "WARNING") as logs:
+                    convert(track_info, relative_time_tracks)
+                self.assertIn(
+                    "Unknown message detected. status_byte=0xb0", logs.output[0]
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()